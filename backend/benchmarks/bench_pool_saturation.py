@@ -0,0 +1,194 @@
+"""
+Connection pool saturation benchmark.
+
+Drives concurrent clients against the read endpoints (/api/stations,
+/api/trucks, /api/trucks/{id}) in-process, with the database stubbed by a
+seeded SQLite file in which every statement holds its connection for
+--query-ms and every pre-ping costs --ping-ms (standing in for MySQL round
+trips). For each pool size / overflow / client count it reports throughput,
+request latency and what the pool instrumentation saw: checkout waits, peak
+connections in use and timeouts. A second table compares pre-ping strategies.
+
+If req/s stops rising with pool size while "wait p95" stays low, the pool is
+not the bottleneck (the app is CPU-bound at that point).
+
+Run from the backend folder:
+    python -m benchmarks.bench_pool_saturation
+    python -m benchmarks.bench_pool_saturation --query-ms 20 --clients 25,100
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+# main.py reads config at import time; the stub database needs none of it
+# (and ASGITransport does not run the lifespan, so no background workers).
+for _name in (
+    "WEATHER_API_KEY",
+    "TOMTOM_API_KEY",
+    "GEMINI_API_KEY",
+    "DB_HOST",
+    "DB_NAME",
+    "DB_USER",
+    "DB_PASS",
+    "JWT_SECRET_KEY",
+):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("DB_PORT", "3306")
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.util import await_only  # noqa: E402
+
+import main  # noqa: E402
+from config import config  # noqa: E402
+from database import create_pooled_engine, db_manager  # noqa: E402
+from models.database_models import Base, Station, Truck  # noqa: E402
+
+ENDPOINTS = ("/api/stations", "/api/trucks", "/api/trucks/{truck}")
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))] if ordered else 0.0
+
+
+def _stub_engine(path: str, pool_size: int, max_overflow: int, query_s: float, ping_s: float):
+    engine = create_pooled_engine(f"sqlite+aiosqlite:///{path}", pool_size, max_overflow)
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def round_trip(conn, cursor, statement, parameters, context, executemany):
+        await_only(asyncio.sleep(query_s))
+
+    do_ping = sync_engine.dialect.do_ping
+
+    def slow_ping(dbapi_connection):
+        await_only(asyncio.sleep(ping_s))
+        return do_ping(dbapi_connection)
+
+    sync_engine.dialect.do_ping = slow_ping
+    return engine
+
+
+async def _seed(path: str, stations: int, trucks: int):
+    engine = create_pooled_engine(f"sqlite+aiosqlite:///{path}", 1, 0)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db_manager.async_session_maker.configure(bind=engine)
+    async with db_manager.get_session() as session:
+        for i in range(1, stations + 1):
+            session.add(
+                Station(
+                    id=i, code=f"S{i:03d}", name=f"Station {i}", city="Toronto",
+                    region="ON", lat=43.6 + i / 1000, lon=-79.4, fuel_type="diesel",
+                    capacity_liters=100000, current_level_liters=20000 + 300 * i,
+                )
+            )
+        for i in range(1, trucks + 1):
+            session.add(
+                Truck(code=f"T{i:02d}", plate=f"P-{i}", capacity_liters=30000, fuel_level_percent=80)
+            )
+        await session.commit()
+    await engine.dispose()
+
+
+async def _client(http: httpx.AsyncClient, requests: int, trucks: int, latencies, errors):
+    for _ in range(requests):
+        path = random.choice(ENDPOINTS).format(truck=f"T{random.randint(1, trucks):02d}")
+        started = time.perf_counter()
+        response = await http.get(path)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def _scenario(args, path, pool_size, max_overflow, clients):
+    engine = _stub_engine(path, pool_size, max_overflow, args.query_ms / 1000, args.ping_ms / 1000)
+    db_manager.engine = engine
+    db_manager.async_session_maker.configure(bind=engine)
+    latencies, errors = [], []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _client(http, args.requests, args.trucks, latencies, errors)
+                for _ in range(clients)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    pool = engine.pool.metrics.stats(engine.pool)
+    await engine.dispose()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": _percentile(latencies, 0.5) * 1000,
+        "p95": _percentile(latencies, 0.95) * 1000,
+        "errors": len(errors),
+        "wait_p95": pool["wait"]["p95_ms"] or 0.0,
+        "peak": pool["peak_checked_out"],
+        "timeouts": pool["timeouts"],
+        "pings": pool["pre_ping"]["count"],
+        "connects": pool["connect"]["count"],
+    }
+
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench_pool.db")
+    await _seed(path, args.stations, args.trucks)
+    config.DB_POOL_TIMEOUT_S = args.pool_timeout
+
+    print(
+        f"query {args.query_ms}ms, ping {args.ping_ms}ms, "
+        f"{args.requests} requests per client, pre-ping {config.DB_POOL_PRE_PING}\n"
+    )
+    header = (
+        f"{'pool':>5}{'overflow':>9}{'clients':>8}{'req/s':>9}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'wait p95':>10}{'peak':>6}{'timeouts':>9}{'errors':>8}"
+    )
+    print(header)
+    for pool_size, max_overflow in args.pools:
+        for clients in args.clients:
+            r = await _scenario(args, path, pool_size, max_overflow, clients)
+            print(
+                f"{pool_size:>5}{max_overflow:>9}{clients:>8}{r['rps']:>9.0f}{r['p50']:>9.1f}"
+                f"{r['p95']:>9.1f}{r['wait_p95']:>10.1f}{r['peak']:>6}{r['timeouts']:>9}"
+                f"{r['errors']:>8}"
+            )
+
+    pool_size, max_overflow = args.pools[0]
+    clients = args.clients[-1]
+    print(f"\npre-ping strategies (pool {pool_size}+{max_overflow}, {clients} clients)")
+    print(f"{'strategy':>9}{'req/s':>9}{'p95 ms':>9}{'pings':>8}{'connects':>10}")
+    for strategy in ("always", "idle", "off"):
+        config.DB_POOL_PRE_PING = strategy
+        r = await _scenario(args, path, pool_size, max_overflow, clients)
+        print(
+            f"{strategy:>9}{r['rps']:>9.0f}{r['p95']:>9.1f}{r['pings']:>8}{r['connects']:>10}"
+        )
+
+
+def _pools(value: str):
+    return [tuple(int(n) for n in pair.split("+")) for pair in value.split(",")]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pools", type=_pools, default=_pools("5+0,10+20,20+20"),
+                        help="pool_size+max_overflow pairs, comma separated")
+    parser.add_argument("--clients", type=lambda v: [int(n) for n in v.split(",")],
+                        default=[10, 50, 100])
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--query-ms", type=float, default=5.0)
+    parser.add_argument("--ping-ms", type=float, default=1.0)
+    parser.add_argument("--pool-timeout", type=float, default=30.0)
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--trucks", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
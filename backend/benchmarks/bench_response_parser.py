@@ -0,0 +1,104 @@
+"""
+Microbenchmark for the LLM markdown response parsers.
+
+Times `LLMService`'s route, dispatch and batch parsers against recorded long
+responses in benchmarks/fixtures, then repeats the route response body at
+growing sizes to show parse time scales linearly with response length.
+
+Run from the backend folder:
+    python -m benchmarks.bench_response_parser
+"""
+
+import os
+import timeit
+from pathlib import Path
+
+# The service modules read config at import time; the parsers never touch
+# these values, so placeholders are enough when no .env is present.
+for _name in (
+    "WEATHER_API_KEY",
+    "TOMTOM_API_KEY",
+    "GEMINI_API_KEY",
+    "DB_HOST",
+    "DB_NAME",
+    "DB_USER",
+    "DB_PASS",
+    "JWT_SECRET_KEY",
+):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("DB_PORT", "3306")
+
+from models.data_models import (  # noqa: E402
+    DatabaseResult,
+    StationData,
+    TruckData,
+    WeatherData,
+    WeatherResult,
+)
+from services.llm_service import LLMService  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _load(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def _time(fn, number: int = 200) -> float:
+    """Best-of-5 mean time per call in microseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    service = LLMService()
+    weather = WeatherData("Toronto", 5, "Clear", 10, 50)
+    weather_result = WeatherResult(weather, weather)
+    db_data = DatabaseResult([], [], [])
+    truck = TruckData(1, "T01", "ABC-123", 30000, 80, "diesel", "active")
+    station = StationData(
+        1, "S001", "FuelLogic Toronto East", "Toronto", "ON",
+        43.653, -79.34, "diesel", 120000, 26000,
+    )
+
+    route = _load("route_response_long.md")
+    dispatch = _load("dispatch_response_long.md")
+    batch = _load("batch_response_long.md")
+
+    cases = {
+        "route (comprehensive)": lambda: service._parse_comprehensive_response(
+            route, db_data, weather_result
+        ),
+        "dispatch": lambda: service._parse_dispatch_response(
+            dispatch, truck, [station], "Toronto"
+        ),
+        "batch recommendations": lambda: service._parse_batch_dispatch_response(
+            batch, [truck], [station], "Toronto"
+        ),
+    }
+
+    print(f"{'case':<24}{'chars':>10}{'us/parse':>12}")
+    for label, fn in cases.items():
+        size = {"route (comprehensive)": route, "dispatch": dispatch}.get(label, batch)
+        print(f"{label:<24}{len(size):>10}{_time(fn):>12.1f}")
+
+    # Scale the directions section to check for super-linear behaviour
+    head, _, tail = route.partition("### TRAFFIC CONDITIONS")
+    summary, _, steps = head.partition("### TURN-BY-TURN DIRECTIONS")
+    print(f"\n{'directions x':<24}{'chars':>10}{'us/parse':>12}{'us/kchar':>12}")
+    for factor in (1, 4, 16, 64):
+        text = (
+            f"{summary}### TURN-BY-TURN DIRECTIONS{steps * factor}"
+            f"### TRAFFIC CONDITIONS{tail}"
+        )
+        per_call = _time(
+            lambda: service._parse_comprehensive_response(text, db_data, weather_result),
+            number=max(1, 200 // factor),
+        )
+        print(
+            f"{factor:<24}{len(text):>10}{per_call:>12.1f}"
+            f"{per_call / (len(text) / 1000):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
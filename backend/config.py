@@ -48,6 +48,120 @@ class Config:
     WEATHER_CITY: str
     LOG_LEVEL: str
 
+    # LLM Configuration
+    LLM_STRUCTURED_OUTPUT: bool
+    LLM_FALLBACK_CHAIN: list
+    LLM_ATTEMPT_TIMEOUT_S: float
+    LLM_HEDGE_ENABLED: bool
+    LLM_HEDGE_AFTER_MS: int
+    LLM_HEDGE_MIN_MS: int
+    LLM_HEDGE_MIN_SAMPLES: int
+    LLM_PROVIDER_LIMITS: dict
+    LLM_QUEUE_MAX: int
+    LLM_QUEUE_TIMEOUT_S: float
+    LLM_EST_OUTPUT_TOKENS: int
+
+    # Request deadlines (seconds, 0 disables)
+    ROUTE_OPTIMIZE_DEADLINE_S: float
+    DISPATCH_OPTIMIZE_DEADLINE_S: float
+    DISPATCH_RECOMMENDATIONS_DEADLINE_S: float
+    DISCONNECT_POLL_S: float
+
+    # Background job queue
+    JOB_STORE: str
+    JOB_SQLITE_PATH: str
+    JOB_REDIS_URL: str
+    JOB_WORKERS: int
+    JOB_DEADLINE_S: float
+    JOB_TTL_S: int
+    JOB_POLL_S: float
+    JOB_MAX_REQUEUES: int
+
+    # Background dispatch planner
+    DISPATCH_PLANNER_ENABLED: bool
+    DISPATCH_PLANNER_INTERVAL_S: float
+    DISPATCH_PLANNER_STAGGER_S: float
+    DISPATCH_PLANNER_CONCURRENCY: int
+    DISPATCH_PLANNER_DEPOT: str
+    DISPATCH_PLANNER_MODEL: str
+    DISPATCH_PLAN_TTL_S: float
+    FLEET_MAX_CONCURRENCY: int
+    BATCH_ROUTE_MAX_LANES: int
+    BATCH_ROUTE_CONCURRENCY: int
+    ROUTE_CACHE_ENABLED: bool
+    ROUTE_CACHE_TRAFFIC_TTL_S: float
+    ROUTE_CACHE_STATIC_TTL_S: float
+    ROUTE_CACHE_TRAFFIC_BUCKET_MIN: int
+    ROUTE_CACHE_MAX_ENTRIES: int
+    ROUTE_CACHE_MAX_MB: float
+    ROUTE_CACHE_PATH: str
+    MATRIX_PROVIDER: str
+    MATRIX_MAX_CELLS: int
+    MATRIX_CONCURRENCY: int
+    MATRIX_CACHE_TTL_S: float
+    MATRIX_CACHE_MAX_CELLS: int
+    MATRIX_ROAD_FACTOR: float
+    MATRIX_FALLBACK_SPEED_KMH: float
+    REACHABLE_FILTER_ENABLED: bool
+    REACHABLE_RANGE_FRACTION: float
+    REACHABLE_CACHE_TTL_S: float
+    REACHABLE_CACHE_MAX_ENTRIES: int
+    DISPATCH_ROUTE_GROUNDING: bool
+    DISPATCH_ROUTE_BEST_ORDER: bool
+    UPSTREAM_MIN_TIMEOUT_S: float
+    UPSTREAM_TIMEOUT_MULTIPLIER: float
+    UPSTREAM_RETRIES: int
+    UPSTREAM_RETRY_BASE_S: float
+    UPSTREAM_BREAKER_FAILURES: int
+    UPSTREAM_BREAKER_COOLDOWN_S: float
+    WEATHER_STALE_MAX_S: float
+    GAZETTEER_MIN_SCORE: float
+    GAZETTEER_FUZZY_MIN_CHARS: int
+    GAZETTEER_REFRESH_S: float
+    WEATHER_COLLECTOR_ENABLED: bool
+    WEATHER_DEPOTS: list
+    WEATHER_COLLECT_INTERVAL_S: float
+    WEATHER_COLLECT_SPREAD_S: float
+    WEATHER_COLLECT_CONCURRENCY: int
+    WEATHER_COLLECT_RPM: float
+    WEATHER_LOCAL_MAX_AGE_S: float
+    WEATHER_SYNC_INTERVAL_S: float
+    WEATHER_GRID_DEG: float
+    WEATHER_GRID_MAX_KM: float
+    WEATHER_FORECAST_ENABLED: bool
+    WEATHER_FORECAST_DAYS: int
+    WEATHER_FORECAST_INTERVAL_S: float
+    WEATHER_FORECAST_MAX_AGE_S: float
+    ROLLUP_ENABLED: bool
+    ROLLUP_INTERVAL_S: float
+    ROLLUP_BATCH_ROWS: int
+    ROLLUP_DELETE_CHUNK: int
+    ROLLUP_DELETE_PAUSE_S: float
+    FUEL_LEVEL_RAW_RETENTION_DAYS: float
+    WEATHER_RAW_RETENTION_DAYS: float
+    ROLLUP_HOURLY_RETENTION_DAYS: float
+    ROLLUP_RAW_MAX_SPAN_H: float
+    ROLLUP_HOURLY_MAX_SPAN_D: float
+    HISTORY_DEFAULT_DAYS: float
+    HISTORY_DEFAULT_POINTS: int
+    HISTORY_MAX_POINTS: int
+    HISTORY_MAX_STATIONS: int
+    HISTORY_QUERY_GROUP: int
+    DB_POOL_SIZE: int
+    DB_MAX_OVERFLOW: int
+    DB_POOL_TIMEOUT_S: float
+    DB_POOL_RECYCLE_S: int
+    DB_POOL_PRE_PING: str
+    DB_POOL_PRE_PING_IDLE_S: float
+    DB_REPLICA_HOSTS: list
+    DB_REPLICA_POOL_SIZE: int
+    DB_REPLICA_MAX_OVERFLOW: int
+    DB_REPLICA_MAX_LAG_S: float
+    DB_REPLICA_CHECK_INTERVAL_S: float
+    DB_READ_YOUR_WRITES_S: float
+    AUTH_USER_CACHE_TTL_S: float
+    AUTH_USER_CACHE_MAX: int
+
     def __init__(self):
         """Initialize and validate all configuration from environment variables."""
         self._load_and_validate()
@@ -131,11 +245,297 @@ class Config:
         # Logging level for the application
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
 
+        # LLM Configuration (Optional with defaults)
+        # Ask providers for schema-validated JSON instead of free-form markdown
+        self.LLM_STRUCTURED_OUTPUT = self._get_bool("LLM_STRUCTURED_OUTPUT", True)
+        # Models tried in order when the requested one fails, e.g.
+        # "gemini-2.5-flash,openai:gpt-4o-mini,anthropic:claude-3-5-haiku-latest"
+        self.LLM_FALLBACK_CHAIN = [
+            m.strip()
+            for m in os.getenv("LLM_FALLBACK_CHAIN", "").split(",")
+            if m.strip()
+        ]
+        self.LLM_ATTEMPT_TIMEOUT_S = self._get_float("LLM_ATTEMPT_TIMEOUT_S", 120.0)
+        # Hedging: fire the next model if the first hasn't produced a token in time
+        self.LLM_HEDGE_ENABLED = self._get_bool("LLM_HEDGE_ENABLED", False)
+        self.LLM_HEDGE_AFTER_MS = self._get_int("LLM_HEDGE_AFTER_MS", 4000)
+        self.LLM_HEDGE_MIN_MS = self._get_int("LLM_HEDGE_MIN_MS", 500)
+        self.LLM_HEDGE_MIN_SAMPLES = self._get_int("LLM_HEDGE_MIN_SAMPLES", 20)
+        # Admission control per provider: requests/tokens per minute (0 means
+        # unlimited) and concurrent calls. LLM_<PROVIDER>_RPM etc. override
+        # the LLM_RPM / LLM_TPM / LLM_MAX_CONCURRENCY defaults.
+        default_limits = {
+            "rpm": self._get_int("LLM_RPM", 60),
+            "tpm": self._get_int("LLM_TPM", 0),
+            "concurrency": self._get_int("LLM_MAX_CONCURRENCY", 4),
+        }
+        self.LLM_PROVIDER_LIMITS = {"default": default_limits}
+        for provider in ("google", "openai", "anthropic", "deepseek"):
+            self.LLM_PROVIDER_LIMITS[provider] = {
+                "rpm": self._get_int(f"LLM_{provider.upper()}_RPM", default_limits["rpm"]),
+                "tpm": self._get_int(f"LLM_{provider.upper()}_TPM", default_limits["tpm"]),
+                "concurrency": self._get_int(
+                    f"LLM_{provider.upper()}_MAX_CONCURRENCY",
+                    default_limits["concurrency"],
+                ),
+            }
+        # Waiting calls per provider before new requests are rejected with 429
+        self.LLM_QUEUE_MAX = self._get_int("LLM_QUEUE_MAX", 32)
+        self.LLM_QUEUE_TIMEOUT_S = self._get_float("LLM_QUEUE_TIMEOUT_S", 30.0)
+        # Output tokens assumed per call when charging the TPM bucket
+        self.LLM_EST_OUTPUT_TOKENS = self._get_int("LLM_EST_OUTPUT_TOKENS", 1500)
+
+        # Per-endpoint deadlines; work is cancelled (HTTP 504) once exceeded
+        self.ROUTE_OPTIMIZE_DEADLINE_S = self._get_float(
+            "ROUTE_OPTIMIZE_DEADLINE_S", 150.0
+        )
+        self.DISPATCH_OPTIMIZE_DEADLINE_S = self._get_float(
+            "DISPATCH_OPTIMIZE_DEADLINE_S", 150.0
+        )
+        self.DISPATCH_RECOMMENDATIONS_DEADLINE_S = self._get_float(
+            "DISPATCH_RECOMMENDATIONS_DEADLINE_S", 240.0
+        )
+        # How often long-running endpoints check for a disconnected client
+        self.DISCONNECT_POLL_S = self._get_float("DISCONNECT_POLL_S", 0.5)
+
+        # Background job queue (async optimization endpoints under /api/jobs)
+        self.JOB_STORE = os.getenv("JOB_STORE", "memory").strip().lower()
+        if self.JOB_STORE not in ("memory", "sqlite", "redis"):
+            raise ConfigurationError(
+                f"JOB_STORE must be one of memory, sqlite, redis, got: {self.JOB_STORE}"
+            )
+        self.JOB_SQLITE_PATH = os.getenv("JOB_SQLITE_PATH", "jobs.sqlite3").strip()
+        self.JOB_REDIS_URL = os.getenv("JOB_REDIS_URL", "redis://localhost:6379/0").strip()
+        # Optimizations run concurrently per process, independent of HTTP traffic
+        self.JOB_WORKERS = self._get_int("JOB_WORKERS", 2)
+        self.JOB_DEADLINE_S = self._get_float("JOB_DEADLINE_S", 300.0)
+        # Finished jobs are kept this long for polling
+        self.JOB_TTL_S = self._get_int("JOB_TTL_S", 3600)
+        self.JOB_POLL_S = self._get_float("JOB_POLL_S", 1.0)
+        # Jobs refused by the LLM scheduler are requeued with backoff this many times
+        self.JOB_MAX_REQUEUES = self._get_int("JOB_MAX_REQUEUES", 5)
+
+        # Background dispatch planner: precomputes a plan per active truck so
+        # /api/dispatch/optimize can answer without waiting for the LLM
+        self.DISPATCH_PLANNER_ENABLED = self._get_bool("DISPATCH_PLANNER_ENABLED", False)
+        self.DISPATCH_PLANNER_INTERVAL_S = self._get_float(
+            "DISPATCH_PLANNER_INTERVAL_S", 900.0
+        )
+        # Max gap between two trucks' recomputations within one cycle
+        self.DISPATCH_PLANNER_STAGGER_S = self._get_float("DISPATCH_PLANNER_STAGGER_S", 10.0)
+        self.DISPATCH_PLANNER_CONCURRENCY = self._get_int("DISPATCH_PLANNER_CONCURRENCY", 2)
+        self.DISPATCH_PLANNER_DEPOT = os.getenv("DISPATCH_PLANNER_DEPOT", "Toronto").strip()
+        self.DISPATCH_PLANNER_MODEL = os.getenv(
+            "DISPATCH_PLANNER_MODEL", "gemini-2.5-flash"
+        ).strip()
+        # Plans older than this are never served, even if inputs are unchanged
+        self.DISPATCH_PLAN_TTL_S = self._get_float("DISPATCH_PLAN_TTL_S", 1800.0)
+        # Trucks planned in parallel by /api/dispatch/fleet
+        self.FLEET_MAX_CONCURRENCY = self._get_int("FLEET_MAX_CONCURRENCY", 4)
+        # Batch route optimization (/api/v1/input/batch)
+        self.BATCH_ROUTE_MAX_LANES = self._get_int("BATCH_ROUTE_MAX_LANES", 100)
+        self.BATCH_ROUTE_CONCURRENCY = self._get_int("BATCH_ROUTE_CONCURRENCY", 4)
+
+        # TomTom calculateRoute cache: live-traffic routes go stale quickly,
+        # routes without traffic are kept for a day
+        self.ROUTE_CACHE_ENABLED = self._get_bool("ROUTE_CACHE_ENABLED", True)
+        self.ROUTE_CACHE_TRAFFIC_TTL_S = self._get_float("ROUTE_CACHE_TRAFFIC_TTL_S", 300.0)
+        self.ROUTE_CACHE_STATIC_TTL_S = self._get_float("ROUTE_CACHE_STATIC_TTL_S", 86400.0)
+        self.ROUTE_CACHE_TRAFFIC_BUCKET_MIN = self._get_int("ROUTE_CACHE_TRAFFIC_BUCKET_MIN", 15)
+        self.ROUTE_CACHE_MAX_ENTRIES = self._get_int("ROUTE_CACHE_MAX_ENTRIES", 10000)
+        self.ROUTE_CACHE_MAX_MB = self._get_float("ROUTE_CACHE_MAX_MB", 64.0)
+        # SQLite file that keeps cached routes across restarts (unset = memory only)
+        self.ROUTE_CACHE_PATH = os.getenv("ROUTE_CACHE_PATH", "").strip()
+
+        # Travel-cost matrices: "tomtom" (Matrix Routing API) or "haversine"
+        # (straight-line estimates only, no API calls)
+        self.MATRIX_PROVIDER = os.getenv("MATRIX_PROVIDER", "tomtom").strip().lower()
+        if self.MATRIX_PROVIDER not in ("tomtom", "haversine"):
+            raise ConfigurationError(
+                f"MATRIX_PROVIDER must be one of tomtom, haversine, got: {self.MATRIX_PROVIDER}"
+            )
+        # Cells per synchronous matrix request; larger matrices are chunked
+        self.MATRIX_MAX_CELLS = self._get_int("MATRIX_MAX_CELLS", 100)
+        # Matrix requests in flight at once (chunks of large matrices queue)
+        self.MATRIX_CONCURRENCY = self._get_int("MATRIX_CONCURRENCY", 2)
+        self.MATRIX_CACHE_TTL_S = self._get_float("MATRIX_CACHE_TTL_S", 21600.0)
+        self.MATRIX_CACHE_MAX_CELLS = self._get_int("MATRIX_CACHE_MAX_CELLS", 50000)
+        # Straight-line distance multiplier and speed used for estimated cells
+        self.MATRIX_ROAD_FACTOR = self._get_float("MATRIX_ROAD_FACTOR", 1.3)
+        self.MATRIX_FALLBACK_SPEED_KMH = self._get_float("MATRIX_FALLBACK_SPEED_KMH", 70.0)
+
+        # Drop stations a truck cannot reach from the depot before prompting.
+        # The fraction of max_range_km used keeps fuel for the return leg.
+        self.REACHABLE_FILTER_ENABLED = self._get_bool("REACHABLE_FILTER_ENABLED", True)
+        self.REACHABLE_RANGE_FRACTION = self._get_float("REACHABLE_RANGE_FRACTION", 0.5)
+        self.REACHABLE_CACHE_TTL_S = self._get_float("REACHABLE_CACHE_TTL_S", 86400.0)
+        self.REACHABLE_CACHE_MAX_ENTRIES = self._get_int("REACHABLE_CACHE_MAX_ENTRIES", 1000)
+
+        # Attach TomTom leg distances/times to dispatch plans (one multi-stop
+        # route per plan); BEST_ORDER lets TomTom reorder the stops as well
+        self.DISPATCH_ROUTE_GROUNDING = self._get_bool("DISPATCH_ROUTE_GROUNDING", True)
+        self.DISPATCH_ROUTE_BEST_ORDER = self._get_bool("DISPATCH_ROUTE_BEST_ORDER", False)
+
+        # Upstream APIs (WeatherAPI, TomTom): timeouts follow recent p95
+        # latency times the multiplier, never below the minimum
+        self.UPSTREAM_MIN_TIMEOUT_S = self._get_float("UPSTREAM_MIN_TIMEOUT_S", 2.0)
+        self.UPSTREAM_TIMEOUT_MULTIPLIER = self._get_float("UPSTREAM_TIMEOUT_MULTIPLIER", 3.0)
+        self.UPSTREAM_RETRIES = self._get_int("UPSTREAM_RETRIES", 2)
+        self.UPSTREAM_RETRY_BASE_S = self._get_float("UPSTREAM_RETRY_BASE_S", 0.25)
+        # Consecutive failures that open an upstream's circuit, and how long it stays open
+        self.UPSTREAM_BREAKER_FAILURES = self._get_int("UPSTREAM_BREAKER_FAILURES", 5)
+        self.UPSTREAM_BREAKER_COOLDOWN_S = self._get_float("UPSTREAM_BREAKER_COOLDOWN_S", 30.0)
+        # How old a last known weather reading may be when served as a fallback
+        self.WEATHER_STALE_MAX_S = self._get_float("WEATHER_STALE_MAX_S", 3600.0)
+
+        # Offline gazetteer: minimum trigram similarity for fuzzy matches, the
+        # shortest name that is fuzzy matched at all, and how often station
+        # city centroids are reloaded from the database
+        self.GAZETTEER_MIN_SCORE = self._get_float("GAZETTEER_MIN_SCORE", 0.75)
+        self.GAZETTEER_FUZZY_MIN_CHARS = self._get_int("GAZETTEER_FUZZY_MIN_CHARS", 10)
+        self.GAZETTEER_REFRESH_S = self._get_float("GAZETTEER_REFRESH_S", 3600.0)
+
+        # Network-wide weather collection. The API process collects itself when
+        # enabled, otherwise it follows rows written by weather_collector.py.
+        # Depots are ";"-separated so entries may contain commas ("London, ON").
+        self.WEATHER_COLLECTOR_ENABLED = self._get_bool("WEATHER_COLLECTOR_ENABLED", False)
+        self.WEATHER_DEPOTS = list(
+            dict.fromkeys(
+                d.strip()
+                for d in [
+                    self.WEATHER_CITY,
+                    self.DISPATCH_PLANNER_DEPOT,
+                    *os.getenv("WEATHER_DEPOTS", "").split(";"),
+                ]
+                if d.strip()
+            )
+        )
+        self.WEATHER_COLLECT_INTERVAL_S = self._get_float("WEATHER_COLLECT_INTERVAL_S", 3600.0)
+        # Fetches in a cycle start at random offsets within this window
+        self.WEATHER_COLLECT_SPREAD_S = self._get_float("WEATHER_COLLECT_SPREAD_S", 60.0)
+        self.WEATHER_COLLECT_CONCURRENCY = self._get_int("WEATHER_COLLECT_CONCURRENCY", 8)
+        self.WEATHER_COLLECT_RPM = self._get_float("WEATHER_COLLECT_RPM", 600.0)
+        # Collected readings older than this are not served to request paths
+        self.WEATHER_LOCAL_MAX_AGE_S = self._get_float("WEATHER_LOCAL_MAX_AGE_S", 7200.0)
+        self.WEATHER_SYNC_INTERVAL_S = self._get_float("WEATHER_SYNC_INTERVAL_S", 300.0)
+        # Readings are keyed by lat/lon grid cells of this size (degrees) and
+        # served to positions within WEATHER_GRID_MAX_KM of where they were taken
+        self.WEATHER_GRID_DEG = self._get_float("WEATHER_GRID_DEG", 0.2)
+        if self.WEATHER_GRID_DEG <= 0:
+            raise ConfigurationError(
+                f"WEATHER_GRID_DEG must be positive, got: {self.WEATHER_GRID_DEG}"
+            )
+        self.WEATHER_GRID_MAX_KM = self._get_float("WEATHER_GRID_MAX_KM", 60.0)
+
+        # Hourly forecasts for the same places, used for planned departure and
+        # arrival times; fetches older than MAX_AGE are neither served nor kept
+        self.WEATHER_FORECAST_ENABLED = self._get_bool("WEATHER_FORECAST_ENABLED", True)
+        self.WEATHER_FORECAST_DAYS = self._get_int("WEATHER_FORECAST_DAYS", 3)
+        self.WEATHER_FORECAST_INTERVAL_S = self._get_float("WEATHER_FORECAST_INTERVAL_S", 10800.0)
+        self.WEATHER_FORECAST_MAX_AGE_S = self._get_float("WEATHER_FORECAST_MAX_AGE_S", 43200.0)
+
+        # Hourly/daily rollups of station_fuel_levels and weather_data, and
+        # raw-data retention (deleted in chunks; 0 days keeps everything)
+        self.ROLLUP_ENABLED = self._get_bool("ROLLUP_ENABLED", True)
+        self.ROLLUP_INTERVAL_S = self._get_float("ROLLUP_INTERVAL_S", 300.0)
+        self.ROLLUP_BATCH_ROWS = self._get_int("ROLLUP_BATCH_ROWS", 5000)
+        self.ROLLUP_DELETE_CHUNK = self._get_int("ROLLUP_DELETE_CHUNK", 1000)
+        self.ROLLUP_DELETE_PAUSE_S = self._get_float("ROLLUP_DELETE_PAUSE_S", 0.05)
+        self.FUEL_LEVEL_RAW_RETENTION_DAYS = self._get_float("FUEL_LEVEL_RAW_RETENTION_DAYS", 90.0)
+        self.WEATHER_RAW_RETENTION_DAYS = self._get_float("WEATHER_RAW_RETENTION_DAYS", 30.0)
+        self.ROLLUP_HOURLY_RETENTION_DAYS = self._get_float("ROLLUP_HOURLY_RETENTION_DAYS", 400.0)
+        # History reads use raw rows up to this span, hourly rollups up to the
+        # next, daily rollups beyond
+        self.ROLLUP_RAW_MAX_SPAN_H = self._get_float("ROLLUP_RAW_MAX_SPAN_H", 48.0)
+        self.ROLLUP_HOURLY_MAX_SPAN_D = self._get_float("ROLLUP_HOURLY_MAX_SPAN_D", 62.0)
+        if self.ROLLUP_BATCH_ROWS < 1 or self.ROLLUP_DELETE_CHUNK < 1:
+            raise ConfigurationError("ROLLUP_BATCH_ROWS and ROLLUP_DELETE_CHUNK must be at least 1")
+
+        # Station history endpoints: default window and point count, limits,
+        # and how many stations are read per query while streaming
+        self.HISTORY_DEFAULT_DAYS = self._get_float("HISTORY_DEFAULT_DAYS", 30.0)
+        self.HISTORY_DEFAULT_POINTS = self._get_int("HISTORY_DEFAULT_POINTS", 500)
+        self.HISTORY_MAX_POINTS = self._get_int("HISTORY_MAX_POINTS", 5000)
+        self.HISTORY_MAX_STATIONS = self._get_int("HISTORY_MAX_STATIONS", 100)
+        self.HISTORY_QUERY_GROUP = self._get_int("HISTORY_QUERY_GROUP", 20)
+
+        # Connection pools: primary, and optional read replicas ("host[:port]"
+        # separated by ","; the port defaults to DB_PORT) for read-only endpoints
+        self.DB_POOL_SIZE = self._get_int("DB_POOL_SIZE", 10)
+        self.DB_MAX_OVERFLOW = self._get_int("DB_MAX_OVERFLOW", 20)
+        self.DB_POOL_TIMEOUT_S = self._get_float("DB_POOL_TIMEOUT_S", 30.0)
+        self.DB_POOL_RECYCLE_S = self._get_int("DB_POOL_RECYCLE_S", 3600)
+        # Liveness ping on checkout: always, idle (only connections unused for
+        # DB_POOL_PRE_PING_IDLE_S) or off
+        self.DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").strip().lower()
+        if self.DB_POOL_PRE_PING not in ("always", "idle", "off"):
+            raise ConfigurationError(
+                f"DB_POOL_PRE_PING must be always, idle or off, got: {self.DB_POOL_PRE_PING}"
+            )
+        self.DB_POOL_PRE_PING_IDLE_S = self._get_float("DB_POOL_PRE_PING_IDLE_S", 30.0)
+        self.DB_REPLICA_HOSTS = []
+        for entry in os.getenv("DB_REPLICA_HOSTS", "").split(","):
+            host, _, port = entry.strip().partition(":")
+            if not host:
+                continue
+            try:
+                port = int(port) if port else getattr(self, "DB_PORT", 3306)
+            except ValueError:
+                raise ConfigurationError(
+                    f"DB_REPLICA_HOSTS entries must be host[:port], got: {entry.strip()}"
+                )
+            self.DB_REPLICA_HOSTS.append((host, port))
+        self.DB_REPLICA_POOL_SIZE = self._get_int("DB_REPLICA_POOL_SIZE", self.DB_POOL_SIZE)
+        self.DB_REPLICA_MAX_OVERFLOW = self._get_int(
+            "DB_REPLICA_MAX_OVERFLOW", self.DB_MAX_OVERFLOW
+        )
+        if self.DB_POOL_SIZE < 1 or self.DB_REPLICA_POOL_SIZE < 1:
+            raise ConfigurationError("DB_POOL_SIZE and DB_REPLICA_POOL_SIZE must be at least 1")
+        # Replicas further behind than this (or unreachable) are skipped in
+        # favour of the primary; lag is re-checked every CHECK_INTERVAL
+        self.DB_REPLICA_MAX_LAG_S = self._get_float("DB_REPLICA_MAX_LAG_S", 5.0)
+        self.DB_REPLICA_CHECK_INTERVAL_S = self._get_float("DB_REPLICA_CHECK_INTERVAL_S", 5.0)
+        # After a client writes, its reads stay on the primary until a replica
+        # has caught up with the write, for at most this long; 0 disables
+        self.DB_READ_YOUR_WRITES_S = self._get_float("DB_READ_YOUR_WRITES_S", 30.0)
+
+        # Authenticated users are cached this long so protected requests skip
+        # the database (a deactivated user keeps access until expiry); 0 disables
+        self.AUTH_USER_CACHE_TTL_S = self._get_float("AUTH_USER_CACHE_TTL_S", 60.0)
+        self.AUTH_USER_CACHE_MAX = self._get_int("AUTH_USER_CACHE_MAX", 10000)
+
         # If any required variables are missing, raise a clear error
         if missing_vars:
             error_message = self._format_error_message(missing_vars)
             raise ConfigurationError(error_message)
 
+    def _get_bool(self, name: str, default: bool) -> bool:
+        """Read a boolean environment variable (1/true/yes/on are truthy)."""
+        value = os.getenv(name, "").strip().lower()
+        if not value:
+            return default
+        return value in ("1", "true", "yes", "on")
+
+    def _get_int(self, name: str, default: int) -> int:
+        """Read an integer environment variable, failing fast on bad values."""
+        value = os.getenv(name, "").strip()
+        if not value:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ConfigurationError(f"{name} must be a valid integer, got: {value}")
+
+    def _get_float(self, name: str, default: float) -> float:
+        """Read a float environment variable, failing fast on bad values."""
+        value = os.getenv(name, "").strip()
+        if not value:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            raise ConfigurationError(f"{name} must be a valid number, got: {value}")
+
     def _format_error_message(self, missing_vars: list) -> str:
         """Format a helpful error message for missing environment variables."""
         vars_list = "\n  - ".join(missing_vars)
@@ -3,52 +3,197 @@ SQLAlchemy 2.0 database configuration and session management.
 
 This module provides async database connectivity using SQLAlchemy 2.0
 with proper connection pooling and session management for FastAPI.
+
+Writes always go to the primary. When DB_REPLICA_HOSTS is set, read-only
+endpoints take their session from `get_read_db_session`, which picks a
+replica whose measured lag is within DB_REPLICA_MAX_LAG_S and falls back to
+the primary otherwise. A client that just committed a write carries its
+commit time in a cookie (see `read_your_writes_middleware`) and keeps
+reading from the primary until a replica has applied that write.
 """
 
-from typing import AsyncGenerator
+import asyncio
+import itertools
+import logging
+import math
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     AsyncEngine,
     create_async_engine,
     async_sessionmaker,
 )
+from fastapi import Request
 from models.database_models import Base
 from config import config
+from pool_metrics import InstrumentedPool, instrument, pool_stats
+
+READ_YOUR_WRITES_COOKIE = "mp_db_wrote_at"
+
+_logger = logging.getLogger(__name__)
+
+# Per-request routing state set by read_your_writes_middleware:
+# {"wrote_at": epoch of the client's last write or None, "committed": epoch or None}
+_request_state: ContextVar[Optional[Dict[str, Optional[float]]]] = ContextVar(
+    "db_request_state", default=None
+)
+
+
+def mysql_url(host: str, port: int) -> str:
+    return (
+        f"mysql+aiomysql://{config.DB_USER}:{config.DB_PASS}"
+        f"@{host}:{port}/{config.DB_NAME}"
+    )
+
+
+def create_pooled_engine(url: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """Async engine with an instrumented pool (see pool_metrics.py)"""
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+        pool_recycle=config.DB_POOL_RECYCLE_S,
+        echo=False,  # Set to True for SQL logging during development
+    )
+    instrument(engine)
+    return engine
+
+
+class PrimarySession(Session):
+    """Session on the primary; commits that wrote are recorded for read-your-writes"""
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False):
+        state = _request_state.get()
+        if state is not None:
+            state["committed"] = time.time()
+
+
+@event.listens_for(PrimarySession, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("wrote", None)
+
+
+class ReplicaEngine:
+    """A read replica and its last measured replication lag"""
+
+    def __init__(self, host: str, port: int):
+        self.name = f"{host}:{port}"
+        # A read pool pointed at the primary itself legitimately has no
+        # replication status; any other host without one is not replicating
+        self.is_primary = (host, port) == (config.DB_HOST, config.DB_PORT)
+        self.engine = create_pooled_engine(
+            mysql_url(host, port),
+            config.DB_REPLICA_POOL_SIZE,
+            config.DB_REPLICA_MAX_OVERFLOW,
+        )
+        self.lag_s: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+
+    @property
+    def applied_until(self) -> Optional[float]:
+        """Epoch up to which primary writes are known to be applied here"""
+        if self.lag_s is None or self.checked_at is None:
+            return None
+        return self.checked_at - self.lag_s
+
+    def usable(self, now: float, wrote_at: Optional[float] = None) -> bool:
+        if self.lag_s is None or self.lag_s > config.DB_REPLICA_MAX_LAG_S:
+            return False
+        # A stalled lag monitor must not keep routing to a replica
+        if now - self.checked_at > 3 * max(config.DB_REPLICA_CHECK_INTERVAL_S, 1.0):
+            return False
+        return wrote_at is None or self.applied_until >= wrote_at
+
+    async def check(self):
+        try:
+            async with self.engine.connect() as conn:
+                self.lag_s = await self._lag(conn)
+            self.error = None if self.lag_s is not None else "not replicating"
+        except Exception as e:
+            self.lag_s, self.error = None, str(e)
+        self.checked_at = time.time()
+
+    async def _lag(self, conn) -> Optional[float]:
+        try:
+            row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+            column = "Seconds_Behind_Source"
+        except Exception:
+            # MySQL before 8.0.22
+            row = (await conn.execute(text("SHOW SLAVE STATUS"))).mappings().first()
+            column = "Seconds_Behind_Master"
+        if row is None:
+            return 0.0 if self.is_primary else None
+        lag = row.get(column)
+        return None if lag is None else float(lag)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "host": self.name,
+            "lag_s": self.lag_s,
+            "usable": self.usable(now),
+            "error": self.error,
+            "reads": self.reads,
+            "pool": pool_stats(self.engine),
+        }
 
 
 class DatabaseManager:
     """Manages SQLAlchemy async database connections and sessions."""
 
     def __init__(self):
-        # Create async engine with aiomysql
-        database_url = (
-            f"mysql+aiomysql://{config.DB_USER}:{config.DB_PASS}"
-            f"@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
+        # Primary (read/write) engine with aiomysql
+        self.engine: AsyncEngine = create_pooled_engine(
+            mysql_url(config.DB_HOST, config.DB_PORT),
+            config.DB_POOL_SIZE,
+            config.DB_MAX_OVERFLOW,
         )
+        self.replicas: List[ReplicaEngine] = [
+            ReplicaEngine(host, port) for host, port in config.DB_REPLICA_HOSTS
+        ]
+        self._next_replica = itertools.count()
+        self._primary_reads = 0
+        self._task: Optional[asyncio.Task] = None
 
-        # SQLAlchemy 2.0 async engine configuration
-        self.engine: AsyncEngine = create_async_engine(
-            database_url,
-            # Connection pool settings - SQLAlchemy will automatically choose the right async pool
-            pool_size=10,
-            max_overflow=20,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            # SQLAlchemy 2.0 settings
-            echo=False,  # Set to True for SQL logging during development
-        )
-
-        # Session factory
+        # Session factories
         self.async_session_maker = async_sessionmaker(
             bind=self.engine,
             class_=AsyncSession,
+            sync_session_class=PrimarySession,
             expire_on_commit=False,
             autoflush=True,
         )
+        self.read_session_maker = async_sessionmaker(
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autoflush=False,
+        )
 
     def get_session(self):
         """
-        Get a new database session.
+        Get a new database session on the primary.
 
         Returns:
             AsyncSession context manager
@@ -59,6 +204,55 @@ class DatabaseManager:
         """
         return self.async_session_maker()
 
+    def get_read_session(self, wrote_at: Optional[float] = None):
+        """
+        Get a session for reads only: a replica that is within the lag limit
+        and has applied writes up to `wrote_at`, else the primary.
+        """
+        now = time.time()
+        usable = [r for r in self.replicas if r.usable(now, wrote_at)]
+        if not usable:
+            self._primary_reads += 1
+            return self.async_session_maker()
+        replica = usable[next(self._next_replica) % len(usable)]
+        replica.reads += 1
+        return self.read_session_maker(bind=replica.engine)
+
+    async def check_replicas(self):
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+        for replica in self.replicas:
+            if replica.error:
+                _logger.warning("Read replica %s unavailable: %s", replica.name, replica.error)
+
+    async def start(self):
+        """Measure replica lag now and then every DB_REPLICA_CHECK_INTERVAL_S"""
+        if self._task is None and self.replicas:
+            await self.check_replicas()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.DB_REPLICA_CHECK_INTERVAL_S)
+            try:
+                await self.check_replicas()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("Replica lag check failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool": pool_stats(self.engine),
+            "primary_reads": self._primary_reads,
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
     async def create_tables(self):
         """Create all database tables. Use only in development/testing."""
         async with self.engine.begin() as conn:
@@ -70,18 +264,61 @@ class DatabaseManager:
             await conn.run_sync(Base.metadata.drop_all)
 
     async def close(self):
-        """Close the database engine and all connections."""
+        """Close the database engines and all connections."""
+        await self.stop()
         await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
 
 
 # Global database manager instance
 db_manager = DatabaseManager()
 
 
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    Route this request's reads past replicas that have not yet applied the
+    client's last write, and remember the time of any write it commits.
+    """
+    try:
+        wrote_at = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, ""))
+    except ValueError:
+        wrote_at = None
+    state = {"wrote_at": wrote_at, "committed": None}
+    token = _request_state.set(state)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_state.reset(token)
+    if state["committed"] is not None and config.DB_READ_YOUR_WRITES_S > 0:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            f"{state['committed']:.3f}",
+            max_age=math.ceil(config.DB_READ_YOUR_WRITES_S),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+async def release_connection(session: AsyncSession):
+    """
+    End the session's transaction so its connection goes back to the pool
+    before a slow await (LLM, TomTom, WeatherAPI). Loaded objects stay usable
+    (expire_on_commit=False); the next query checks a connection out again.
+    """
+    if session.in_transaction():
+        await session.commit()
+
+
 # FastAPI dependency for getting database sessions
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """
-    FastAPI dependency for injecting database sessions.
+    FastAPI dependency for injecting database sessions (primary).
+
+    Sessions check a connection out of the pool on their first query, not
+    here, so handlers that return early or answer from a cache never touch
+    the pool.
 
     Usage in FastAPI endpoints:
         @app.get("/users")
@@ -96,3 +333,20 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         except Exception:
             await session.rollback()
             raise
+
+
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency for read-only endpoints: a replica session when one is
+    fresh enough for this client, otherwise the primary.
+    """
+    state = _request_state.get() or {}
+    wrote_at = state.get("committed") or state.get("wrote_at")
+    if wrote_at is not None and time.time() - wrote_at > config.DB_READ_YOUR_WRITES_S:
+        wrote_at = None
+    async with db_manager.get_read_session(wrote_at) as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
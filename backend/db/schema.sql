@@ -29,7 +29,8 @@ CREATE TABLE IF NOT EXISTS stations (
   capacity_liters DECIMAL(12,2),
   current_level_liters DECIMAL(12,2),
   request_method ENUM('IoT', 'Manual') DEFAULT 'Manual',
-  low_fuel_threshold DECIMAL(12,2) DEFAULT 5000
+  low_fuel_threshold DECIMAL(12,2) DEFAULT 5000,
+  INDEX idx_station_city_region (city, region)
 );
 
 -- TRUCKS
@@ -63,7 +64,9 @@ CREATE TABLE IF NOT EXISTS station_fuel_levels (
   station_id INT,
   recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
   fuel_level_liters DECIMAL(12,2),
-  FOREIGN KEY (station_id) REFERENCES stations(id)
+  FOREIGN KEY (station_id) REFERENCES stations(id),
+  INDEX idx_fuel_level_station_recorded (station_id, recorded_at),
+  INDEX idx_fuel_level_recorded (recorded_at)
 );
 
 -- TRUCK COMPARTMENTS
@@ -88,5 +91,63 @@ CREATE TABLE IF NOT EXISTS weather_data (
   `condition` TEXT,
   wind FLOAT,
   humidity FLOAT,
-  collected_at TIMESTAMP
-);
\ No newline at end of file
+  lat DECIMAL(9,6),
+  lon DECIMAL(9,6),
+  collected_at TIMESTAMP,
+  INDEX idx_weather_city_collected (city, collected_at),
+  INDEX idx_weather_collected (collected_at)
+);
+-- Hourly forecasts, one row per place per fetch with the hours stored as
+-- parallel arrays in `series`
+CREATE TABLE IF NOT EXISTS weather_forecasts (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  city VARCHAR(100),
+  lat DECIMAL(9,6) NOT NULL,
+  lon DECIMAL(9,6) NOT NULL,
+  start_time DATETIME NOT NULL,
+  hours SMALLINT NOT NULL,
+  series JSON NOT NULL,
+  fetched_at TIMESTAMP NOT NULL,
+  INDEX idx_forecast_fetched (fetched_at)
+);
+
+-- ROLLUPS
+
+-- Hourly and daily min/max/sum/last per series, maintained incrementally
+-- from station_fuel_levels and weather_data
+CREATE TABLE IF NOT EXISTS metric_rollups (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  source VARCHAR(32) NOT NULL,
+  metric VARCHAR(32) NOT NULL,
+  series_key VARCHAR(100) NOT NULL,
+  resolution ENUM('hour', 'day') NOT NULL,
+  bucket_start DATETIME NOT NULL,
+  samples INT NOT NULL,
+  min_value DOUBLE NOT NULL,
+  max_value DOUBLE NOT NULL,
+  sum_value DOUBLE NOT NULL,
+  last_value DOUBLE NOT NULL,
+  last_at DATETIME NOT NULL,
+  UNIQUE KEY uq_rollup_bucket (source, metric, series_key, resolution, bucket_start),
+  INDEX idx_rollup_resolution_bucket (resolution, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+  source VARCHAR(32) PRIMARY KEY,
+  last_id INT NOT NULL DEFAULT 0,
+  updated_at DATETIME
+);
+
+-- DISPATCH PLANS
+
+-- Plans precomputed by the background dispatch planner, read by every API
+-- process; a plan is served only while its input fingerprint still matches
+CREATE TABLE IF NOT EXISTS dispatch_plans (
+  truck_id INT NOT NULL,
+  depot_key VARCHAR(255) NOT NULL,
+  llm_model VARCHAR(100) NOT NULL,
+  fingerprint VARCHAR(40) NOT NULL,
+  result JSON NOT NULL,
+  computed_at DOUBLE NOT NULL,
+  PRIMARY KEY (truck_id, depot_key, llm_model)
+);
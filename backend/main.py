@@ -1,21 +1,40 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from datetime import timedelta
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional
+from sqlalchemy import or_, select
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import copy
+import json
 from services.llm_service import LLMService
+from services.llm_executor import llm_executor, LLMUnavailableError
+from services.llm_scheduler import LLMQueueFullError
+from services.request_scope import run_request_scoped, request_scope_stats
+from services.job_queue import job_queue
+from services.single_flight import single_flight, normalize_payload
+from services.dispatch_planner import dispatch_planner
+from services.route_cache import route_cache
+from services.matrix_service import matrix_service
+from services.reachability_service import reachability_service
+from services.upstream import UpstreamUnavailableError, close_upstreams, upstream_stats
+from services.gazetteer import gazetteer
+from services.weather_service import weather_service
+from services.forecast_service import forecast_service
+from services.rollup_service import rollup_service
+from services.history_service import METHODS as HISTORY_METHODS, stream_station_history
+from services import read_queries
+from routes.routes import router as optimization_router
 from utils.serializers import (
-    station_api_dict,
-    truck_api_dict,
-    trip_dict_from_row,
-    trip_detail_from_row,
     weather_api_dict,
     route_response_dict,
 )
 import logging
+import math
+import time
 
 _logger = logging.getLogger(__name__)
 
@@ -25,10 +44,25 @@ def _raise_logged_http_500(message: str):
     raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _raise_llm_busy(action: str, error: LLMQueueFullError):
+    raise HTTPException(
+        status_code=429,
+        detail=f"{action} failed: AI service is busy, please retry shortly",
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+
+def _raise_upstream_unavailable(error: UpstreamUnavailableError):
+    raise HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+
 from services.api_utils import (
     get_weather_async,
     calculate_route_async,
-    calculate_reachable_range_async,
 )
 from services.auth_service import (
     auth_service,
@@ -36,19 +70,54 @@ from services.auth_service import (
 )
 from logging_config import configure_logging
 from models.auth_models import UserCreate, User, Token
-from database import get_db_session
+from database import (
+    get_db_session,
+    get_read_db_session,
+    db_manager,
+    read_your_writes_middleware,
+)
 from config import config
 from models.database_models import (
     Truck as TruckORM,
     Station as StationORM,
-    Delivery as DeliveryORM,
 )
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Station city centroids for the offline gazetteer (the bundled city list
+    # still works if the database is not reachable yet)
+    try:
+        async with db_manager.get_session() as session:
+            await gazetteer.refresh(session)
+    except Exception as e:
+        _logger.warning("Gazetteer station places not loaded: %s", e)
+    # Routes persisted by a previous run (read off the event loop)
+    await route_cache.load()
+    # Replica lag monitoring for read-only endpoints (no-op without replicas)
+    await db_manager.start()
+    # Background workers for the /api/jobs endpoints
+    await job_queue.start()
+    await dispatch_planner.start()
+    # Network-wide weather: collect here or follow weather_collector.py's rows
+    await weather_service.start()
+    await forecast_service.start()
+    await rollup_service.start()
+    yield
+    await rollup_service.stop()
+    await forecast_service.stop()
+    await weather_service.stop()
+    await dispatch_planner.stop()
+    await job_queue.stop()
+    await db_manager.stop()
+    await close_upstreams()
+
+
 app = FastAPI(
     title="Manage Petro API",
     description="API for managing fuel delivery operations with AI-powered route optimization",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 @app.get("/", include_in_schema=False)
@@ -65,6 +134,9 @@ async def healthz():
 # Configure logging early
 configure_logging()
 
+# Keep a client's reads on the primary until replicas have its latest write
+app.middleware("http")(read_your_writes_middleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -82,6 +154,9 @@ app.add_middleware(
 # Initialize services
 llm_service = LLMService()
 
+# Versioned optimization routes (/api/v1)
+app.include_router(optimization_router)
+
 
 # Pydantic models for request/response (Updated for Pydantic v2)
 class RouteRequest(BaseModel):
@@ -165,6 +240,10 @@ class DispatchOptimizationRequest(BaseModel):
     depot_location: str = Field(
         default="Toronto", description="Starting depot location"
     )
+    force_refresh: bool = Field(
+        default=False,
+        description="Recompute the plan even if a fresh precomputed one exists",
+    )
 
 
 class DispatchRecommendationsRequest(BaseModel):
@@ -185,31 +264,114 @@ class DispatchRecommendationsRequest(BaseModel):
     )
 
 
+class FleetOptimizationRequest(BaseModel):
+    model_config = {"validate_assignment": True, "extra": "forbid"}
+
+    llm_model: str = Field(default="gemini-2.5-flash", description="AI model to use")
+    depot_location: str = Field(
+        default="Toronto", description="Starting depot location"
+    )
+    truck_ids: Optional[List[str]] = Field(
+        default=None, description="Trucks to plan (IDs or codes); all active trucks if omitted"
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None, ge=1, description="Trucks planned in parallel (capped by server config)"
+    )
+
+
+async def _optimize_route(request: RouteRequest, session: AsyncSession):
+    return await llm_service.optimize_route(
+        request.from_location,
+        request.to_location,
+        session,
+        request.llm_model,
+        departure_time=request.departure_time,
+        arrival_time=request.arrival_time,
+        time_mode=request.time_mode,
+        delivery_date=request.delivery_date,
+        vehicle_type=request.vehicle_type,
+        notes=request.notes,
+    )
+
+
+async def _optimize_dispatch(request: DispatchOptimizationRequest, session: AsyncSession):
+    # Read once: the planner fingerprints these and the LLM call plans from them
+    inputs = await llm_service.load_dispatch_inputs(session, request.truck_id)
+    # Serve the background planner's plan when it is still valid
+    lookup = await dispatch_planner.lookup(
+        session, *inputs, request.depot_location, request.llm_model
+    )
+    if lookup is not None and lookup.plan is not None and not request.force_refresh:
+        return lookup.plan
+
+    result = await llm_service.optimize_dispatch(
+        truck_id=request.truck_id,
+        depot_location=request.depot_location,
+        session=session,
+        llm_model=request.llm_model,
+        inputs=inputs,
+    )
+    await dispatch_planner.store(lookup, result)
+    return result
+
+
+async def _dispatch_recommendations(
+    request: DispatchRecommendationsRequest, session: AsyncSession
+):
+    return await llm_service.get_dispatch_recommendations(
+        depot_location=request.depot_location,
+        session=session,
+        llm_model=request.llm_model,
+        max_recommendations=request.max_recommendations,
+        filter_region=request.filter_region,
+        filter_city=request.filter_city,
+    )
+
+
+async def _coalesced(name: str, call, request: BaseModel):
+    """
+    Run `call(request, session)` through single-flight so identical requests
+    in flight share one result. The shared call outlives any single request,
+    so it opens its own DB session instead of using the request's.
+    """
+
+    async def run():
+        async with db_manager.get_read_session() as session:
+            return await call(request, session)
+
+    result = await single_flight.do(name, normalize_payload(request.model_dump()), run)
+    # Shared between coalesced requests (nested values too); copy before shaping
+    return copy.deepcopy(result)
+
+
 @app.post("/api/routes/optimize")
 async def optimize_route_ai(
     request: RouteRequest,
+    http_request: Request,
     current_user: User = Depends(get_current_active_user),
-    session: AsyncSession = Depends(get_db_session),
 ):
     """AI-powered route optimization using markdown-refined prompts (Protected)"""
     try:
         # Always use AI service - removed conditional check to match dispatch endpoint
-        result = await llm_service.optimize_route(
-            request.from_location,
-            request.to_location,
-            session,
-            request.llm_model,
-            departure_time=request.departure_time,
-            arrival_time=request.arrival_time,
-            time_mode=request.time_mode,
-            delivery_date=request.delivery_date,
-            vehicle_type=request.vehicle_type,
-            notes=request.notes,
+        result = await run_request_scoped(
+            http_request,
+            _coalesced("route_optimization", _optimize_route, request),
+            config.ROUTE_OPTIMIZE_DEADLINE_S,
+            "Route optimization",
         )
         # Add user info to response and ensure ai_analysis is a string
         result["requested_by"] = current_user.username
         return route_response_dict(result)
 
+    except HTTPException:
+        raise
+    except LLMQueueFullError as e:
+        _raise_llm_busy("Route optimization", e)
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Route optimization failed: AI providers unavailable ({e})",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Route optimization failed: {str(e)}"
@@ -225,6 +387,8 @@ async def get_weather_info(request: WeatherRequest):
         return {"city": request.city, "weather": weather_api_dict(weather_data)}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailableError as e:
+        _raise_upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Weather service error: {str(e)}")
 
@@ -246,6 +410,8 @@ async def calculate_tomtom_route(request: TomTomRouteRequest):
 
         return {"origin": origin, "destination": destination, "route_data": route_data}
 
+    except UpstreamUnavailableError as e:
+        _raise_upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"TomTom routing error: {str(e)}")
 
@@ -257,11 +423,13 @@ async def calculate_range(request: ReachableRangeRequest):
     try:
         origin = (request.origin_lat, request.origin_lon)
 
-        range_data = await calculate_reachable_range_async(
-            origin=origin,
-            budget_value=request.budget_value,
-            budget_type=request.budget_type,
+        reachable = await reachability_service.get_range(
+            origin,
+            request.budget_value,
+            request.budget_type,
+            bucket=False,
         )
+        range_data = reachable.response
 
         return {
             "origin": origin,
@@ -272,20 +440,19 @@ async def calculate_range(request: ReachableRangeRequest):
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailableError as e:
+        _raise_upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reachable range error: {str(e)}")
 
 
 # Stations endpoint
 @app.get("/api/stations")
-async def get_stations(session: AsyncSession = Depends(get_db_session)):
+async def get_stations(session: AsyncSession = Depends(get_read_db_session)):
     """Get all stations from database using SQLAlchemy 2.0"""
     try:
-        stations = await llm_service.get_all_stations_sqlalchemy(session)
-        return {
-            "stations": [station_api_dict(s) for s in stations],
-            "count": len(stations),
-        }
+        stations = await read_queries.stations_api(session)
+        return {"stations": stations, "count": len(stations)}
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch stations: {str(e)}"
@@ -294,18 +461,18 @@ async def get_stations(session: AsyncSession = Depends(get_db_session)):
 
 # Trucks endpoint
 @app.get("/api/trucks")
-async def get_trucks(session: AsyncSession = Depends(get_db_session)):
+async def get_trucks(session: AsyncSession = Depends(get_read_db_session)):
     """Get all trucks from database using SQLAlchemy 2.0"""
     try:
-        trucks = await llm_service.get_all_trucks_sqlalchemy(session)
-        return {"trucks": [truck_api_dict(t) for t in trucks], "count": len(trucks)}
+        trucks = await read_queries.trucks_api(session)
+        return {"trucks": trucks, "count": len(trucks)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch trucks: {str(e)}")
 
 
 # Get single truck by id or code
 @app.get("/api/trucks/{truck_id}")
-async def get_truck(truck_id: str, session: AsyncSession = Depends(get_db_session)):
+async def get_truck(truck_id: str, session: AsyncSession = Depends(get_read_db_session)):
     """Get a single truck by numeric id or code (e.g., 'truck-001' or 'T01')"""
     from services.llm_service import LLMService
 
@@ -367,53 +534,105 @@ async def create_truck(
         raise HTTPException(status_code=500, detail=f"Failed to create truck: {str(e)}")
 
 
+def _station_ref(station_id: str):
+    """("id", int) or ("code", str) for 'station-001', a numeric id or a code"""
+    if station_id.startswith("station-"):
+        try:
+            return "id", int(station_id.split("-")[1])
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid station id format")
+    if station_id.isdigit():
+        return "id", int(station_id)
+    return "code", station_id
+
+
+def _station_id_condition(station_id: str):
+    kind, value = _station_ref(station_id)
+    return StationORM.id == value if kind == "id" else StationORM.code == value
+
+
+def _local_naive(value: datetime | None) -> datetime | None:
+    # Aware times ("...Z") become local wall-clock time like stored timestamps
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _history_window(start: datetime | None, end: datetime | None, resolution: str | None):
+    end = _local_naive(end) or datetime.now()
+    start = _local_naive(start) or end - timedelta(days=config.HISTORY_DEFAULT_DAYS)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if resolution == "raw" and end - start > timedelta(hours=config.ROLLUP_RAW_MAX_SPAN_H):
+        # Raw rows are loaded in full; longer spans must come from rollups
+        raise HTTPException(
+            status_code=400,
+            detail=f"resolution=raw is limited to {config.ROLLUP_RAW_MAX_SPAN_H:g} hours; "
+            "use hour or day",
+        )
+    return start, end
+
+
+# Downsampled fuel-level history for several stations (declared before
+# /api/stations/{station_id} so "history" is not taken for a station id)
+@app.get("/api/stations/history")
+async def get_stations_history(
+    ids: str = Query(..., description="Comma-separated station ids or codes"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    points: int | None = Query(default=None, ge=3, le=config.HISTORY_MAX_POINTS),
+    method: str = Query(default="lttb", pattern=f"^({'|'.join(HISTORY_METHODS)})$"),
+    resolution: str | None = Query(default=None, pattern="^(raw|hour|day)$"),
+    session: AsyncSession = Depends(get_read_db_session),
+):
+    """
+    Fuel-level series for many stations, each downsampled to `points`,
+    streamed as NDJSON (a meta line, then one line per station)
+    """
+    requested = [part.strip() for part in ids.split(",") if part.strip()]
+    if not requested:
+        raise HTTPException(status_code=400, detail="No station ids given")
+    if len(requested) > config.HISTORY_MAX_STATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.HISTORY_MAX_STATIONS} stations per request",
+        )
+    start, end = _history_window(start, end, resolution)
+
+    stmt = select(StationORM.id, StationORM.code).where(
+        or_(*(_station_id_condition(station_id) for station_id in requested))
+    )
+    found_ids = {}
+    for row in (await session.execute(stmt)).all():
+        found_ids[("id", row.id)] = found_ids[("code", row.code)] = row.id
+    station_ids, missing = [], []
+    for station_id in requested:
+        found = found_ids.get(_station_ref(station_id))
+        if found is None:
+            missing.append(station_id)
+        elif found not in station_ids:
+            station_ids.append(found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Stations not found: {', '.join(missing)}")
+
+    return StreamingResponse(
+        stream_station_history(
+            station_ids, start, end, points or config.HISTORY_DEFAULT_POINTS, method, resolution
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
 # Get single station by id or code
 @app.get("/api/stations/{station_id}")
-async def get_station(station_id: str, session: AsyncSession = Depends(get_db_session)):
+async def get_station(station_id: str, session: AsyncSession = Depends(get_read_db_session)):
     """Get a single station by numeric id or code"""
     try:
         # Accept formats like 'station-001' or numeric or code
-        if station_id.startswith("station-"):
-            try:
-                numeric = int(station_id.split("-")[1])
-                stmt = select(StationORM).where(StationORM.id == numeric)
-            except Exception:
-                raise HTTPException(status_code=400, detail="Invalid station id format")
-        elif station_id.isdigit():
-            stmt = select(StationORM).where(StationORM.id == int(station_id))
-        else:
-            stmt = select(StationORM).where(StationORM.code == station_id)
-
-        result = await session.execute(stmt)
-        station = result.scalar_one_or_none()
+        station = await read_queries.station_api(session, *_station_ref(station_id))
         if not station:
             raise HTTPException(status_code=404, detail="Station not found")
-
-        # Map to API format consistent with /api/stations list
-        station_payload = {
-            "station_id": f"station-{station.id:03d}",
-            "name": station.name,
-            "city": station.city,
-            "region": station.region,
-            "country": "Canada",
-            "fuel_type": station.fuel_type,
-            "capacity_liters": station.capacity_liters,
-            "current_level_liters": station.current_level_liters,
-            "fuel_level": (
-                int((station.current_level_liters / station.capacity_liters) * 100)
-                if station.capacity_liters and station.capacity_liters > 0
-                else 0
-            ),
-            "code": station.code,
-            "lat": float(station.lat) if station.lat is not None else None,
-            "lon": float(station.lon) if station.lon is not None else None,
-            "request_method": station.request_method or "Manual",
-            "low_fuel_threshold": station.low_fuel_threshold or 5000,
-            "needs_refuel": station.current_level_liters
-            < (station.low_fuel_threshold or 5000),
-        }
-
-        return {"station": station_payload}
+        return {"station": station}
     except HTTPException:
         raise
     except Exception as e:
@@ -422,73 +641,57 @@ async def get_station(station_id: str, session: AsyncSession = Depends(get_db_se
         )
 
 
+# Downsampled fuel-level history for one station
+@app.get("/api/stations/{station_id}/history")
+async def get_station_history(
+    station_id: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    points: int | None = Query(default=None, ge=3, le=config.HISTORY_MAX_POINTS),
+    method: str = Query(default="lttb", pattern=f"^({'|'.join(HISTORY_METHODS)})$"),
+    resolution: str | None = Query(default=None, pattern="^(raw|hour|day)$"),
+    session: AsyncSession = Depends(get_read_db_session),
+):
+    """
+    Fuel-level series for a station downsampled to `points` (LTTB or min/max
+    buckets) from the rollup tier that fits the range, streamed as NDJSON
+    """
+    stmt = select(StationORM.id).where(_station_id_condition(station_id))
+    numeric_id = (await session.execute(stmt)).scalar_one_or_none()
+    if numeric_id is None:
+        raise HTTPException(status_code=404, detail="Station not found")
+    start, end = _history_window(start, end, resolution)
+    return StreamingResponse(
+        stream_station_history(
+            [numeric_id], start, end, points or config.HISTORY_DEFAULT_POINTS, method, resolution
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
 # Trips endpoints (deliveries)
 @app.get("/api/trips")
 async def get_trips(
     limit: int = 50,
     successful_only: bool = False,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
     """Get recent trips/deliveries"""
     try:
-        stmt = select(
-            DeliveryORM.id,
-            DeliveryORM.volume_liters,
-            DeliveryORM.delivery_date,
-            DeliveryORM.status,
-            StationORM.name.label("station_name"),
-            StationORM.code.label("station_code"),
-            StationORM.city,
-            StationORM.region,
-            StationORM.lat,
-            StationORM.lon,
-        ).join(StationORM, DeliveryORM.station_id == StationORM.id)
-
-        if successful_only:
-            stmt = stmt.where(DeliveryORM.status == "delivered")
-
-        stmt = stmt.order_by(DeliveryORM.delivery_date.desc()).limit(limit)
-
-        result = await session.execute(stmt)
-        rows = result.all()
-
-        trips = [trip_dict_from_row(r) for r in rows]
+        trips = await read_queries.trips_api(session, limit, successful_only)
         return {"trips": trips, "count": len(trips)}
     except Exception:
         _raise_logged_http_500("Failed to fetch trips")
 
 
 @app.get("/api/trips/{trip_id}")
-async def get_trip(trip_id: int, session: AsyncSession = Depends(get_db_session)):
+async def get_trip(trip_id: int, session: AsyncSession = Depends(get_read_db_session)):
     """Get a single trip/delivery by id"""
     try:
-        stmt = (
-            select(
-                DeliveryORM.id,
-                DeliveryORM.volume_liters,
-                DeliveryORM.delivery_date,
-                DeliveryORM.status,
-                StationORM.name.label("station_name"),
-                StationORM.code.label("station_code"),
-                StationORM.city,
-                StationORM.region,
-                StationORM.lat,
-                StationORM.lon,
-                TruckORM.code.label("truck_code"),
-                TruckORM.plate.label("truck_plate"),
-            )
-            .join(StationORM, DeliveryORM.station_id == StationORM.id)
-            .join(TruckORM, DeliveryORM.truck_id == TruckORM.id)
-            .where(DeliveryORM.id == trip_id)
-        )
-
-        result = await session.execute(stmt)
-        row = result.one_or_none()
-        if not row:
+        trip = await read_queries.trip_api(session, trip_id)
+        if not trip:
             raise HTTPException(status_code=404, detail="Trip not found")
-
-        r = row
-        return {"trip": trip_detail_from_row(r)}
+        return {"trip": trip}
     except HTTPException:
         raise
     except Exception:
@@ -509,6 +712,28 @@ def health_check():
     }
 
 
+# Runtime metrics endpoint
+@app.get("/api/metrics")
+def get_metrics():
+    """Runtime metrics for LLM calls and long-running requests"""
+    return {
+        "llm": llm_executor.stats(),
+        "requests": request_scope_stats.stats(),
+        "coalescing": single_flight.stats(),
+        "dispatch_planner": dispatch_planner.stats(),
+        "route_cache": route_cache.stats(),
+        "travel_matrix": matrix_service.stats(),
+        "reachable_range": reachability_service.stats(),
+        "upstreams": upstream_stats(),
+        "gazetteer": gazetteer.stats(),
+        "weather_collector": weather_service.stats(),
+        "weather_forecast": forecast_service.stats(),
+        "rollups": rollup_service.stats(),
+        "database": db_manager.stats(),
+        "auth": auth_service.cache_stats(),
+    }
+
+
 # ===== AUTHENTICATION ENDPOINTS =====
 
 
@@ -590,20 +815,29 @@ async def logout_user():
 @app.post("/api/dispatch/optimize")
 async def optimize_dispatch(
     request: DispatchOptimizationRequest,
+    http_request: Request,
     current_user: User = Depends(get_current_active_user),
-    session: AsyncSession = Depends(get_db_session),
 ):
     """AI-powered dispatch optimization for trucks to stations needing fuel (Protected)"""
     try:
-        result = await llm_service.optimize_dispatch(
-            truck_id=request.truck_id,
-            depot_location=request.depot_location,
-            session=session,
-            llm_model=request.llm_model,
+        result = await run_request_scoped(
+            http_request,
+            _coalesced("dispatch_optimization", _optimize_dispatch, request),
+            config.DISPATCH_OPTIMIZE_DEADLINE_S,
+            "Dispatch optimization",
         )
         # Add user info to response and ensure ai_analysis is a string
         result["requested_by"] = current_user.username
         return route_response_dict(result)
+    except HTTPException:
+        raise
+    except LLMQueueFullError as e:
+        _raise_llm_busy("Dispatch optimization", e)
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Dispatch optimization failed: AI providers unavailable ({e})",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Dispatch optimization failed: {str(e)}"
@@ -614,33 +848,100 @@ async def optimize_dispatch(
 @app.post("/api/dispatch/recommendations")
 async def get_dispatch_recommendations(
     request: DispatchRecommendationsRequest,
+    http_request: Request,
     current_user: User = Depends(get_current_active_user),
-    session: AsyncSession = Depends(get_db_session),
 ):
     """AI-powered batch dispatch recommendations for optimal truck-station matching (Protected)"""
     try:
-        result = await llm_service.get_dispatch_recommendations(
-            depot_location=request.depot_location,
-            session=session,
-            llm_model=request.llm_model,
-            max_recommendations=request.max_recommendations,
-            filter_region=request.filter_region,
-            filter_city=request.filter_city,
+        result = await run_request_scoped(
+            http_request,
+            _coalesced(
+                "dispatch_recommendations", _dispatch_recommendations, request
+            ),
+            config.DISPATCH_RECOMMENDATIONS_DEADLINE_S,
+            "Dispatch recommendations",
         )
         # Add user info to response
         result["requested_by"] = current_user.username
         return result
+    except HTTPException:
+        raise
+    except LLMQueueFullError as e:
+        _raise_llm_busy("Dispatch recommendations", e)
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Dispatch recommendations failed: AI providers unavailable ({e})",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Dispatch recommendations failed: {str(e)}"
         )
 
 
+# Fleet-wide dispatch planning endpoint
+@app.post("/api/dispatch/fleet")
+async def optimize_fleet_dispatch(
+    request: FleetOptimizationRequest,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_read_db_session),
+):
+    """
+    Plan dispatch for the whole fleet (Protected). Stations, depot weather and
+    the station prompt block are loaded once; per-truck plans run in parallel
+    and stream back as newline-delimited JSON in completion order, followed by
+    a summary line.
+    """
+    try:
+        trucks, missing, context = await llm_service.prepare_fleet_dispatch(
+            session, request.depot_location, request.truck_ids
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Fleet dispatch failed: {str(e)}"
+        )
+
+    max_concurrency = min(
+        request.max_concurrency or config.FLEET_MAX_CONCURRENCY,
+        config.FLEET_MAX_CONCURRENCY,
+    )
+
+    async def plan_lines():
+        started = time.perf_counter()
+        succeeded = 0
+        for truck_id in missing:
+            yield json.dumps(
+                {"type": "truck", "truck_id": truck_id, "status": "error", "error": "Truck not found"}
+            ) + "\n"
+        async for outcome in llm_service.stream_fleet_dispatch(
+            trucks, context, request.llm_model, max_concurrency
+        ):
+            if outcome["status"] == "ok":
+                succeeded += 1
+                result = route_response_dict(outcome["result"])
+                result["requested_by"] = current_user.username
+                outcome["result"] = result
+            yield json.dumps(outcome, default=str) + "\n"
+        yield json.dumps(
+            {
+                "type": "summary",
+                "depot_location": request.depot_location,
+                "trucks": len(trucks) + len(missing),
+                "succeeded": succeeded,
+                "failed": len(trucks) + len(missing) - succeeded,
+                "stations_considered": len(context.stations),
+                "duration_s": round(time.perf_counter() - started, 2),
+            }
+        ) + "\n"
+
+    return StreamingResponse(plan_lines(), media_type="application/x-ndjson")
+
+
 # Get available regions and cities for filtering
 @app.get("/api/dispatch/filters")
 async def get_dispatch_filters(
     current_user: User = Depends(get_current_active_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
 ):
     """Get available regions and cities for filtering dispatch recommendations (Protected)"""
     try:
@@ -681,3 +982,106 @@ async def get_dispatch_filters(
         )
 
 
+# ===== BACKGROUND JOB ENDPOINTS =====
+# Submit returns a job id immediately; a worker pool runs the optimization and
+# the result is polled from /api/jobs/{job_id} or streamed from .../stream.
+
+
+async def _route_optimization_job(job, session: AsyncSession):
+    result = await _optimize_route(RouteRequest(**job.params), session)
+    result["requested_by"] = job.submitted_by
+    return route_response_dict(result)
+
+
+async def _dispatch_optimization_job(job, session: AsyncSession):
+    result = await _optimize_dispatch(DispatchOptimizationRequest(**job.params), session)
+    result["requested_by"] = job.submitted_by
+    return route_response_dict(result)
+
+
+async def _dispatch_recommendations_job(job, session: AsyncSession):
+    result = await _dispatch_recommendations(
+        DispatchRecommendationsRequest(**job.params), session
+    )
+    result["requested_by"] = job.submitted_by
+    return result
+
+
+job_queue.register("route_optimization", _route_optimization_job)
+job_queue.register("dispatch_optimization", _dispatch_optimization_job)
+job_queue.register("dispatch_recommendations", _dispatch_recommendations_job)
+
+
+async def _submit_job(kind: str, request: BaseModel, current_user: User):
+    try:
+        job = await job_queue.submit(kind, request.model_dump(), current_user.username)
+    except Exception:
+        _raise_logged_http_500(f"Failed to submit {kind} job")
+    return {**job.to_api_dict(), "status_url": f"/api/jobs/{job.id}"}
+
+
+async def _get_owned_job(job_id: str, current_user: User):
+    job = await job_queue.get(job_id)
+    if job is None or job.submitted_by != current_user.username:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/jobs/routes/optimize", status_code=202)
+async def submit_route_optimization_job(
+    request: RouteRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Queue an AI route optimization and return its job id (Protected)"""
+    return await _submit_job("route_optimization", request, current_user)
+
+
+@app.post("/api/jobs/dispatch/optimize", status_code=202)
+async def submit_dispatch_optimization_job(
+    request: DispatchOptimizationRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Queue an AI dispatch optimization and return its job id (Protected)"""
+    return await _submit_job("dispatch_optimization", request, current_user)
+
+
+@app.post("/api/jobs/dispatch/recommendations", status_code=202)
+async def submit_dispatch_recommendations_job(
+    request: DispatchRecommendationsRequest,
+    current_user: User = Depends(get_current_active_user),
+):
+    """Queue AI batch dispatch recommendations and return the job id (Protected)"""
+    return await _submit_job("dispatch_recommendations", request, current_user)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    """Current status of a background job, with its result once finished (Protected)"""
+    job = await _get_owned_job(job_id, current_user)
+    return job.to_api_dict()
+
+
+@app.get("/api/jobs/{job_id}/stream")
+async def stream_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    """Server-sent events with every status change until the job finishes (Protected)"""
+    job = await _get_owned_job(job_id, current_user)
+
+    async def events():
+        current = job
+        last_update = None
+        while current is not None:
+            if current.updated_at != last_update:
+                last_update = current.updated_at
+                payload = json.dumps(current.to_api_dict(), default=str)
+                yield f"event: {current.status}\ndata: {payload}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if current.is_finished:
+                return
+            current = await job_queue.wait_for_change(job_id, last_update)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
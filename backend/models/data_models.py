@@ -1,6 +1,6 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 @dataclass
@@ -13,6 +13,9 @@ class WeatherData:
     wind_kph: float
     humidity: float
     location: Optional[str] = None
+    lat: Optional[float] = None  # Resolved coordinates of the location, if known
+    lon: Optional[float] = None
+    valid_at: Optional[datetime] = None  # Forecast hour; None for current conditions
 
     def __post_init__(self):
         """Set location alias"""
@@ -28,6 +31,8 @@ class WeatherData:
             condition=data["current"]["condition"]["text"],
             wind_kph=data["current"]["wind_kph"],
             humidity=data["current"]["humidity"],
+            lat=data["location"].get("lat"),
+            lon=data["location"].get("lon"),
         )
 
     def to_dict(self) -> Dict[str, Any]:
@@ -39,6 +44,7 @@ class WeatherData:
             "condition": self.condition,
             "wind_kph": self.wind_kph,
             "humidity": self.humidity,
+            **({"valid_at": self.valid_at.isoformat()} if self.valid_at else {}),
         }
 
     def to_db_dict(self) -> Dict[str, Any]:
@@ -49,6 +55,8 @@ class WeatherData:
             "condition": self.condition,
             "wind": self.wind_kph,  # DB field name
             "humidity": self.humidity,
+            "lat": self.lat,
+            "lon": self.lon,
             "collected_at": datetime.now(),
         }
 
@@ -235,6 +243,139 @@ class TruckData:
         }
 
 
+@dataclass
+class Place:
+    """Canonical location resolved by the gazetteer"""
+
+    city: str
+    region: str
+    lat: float
+    lon: float
+    country: Optional[str] = None
+    source: str = "bundled"  # "bundled" city list or "stations" centroid
+    population: int = 0
+    station_count: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.city}, {self.region}"
+
+    @property
+    def point(self) -> Tuple[float, float]:
+        return (self.lat, self.lon)
+
+
+@dataclass
+class TravelCost:
+    """Road distance and drive time between two points"""
+
+    distance_km: float
+    duration_min: float
+    source: str = "tomtom"  # "tomtom" or "estimate" (haversine fallback)
+
+
+@dataclass
+class SeriesPoint:
+    """One point of a metric history: a raw reading or a rollup bucket"""
+
+    t: datetime  # Reading time, or bucket start for rollups
+    avg: float
+    min: float
+    max: float
+    last: float
+    samples: int = 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "t": self.t.isoformat(),
+            "avg": round(self.avg, 3),
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+            "samples": self.samples,
+        }
+
+
+@dataclass
+class DispatchContext:
+    """Dispatch inputs shared by every truck planned from the same depot"""
+
+    depot_location: str
+    stations: List[StationData]
+    depot_weather: WeatherData
+    stations_prompt: Optional[str] = None  # Pre-formatted station block
+    # Station-to-station travel costs keyed by (from station id, to station id)
+    travel_costs: Optional[Dict[Tuple[int, int], TravelCost]] = None
+    # Depot coordinates (gazetteer, else the weather lookup); None if unknown
+    depot_point: Optional[Tuple[float, float]] = None
+    # Locally collected weather keyed by station id (stations without a reading omitted)
+    station_weather: Optional[Dict[int, WeatherData]] = None
+
+
+@dataclass
+class JobRecord:
+    """Background optimization job tracked by the job queue"""
+
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    submitted_by: str
+    status: str = "queued"  # queued, running, succeeded, failed, cancelled
+    created_at: float = 0.0  # Unix timestamps
+    updated_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    run_after: Optional[float] = None  # requeued jobs are not claimed before this
+    requeues: int = 0
+
+    TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in self.TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-serializable dictionary (used by job stores)"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "submitted_by": self.submitted_by,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "run_after": self.run_after,
+            "requeues": self.requeues,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "JobRecord":
+        return cls(**data)
+
+    def to_api_dict(self) -> Dict[str, Any]:
+        """Convert to API response format"""
+
+        def iso(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
 class DatabaseResult:
     """Container for all database query results"""
 
@@ -18,6 +18,9 @@ from sqlalchemy import (
     TIMESTAMP,
     ForeignKey,
     Index,
+    Double,
+    JSON,
+    SmallInteger,
     UniqueConstraint,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -89,6 +92,9 @@ class Station(Base):
         "StationFuelLevel", back_populates="station", cascade="all, delete-orphan"
     )
 
+    # Location lookups resolve to exact (city, region) pairs
+    __table_args__ = (Index("idx_station_city_region", "city", "region"),)
+
 
 class Truck(Base):
     """Truck model."""
@@ -167,6 +173,12 @@ class StationFuelLevel(Base):
         "Station", back_populates="fuel_levels"
     )
 
+    __table_args__ = (
+        # Per-station history and time-based retention
+        Index("idx_fuel_level_station_recorded", "station_id", "recorded_at"),
+        Index("idx_fuel_level_recorded", "recorded_at"),
+    )
+
 
 class TruckCompartment(Base):
     """Truck compartment model."""
@@ -207,4 +219,83 @@ class WeatherData(Base):
     condition: Mapped[Optional[str]] = mapped_column(Text)
     wind: Mapped[Optional[float]] = mapped_column(DECIMAL(5, 2))
     humidity: Mapped[Optional[float]] = mapped_column(DECIMAL(5, 2))
+    # Position the reading was fetched for (grid-cell lookups)
+    lat: Mapped[Optional[float]] = mapped_column(DECIMAL(9, 6))
+    lon: Mapped[Optional[float]] = mapped_column(DECIMAL(9, 6))
     collected_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP)
+
+    __table_args__ = (
+        Index("idx_weather_city_collected", "city", "collected_at"),
+        # Recent readings for the weather sync
+        Index("idx_weather_collected", "collected_at"),
+    )
+
+
+class WeatherForecast(Base):
+    """Hourly forecast for one place, stored as columnar series (one row per fetch)."""
+
+    __tablename__ = "weather_forecasts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    city: Mapped[Optional[str]] = mapped_column(String(100))
+    lat: Mapped[float] = mapped_column(DECIMAL(9, 6))
+    lon: Mapped[float] = mapped_column(DECIMAL(9, 6))
+    start_time: Mapped[datetime] = mapped_column(DateTime)  # First forecast hour (UTC)
+    hours: Mapped[int] = mapped_column(SmallInteger)
+    # Parallel hourly arrays: temp_c, wind_kph, humidity, precip_mm,
+    # chance_of_rain, plus condition texts and per-hour indexes into them
+    series: Mapped[dict] = mapped_column(JSON)
+    fetched_at: Mapped[datetime] = mapped_column(TIMESTAMP)
+
+    __table_args__ = (Index("idx_forecast_fetched", "fetched_at"),)
+
+
+class MetricRollup(Base):
+    """Hourly/daily aggregates of a raw time-series metric (see services/rollup_service.py)."""
+
+    __tablename__ = "metric_rollups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    source: Mapped[str] = mapped_column(String(32))  # Raw table, e.g. "station_fuel_levels"
+    metric: Mapped[str] = mapped_column(String(32))  # Raw column, e.g. "fuel_level_liters"
+    series_key: Mapped[str] = mapped_column(String(100))  # Station id or city
+    resolution: Mapped[str] = mapped_column(Enum("hour", "day", name="rollup_resolution_enum"))
+    bucket_start: Mapped[datetime] = mapped_column(DateTime)
+    samples: Mapped[int] = mapped_column(Integer)
+    min_value: Mapped[float] = mapped_column(Double)
+    max_value: Mapped[float] = mapped_column(Double)
+    sum_value: Mapped[float] = mapped_column(Double)
+    last_value: Mapped[float] = mapped_column(Double)
+    last_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (
+        # Also serves history reads: series + resolution + time range
+        UniqueConstraint(
+            "source", "metric", "series_key", "resolution", "bucket_start",
+            name="uq_rollup_bucket",
+        ),
+        Index("idx_rollup_resolution_bucket", "resolution", "bucket_start"),
+    )
+
+
+class RollupWatermark(Base):
+    """Highest raw row id already folded into metric_rollups, per source table."""
+
+    __tablename__ = "rollup_watermarks"
+
+    source: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+
+
+class DispatchPlan(Base):
+    """Precomputed dispatch plan shared by every API process (see services/dispatch_planner.py)."""
+
+    __tablename__ = "dispatch_plans"
+
+    truck_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    depot_key: Mapped[str] = mapped_column(String(255), primary_key=True)  # Normalized depot
+    llm_model: Mapped[str] = mapped_column(String(100), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(40))  # Inputs the plan was built from
+    result: Mapped[dict] = mapped_column(JSON)
+    computed_at: Mapped[float] = mapped_column(Double)  # Unix timestamp
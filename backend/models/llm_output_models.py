@@ -0,0 +1,111 @@
+"""
+Pydantic schemas for structured LLM output.
+
+These models are handed to LangChain's ``with_structured_output`` so providers
+return JSON (via JSON-schema or tool calling) that validates straight into the
+shapes our API responses already use. Field names mirror the keys produced by
+the markdown parsers in ``LLMService`` so both paths feed the same builders.
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class RouteSummaryOutput(BaseModel):
+    """Route summary block of a route optimization answer"""
+
+    total_distance: Optional[str] = Field(None, description="e.g. '1,234 km'")
+    estimated_duration: Optional[str] = Field(None, description="e.g. '12 hours 30 minutes'")
+    duration_with_traffic: Optional[str] = None
+    primary_route: Optional[str] = Field(None, description="Highway/road names")
+    route_type: Optional[str] = Field(None, description="Fastest/Shortest/Most Fuel Efficient")
+    weather_impact: Optional[str] = None
+    fuel_stops: Optional[str] = Field(None, description="e.g. '2 stops'")
+    estimated_fuel_cost: Optional[str] = Field(None, description="e.g. '$450.00'")
+    best_departure_time: Optional[str] = Field(None, description="12-hour format, e.g. '6:00 AM'")
+    recommended_arrival_time: Optional[str] = Field(None, description="12-hour format, e.g. '2:30 PM'")
+
+
+class DirectionStepOutput(BaseModel):
+    """A single turn-by-turn direction"""
+
+    instruction: str
+    distance: Optional[str] = Field(None, description="e.g. '15.2 km'")
+    duration: Optional[str] = Field(None, description="e.g. '18 min'")
+
+
+class TrafficConditionsOutput(BaseModel):
+    """Traffic conditions block of a route optimization answer"""
+
+    current_traffic: Optional[str] = Field(None, description="Light/Moderate/Heavy")
+    typical_time: Optional[str] = None
+    best_departure: Optional[str] = None
+    delays: Optional[str] = None
+
+
+class RouteOptimizationOutput(BaseModel):
+    """Structured answer for comprehensive route optimization"""
+
+    route_summary: RouteSummaryOutput
+    directions: List[DirectionStepOutput] = Field(default_factory=list)
+    traffic_conditions: TrafficConditionsOutput = Field(
+        default_factory=TrafficConditionsOutput
+    )
+    analysis: str = Field(
+        "", description="Full human-readable analysis and recommendations (markdown)"
+    )
+
+
+class DispatchSummaryOutput(BaseModel):
+    """Dispatch summary block of a dispatch optimization answer"""
+
+    total_stations: Optional[str] = None
+    total_distance: Optional[str] = Field(None, description="e.g. '320 km'")
+    estimated_duration: Optional[str] = None
+    total_fuel: Optional[str] = Field(None, description="e.g. '24,000 L'")
+    departure_time: Optional[str] = None
+    return_time: Optional[str] = None
+
+
+class DispatchStopOutput(BaseModel):
+    """A single stop in an optimized dispatch route"""
+
+    step_number: int = Field(..., ge=1, description="1-based visiting order")
+    station: str = Field(..., description="Station name, code and city")
+    distance: Optional[str] = Field(None, description="Distance from previous stop")
+    fuel_delivery: Optional[str] = Field(None, description="Volume and fuel type")
+    eta: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class DispatchOptimizationOutput(BaseModel):
+    """Structured answer for single-truck dispatch optimization"""
+
+    dispatch_summary: DispatchSummaryOutput
+    route_stops: List[DispatchStopOutput] = Field(default_factory=list)
+    analysis: str = Field(
+        "", description="Rationale, compartment allocation and safety notes (markdown)"
+    )
+
+
+class BatchRecommendationOutput(BaseModel):
+    """One truck-to-route recommendation in a batch dispatch answer"""
+
+    truck_code: str
+    priority: Optional[str] = Field(None, description="Critical/High/Medium")
+    station_count: Optional[str] = None
+    route_summary: Optional[str] = Field(None, description="Station 1 → Station 2 → ...")
+    total_distance: Optional[str] = None
+    estimated_duration: Optional[str] = None
+    total_fuel_delivery: Optional[str] = None
+    rationale: Optional[str] = None
+
+
+class BatchDispatchOutput(BaseModel):
+    """Structured answer for batch dispatch recommendations"""
+
+    executive_summary: str = ""
+    recommendations: List[BatchRecommendationOutput] = Field(default_factory=list)
+    analysis: str = Field(
+        "", description="Efficiency analysis and implementation notes (markdown)"
+    )
@@ -0,0 +1,169 @@
+"""
+Connection pool instrumentation.
+
+Engines are created with `InstrumentedPool`, which times how long each
+checkout waits for a connection, and `instrument()` adds listeners that time
+new connections and the liveness ping done on checkout.
+
+The ping replaces SQLAlchemy's `pool_pre_ping` so it can be measured and
+tuned (DB_POOL_PRE_PING): "always" pings on every checkout, "idle" only
+connections unused for DB_POOL_PRE_PING_IDLE_S, "off" never. A failed ping
+discards the connection and the pool hands out a fresh one.
+"""
+
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Deque, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import config
+
+class Histogram:
+    """Latency histogram with fixed millisecond buckets plus recent percentiles"""
+
+    BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, window: int = 1000):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total_s = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.BOUNDS_MS, seconds * 1000)] += 1
+        self.total_s += seconds
+        self._recent.append(seconds)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def stats(self) -> Dict[str, Any]:
+        count = self.count
+        recent = sorted(self._recent)
+
+        def pct(p: float):
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 2)
+
+        labels = [f"le_{b}ms" for b in self.BOUNDS_MS] + [f"gt_{self.BOUNDS_MS[-1]}ms"]
+        return {
+            "count": count,
+            "mean_ms": round(self.total_s / count * 1000, 2) if count else None,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PoolMetrics:
+    """Counters and latency histograms for one engine's pool"""
+
+    def __init__(self):
+        self.wait = Histogram()
+        self.connect = Histogram()
+        self.ping = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.ping_failures = 0
+        self.peak_checked_out = 0
+
+    def stats(self, pool) -> Dict[str, Any]:
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait": self.wait.stats(),
+            "connect": self.connect.stats(),
+            "pre_ping": dict(self.ping.stats(), failures=self.ping_failures),
+        }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection"""
+
+    # Log under sqlalchemy.pool (quiet by default) like the stock pool
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        # Opening a new connection is reported as connect time, not waiting
+        waited = time.perf_counter() - started - record.info.pop("connect_s", 0.0)
+        self.metrics.wait.observe(max(0.0, waited))
+        self.metrics.checkouts += 1
+        self.metrics.peak_checked_out = max(self.metrics.peak_checked_out, self.checkedout())
+        return record
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep the counters
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def instrument(engine: AsyncEngine) -> PoolMetrics:
+    """Attach metrics and the configured pre-ping strategy to `engine`'s pool"""
+    sync_engine = engine.sync_engine
+    metrics = PoolMetrics()
+    sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "do_connect")
+    def timed_connect(dialect, connection_record, cargs, cparams):
+        started = time.perf_counter()
+        connection = dialect.connect(*cargs, **cparams)
+        elapsed = time.perf_counter() - started
+        metrics.connect.observe(elapsed)
+        connection_record.info["connect_s"] = elapsed
+        return connection
+
+    @event.listens_for(sync_engine, "checkin")
+    def mark_idle(dbapi_connection, connection_record):
+        connection_record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def pre_ping(dbapi_connection, connection_record, connection_proxy):
+        # Left over when a recycled or invalidated connection reconnected
+        connection_record.info.pop("connect_s", None)
+        idle_since = connection_record.info.pop("idle_since", None)
+        if idle_since is None or config.DB_POOL_PRE_PING == "off":
+            return  # freshly connected, or pinging disabled
+        if (
+            config.DB_POOL_PRE_PING == "idle"
+            and time.monotonic() - idle_since < config.DB_POOL_PRE_PING_IDLE_S
+        ):
+            return
+        started = time.perf_counter()
+        try:
+            alive = sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            alive = False
+        metrics.ping.observe(time.perf_counter() - started)
+        if not alive:
+            metrics.ping_failures += 1
+            # The pool invalidates this connection and retries with a new one
+            raise exc.DisconnectionError("Connection failed pre-ping")
+
+    return metrics
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    """Metrics for `engine`'s pool (just its status if it is not instrumented)"""
+    pool = engine.sync_engine.pool
+    metrics = getattr(pool, "metrics", None)
+    return metrics.stats(pool) if metrics is not None else {"status": pool.status()}
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from services.llm_service import LLMService
-from typing import Optional
+from services.auth_service import get_current_active_user
+from models.auth_models import User
+from database import get_db_session
+from config import config
+from utils.serializers import route_response_dict
+from typing import List, Optional
 
 
 router = APIRouter(prefix="/api/v1", tags=["Optimization"])
@@ -13,16 +19,34 @@ class Input(BaseModel):
     vehicle_type: Optional[str] = Field("truck", description="vehicle type")
     notes: Optional[str] = Field(None, description="Additional constraints")
 
+
+class BatchInput(BaseModel):
+    lanes: List[Input] = Field(
+        ...,
+        min_length=1,
+        max_length=config.BATCH_ROUTE_MAX_LANES,
+        description="Routes to optimize",
+    )
+    llm_model: str = Field(default="gemini-2.5-flash", description="AI model to use")
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="Lanes optimized in parallel (capped by server config)"
+    )
+
 llm_service = LLMService()
 
 @router.post("/input")
-async def optimize_route(data: Input):
+async def optimize_route(
+    data: Input,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_db_session),
+):
 
-    try: 
+    try:
 
         result = await llm_service.optimize_route(
              from_location=data.from_location,
              to_location=data.to_location,
+             session=session,
              delivery_date=data.delivery_date,
              vehicle_type=data.vehicle_type,
              notes=data.notes
@@ -32,4 +56,42 @@ async def optimize_route(data: Input):
         return(result)
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/input/batch")
+async def optimize_routes_batch(
+    data: BatchInput,
+    current_user: User = Depends(get_current_active_user),
+    session: AsyncSession = Depends(get_db_session),
+):
+    """
+    Optimize many lanes in one request (Protected). Results come back in
+    submission order; a failed lane carries its own error instead of
+    failing the batch.
+    """
+    max_concurrency = min(
+        data.max_concurrency or config.BATCH_ROUTE_CONCURRENCY,
+        config.BATCH_ROUTE_CONCURRENCY,
+    )
+    try:
+        outcomes = await llm_service.optimize_routes_batch(
+            session,
+            [lane.model_dump() for lane in data.lanes],
+            data.llm_model,
+            max_concurrency,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for outcome in outcomes:
+        if outcome["status"] == "ok":
+            outcome["result"] = route_response_dict(outcome["result"])
+    succeeded = sum(1 for outcome in outcomes if outcome["status"] == "ok")
+    return {
+        "results": outcomes,
+        "total": len(outcomes),
+        "succeeded": succeeded,
+        "failed": len(outcomes) - succeeded,
+        "requested_by": current_user.username,
+    }
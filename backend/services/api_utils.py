@@ -1,27 +1,73 @@
 from typing import Tuple, Dict, Any, List, Optional
+import logging
+import time
 import httpx
 from models.data_models import WeatherData
 from config import config
+from .route_cache import route_cache, route_cache_key
+from .upstream import tomtom_upstream, weather_upstream
+
+_logger = logging.getLogger(__name__)
+
+
+# Last good reading per city, served while WeatherAPI is failing
+_last_weather: Dict[str, Tuple[float, WeatherData]] = {}
 
 
 async def get_weather_async(city: str) -> WeatherData:
-    """Async: Get current weather for a city using httpx AsyncClient."""
+    """
+    Async: Get current weather for a city through the shared WeatherAPI client.
+    If the API fails (or its circuit is open) a reading for the same city from
+    the last WEATHER_STALE_MAX_S seconds is returned instead.
+    """
     if city is None or not str(city).strip():
         raise ValueError("City parameter must not be None or empty.")
 
     url = "https://api.weatherapi.com/v1/current.json"
     params = {"key": config.WEATHER_API_KEY, "q": city, "aqi": "no"}
+    city_key = " ".join(str(city).split()).casefold()
 
-    async with httpx.AsyncClient() as client:
+    try:
         try:
-            resp = await client.get(url, params=params, timeout=10.0)
+            resp = await weather_upstream.get(url, params=params)
             resp.raise_for_status()
-            data = resp.json()
-            return WeatherData.from_api_response(data)
+            weather = WeatherData.from_api_response(resp.json())
         except httpx.HTTPError as e:
             raise Exception(f"Weather API request failed: {str(e)}")
-        except ValueError as e:
+        except (ValueError, KeyError) as e:
             raise Exception(f"Weather API response parsing failed: {str(e)}")
+    except Exception as e:
+        stale = _last_weather.get(city_key)
+        if stale is not None and time.monotonic() - stale[0] <= config.WEATHER_STALE_MAX_S:
+            _logger.warning("Serving last known weather for %s: %s", city, e)
+            return stale[1]
+        raise
+
+    _last_weather[city_key] = (time.monotonic(), weather)
+    return weather
+
+
+async def get_forecast_async(query: str, days: int) -> Dict[str, Any]:
+    """
+    Async: Get the hourly forecast for a place (city name or "lat,lon") for
+    the next `days` days. Returns the raw WeatherAPI forecast.json response.
+    """
+    url = "https://api.weatherapi.com/v1/forecast.json"
+    params = {
+        "key": config.WEATHER_API_KEY,
+        "q": query,
+        "days": days,
+        "aqi": "no",
+        "alerts": "no",
+    }
+    try:
+        resp = await weather_upstream.get(url, params=params)
+        resp.raise_for_status()
+        return resp.json()
+    except httpx.HTTPError as e:
+        raise Exception(f"Weather forecast request failed: {str(e)}")
+    except ValueError as e:
+        raise Exception(f"Weather forecast response parsing failed: {str(e)}")
 
 
 # TOMTOM ROUTING API
@@ -39,8 +85,14 @@ async def calculate_route_async(
     waypoints: list of (lat, lon) intermediate points, or None
     options: extra params like travelMode, routeType, traffic, etc.
 
-    Returns: parsed JSON, or raises exception
+    Returns: parsed JSON, or raises exception. Responses are served from
+    route_cache when an equivalent leg was fetched recently; treat the
+    returned dict as read-only.
     """
+    cache_key, traffic = route_cache_key(origin, destination, waypoints, options)
+    cached = route_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     # Build the locations path
     parts = []
@@ -64,15 +116,54 @@ async def calculate_route_async(
     # Add/override with options provided
     params.update(options)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url, params=params, timeout=30.0)
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.HTTPError as e:
-            raise Exception(f"TomTom routing API request failed: {str(e)}")
-        except ValueError as e:
-            raise Exception(f"TomTom routing API response parsing failed: {str(e)}")
+    try:
+        resp = await tomtom_upstream.get(url, params=params)
+        resp.raise_for_status()
+        route = resp.json()
+    except httpx.HTTPError as e:
+        raise Exception(f"TomTom routing API request failed: {str(e)}")
+    except ValueError as e:
+        raise Exception(f"TomTom routing API response parsing failed: {str(e)}")
+
+    await route_cache.set(cache_key, route, traffic)
+    return route
+
+
+async def calculate_matrix_async(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]],
+    **options,
+) -> Dict[str, Any]:
+    """
+    Call TomTom's synchronous Matrix Routing v2 API.
+
+    origins / destinations: lists of (lat, lon)
+    options: matrix options like travelMode, routeType, traffic, departAt
+
+    Returns parsed JSON (cells under "data"), or raises exception
+    """
+
+    def points(coords):
+        return [{"point": {"latitude": lat, "longitude": lon}} for lat, lon in coords]
+
+    url = "https://api.tomtom.com/routing/matrix/2"
+    body = {
+        "origins": points(origins),
+        "destinations": points(destinations),
+        "options": {"routeType": "fastest", "traffic": "historical", **options},
+    }
+
+    try:
+        # Synchronous matrix requests are read-only, so they are safe to retry
+        resp = await tomtom_upstream.post(
+            url, params={"key": config.TOMTOM_API_KEY}, json=body, idempotent=True
+        )
+        resp.raise_for_status()
+        return resp.json()
+    except httpx.HTTPError as e:
+        raise Exception(f"TomTom matrix API request failed: {str(e)}")
+    except ValueError as e:
+        raise Exception(f"TomTom matrix API response parsing failed: {str(e)}")
 
 
 async def calculate_reachable_range_async(
@@ -116,14 +207,13 @@ async def calculate_reachable_range_async(
     # Add the optional parameters
     params.update(options)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url, params=params, timeout=30.0)
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.HTTPError as e:
-            raise Exception(f"TomTom reachable range API request failed: {str(e)}")
-        except ValueError as e:
-            raise Exception(
-                f"TomTom reachable range API response parsing failed: {str(e)}"
-            )
+    try:
+        resp = await tomtom_upstream.get(url, params=params)
+        resp.raise_for_status()
+        return resp.json()
+    except httpx.HTTPError as e:
+        raise Exception(f"TomTom reachable range API request failed: {str(e)}")
+    except ValueError as e:
+        raise Exception(
+            f"TomTom reachable range API response parsing failed: {str(e)}"
+        )
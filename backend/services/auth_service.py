@@ -1,6 +1,7 @@
 import jwt
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from pwdlib import PasswordHash
@@ -10,7 +11,7 @@ from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from models.auth_models import TokenData, User as UserResponse
 from models.database_models import User
-from database import get_db_session
+from database import db_manager
 from config import config
 import logging
 
@@ -34,6 +35,10 @@ class AuthService:
             # Fallback: if hashing fails for some reason, store None and
             # handle it defensively in authenticate_user.
             self._fake_hashed = None
+        # username -> (cached_at, user) so authenticated requests don't need
+        # a database session; see get_cached_user
+        self._users: Dict[str, Tuple[float, UserResponse]] = {}
+        self._cache_counts = {"hits": 0, "misses": 0}
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
@@ -185,12 +190,42 @@ class AuthService:
         )
         return encoded_jwt
 
-    async def get_current_user(
-        self,
-        token: str = Depends(oauth2_scheme),
-        session: AsyncSession = Depends(get_db_session),
-    ) -> UserResponse:
-        """Get current user from JWT token using SQLAlchemy 2.0"""
+    async def get_cached_user(self, username: str) -> Optional[UserResponse]:
+        """
+        User for an authenticated request, from a cache kept for
+        AUTH_USER_CACHE_TTL_S (so deactivation can take that long to apply).
+        Only a miss opens a session and checks out a pool connection.
+        """
+        cached = self._users.get(username)
+        if cached is not None and time.monotonic() - cached[0] < config.AUTH_USER_CACHE_TTL_S:
+            self._cache_counts["hits"] += 1
+            return cached[1]
+        self._cache_counts["misses"] += 1
+
+        async with db_manager.get_session() as session:
+            user = await self.get_user_by_username(session=session, username=username)
+        if user is None:
+            self._users.pop(username, None)
+            return None
+        # Convert SQLAlchemy model to Pydantic response model
+        response = UserResponse(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
+        if config.AUTH_USER_CACHE_TTL_S > 0:
+            if username not in self._users and len(self._users) >= config.AUTH_USER_CACHE_MAX:
+                del self._users[next(iter(self._users))]  # oldest entry
+            self._users[username] = (time.monotonic(), response)
+        return response
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {**self._cache_counts, "cached_users": len(self._users)}
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme)) -> UserResponse:
+        """Get current user from JWT token (database only on a cache miss)"""
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -220,20 +255,10 @@ class AuthService:
         except (InvalidTokenError, DecodeError, Exception):
             raise credentials_exception
 
-        user = await self.get_user_by_username(
-            session=session, username=token_data.username
-        )
+        user = await self.get_cached_user(token_data.username)
         if user is None:
             raise credentials_exception
-
-        # Convert SQLAlchemy model to Pydantic response model
-        return UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            is_active=user.is_active,
-            created_at=user.created_at,
-        )
+        return user
 
     async def get_current_active_user(self, current_user: UserResponse) -> UserResponse:
         """Get current active user"""
@@ -247,11 +272,9 @@ auth_service = AuthService()
 
 
 # Export dependency functions for use in routes
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_db_session)
-) -> UserResponse:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserResponse:
     """Dependency to get current user"""
-    return await auth_service.get_current_user(token, session)
+    return await auth_service.get_current_user(token)
 
 
 async def get_current_active_user(
@@ -0,0 +1,131 @@
+"""
+Grounds LLM dispatch plans in real road distances and drive times.
+
+The stops in a parsed dispatch plan carry whatever distances and ETAs the
+model wrote. This stage resolves each stop to a station through a code
+index, then sends the whole trip (depot -> stops -> depot, when the depot
+position is known) to TomTom as one calculateRoute call with the stops as
+waypoints. Per-leg road distance, drive time and arrival time are attached
+to the stops. With DISPATCH_ROUTE_BEST_ORDER, TomTom is also asked to
+reorder the stops (computeBestOrder) and the plan follows its order.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from models.data_models import StationData
+from .api_utils import calculate_route_async
+from .response_parser import PARENTHESIZED_RE
+
+_logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+_TOKEN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class StationIndex:
+    """Resolves the free-text station in a plan stop to a StationData"""
+
+    def __init__(self, stations: List[StationData]):
+        self._by_code = {s.code.casefold(): s for s in stations if s.code}
+        self._by_name = {s.name.casefold(): s for s in stations if s.name}
+
+    def resolve(self, text: str) -> Optional[StationData]:
+        if not text:
+            return None
+        # Prompts render stations as "Name (CODE)", so try parentheses first
+        for candidate in PARENTHESIZED_RE.findall(text) + _TOKEN.findall(text):
+            station = self._by_code.get(candidate.strip().casefold())
+            if station is not None:
+                return station
+        lowered = text.casefold()
+        for name, station in self._by_name.items():
+            if name in lowered:
+                return station
+        return None
+
+
+def _leg_summary(leg: Dict[str, Any]) -> Dict[str, Any]:
+    summary = leg.get("summary", {})
+    return {
+        "road_distance_km": round(summary.get("lengthInMeters", 0) / 1000, 1),
+        "drive_time_min": round(summary.get("travelTimeInSeconds", 0) / 60, 1),
+        "arrival_time": summary.get("arrivalTime"),
+    }
+
+
+async def ground_dispatch_plan(
+    plan: Dict[str, Any],
+    stations: List[StationData],
+    depot: Optional[Point] = None,
+) -> Dict[str, Any]:
+    """
+    Attach TomTom leg distances/times to plan["route_stops"] in place and add
+    a "route_grounding" summary. Never raises; failures are recorded instead.
+    """
+    stops = plan.get("route_stops") or []
+    index = StationIndex(stations)
+    matched: List[Tuple[Dict[str, Any], StationData]] = []
+    unmatched = []
+    for stop in stops:
+        station = index.resolve(stop.get("station", ""))
+        if station is None:
+            unmatched.append(stop.get("station"))
+        else:
+            matched.append((stop, station))
+
+    points = [(float(s.lat), float(s.lon)) for _, s in matched]
+    if depot is not None:
+        points = [depot, *points, depot]
+    if len(points) < 2:
+        plan["route_grounding"] = {"status": "skipped", "unmatched_stops": unmatched}
+        return plan
+
+    best_order = config.DISPATCH_ROUTE_BEST_ORDER and depot is not None and len(matched) > 1
+    options = {"travelMode": "truck"}
+    if best_order:
+        options["computeBestOrder"] = "true"
+    try:
+        response = await calculate_route_async(
+            origin=points[0],
+            destination=points[-1],
+            waypoints=points[1:-1] or None,
+            **options,
+        )
+        route = response["routes"][0]
+        legs = route["legs"]
+    except Exception as e:
+        _logger.warning("Dispatch route grounding failed: %s", e)
+        plan["route_grounding"] = {"status": "failed", "error": str(e)}
+        return plan
+
+    if best_order and response.get("optimizedWaypoints"):
+        order = sorted(response["optimizedWaypoints"], key=lambda w: w["optimizedIndex"])
+        matched = [matched[w["providedIndex"]] for w in order]
+        plan["route_stops"] = [stop for stop, _ in matched] + [
+            stop for stop in stops if all(stop is not m for m, _ in matched)
+        ]
+
+    # With a depot, leg i ends at stop i and the final leg returns to the depot;
+    # without one, the first stop is the origin and has no inbound leg
+    offset = 0 if depot is not None else -1
+    for i, (stop, station) in enumerate(matched):
+        stop["station_code"] = station.code
+        leg_index = i + offset
+        if 0 <= leg_index < len(legs):
+            stop.update(_leg_summary(legs[leg_index]))
+
+    summary = route.get("summary", {})
+    plan["route_grounding"] = {
+        "status": "ok",
+        "source": "tomtom",
+        "total_distance_km": round(summary.get("lengthInMeters", 0) / 1000, 1),
+        "total_drive_time_min": round(summary.get("travelTimeInSeconds", 0) / 60, 1),
+        "return_leg": _leg_summary(legs[-1]) if depot is not None else None,
+        "stop_order": "optimized" if best_order else "as_planned",
+        "unmatched_stops": unmatched,
+    }
+    return plan
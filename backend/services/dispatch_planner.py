@@ -0,0 +1,356 @@
+"""
+Background pre-computation of dispatch plans.
+
+Active trucks and low-fuel stations change slowly, so the planner periodically
+computes a dispatch plan for every active truck and stores it in the
+dispatch_plans table, where every API process reads it. Each plan is
+tagged with a fingerprint of the inputs it was built from (the truck's
+compartment levels and the levels of every station needing fuel); a plan is
+served only while it is younger than DISPATCH_PLAN_TTL_S and its fingerprint
+still matches the database. Recomputations are staggered across the refresh
+interval, bounded by a semaphore and sent to the LLM at background priority
+so interactive requests always go first.
+
+Only one API process plans at a time: the planner loop runs while its
+process holds a MySQL advisory lock (GET_LOCK), so N processes or replicas
+do not multiply the LLM spend. The lock lives on a one-connection engine of
+its own and never takes a connection from the request pool. Plans computed
+on demand by any process are written to the same table.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from config import config
+from database import create_pooled_engine, db_manager, mysql_url
+from models.data_models import DispatchContext, StationData, TruckData
+from models.database_models import DispatchPlan
+from .llm_scheduler import PRIORITY_BACKGROUND
+from .llm_service import LLMService
+
+_logger = logging.getLogger(__name__)
+
+# (truck id, normalized depot, model)
+PlanKey = Tuple[int, str, str]
+
+# Advisory lock held by the one process that runs the planner loop
+LEADER_LOCK = "managepetro.dispatch_planner"
+
+
+class PlanLookup:
+    """Outcome of a cache lookup; pass it back to store() after computing"""
+
+    def __init__(self, key: PlanKey, fingerprint: str, plan: Optional[Dict[str, Any]]):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.plan = plan
+
+
+def plan_fingerprint(truck: TruckData, stations: List[StationData]) -> str:
+    """Hash of the dispatch inputs that invalidate a plan when they change"""
+    payload = {
+        "truck": [
+            truck.status,
+            truck.fuel_level_percent,
+            sorted(
+                (c["compartment_number"], c["fuel_type"], c["current_level_liters"])
+                for c in truck.compartments or []
+            ),
+        ],
+        "stations": sorted(
+            (s.id, float(s.current_level_liters or 0)) for s in stations
+        ),
+    }
+    return hashlib.sha1(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class DispatchPlanner:
+    """Periodically refreshes cached dispatch plans for all active trucks"""
+
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self._llm = llm_service or LLMService()
+        self._task: Optional[asyncio.Task] = None
+        self._lock_engine: Optional[AsyncEngine] = None
+        self._leader_conn: Optional[AsyncConnection] = None
+        self._counts = {"hits": 0, "misses": 0, "invalidated": 0, "computed": 0, "failed": 0}
+        self._last_cycle: Dict[str, Any] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return config.DISPATCH_PLANNER_ENABLED
+
+    @staticmethod
+    def _depot_key(depot_location: str) -> str:
+        return " ".join(depot_location.split()).casefold()
+
+    def _key(self, truck_id: int, depot_location: str, llm_model: str) -> PlanKey:
+        return (truck_id, self._depot_key(depot_location), llm_model)
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            # Holds the leader lock's connection, outside the request pool
+            self._lock_engine = create_pooled_engine(
+                mysql_url(config.DB_HOST, config.DB_PORT), pool_size=1, max_overflow=0
+            )
+            self._task = asyncio.create_task(self._run())
+            _logger.info(
+                "Dispatch planner started (every %ss, depot %s)",
+                config.DISPATCH_PLANNER_INTERVAL_S,
+                config.DISPATCH_PLANNER_DEPOT,
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._release_leadership()
+        if self._lock_engine is not None:
+            await self._lock_engine.dispose()
+            self._lock_engine = None
+
+    async def _is_leader(self) -> bool:
+        """Keep (or try to take) the planner lock, held as long as its connection"""
+        if self._leader_conn is not None:
+            try:
+                held = await self._leader_conn.scalar(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"),
+                    {"name": LEADER_LOCK},
+                )
+                await self._leader_conn.commit()
+                if held:
+                    return True
+            except Exception as e:
+                _logger.warning("Dispatch planner lost its leader connection: %s", e)
+            await self._release_leadership()
+
+        conn = await self._lock_engine.connect()
+        try:
+            acquired = await conn.scalar(
+                text("SELECT GET_LOCK(:name, 0)"), {"name": LEADER_LOCK}
+            )
+            await conn.commit()
+        except BaseException:
+            await conn.close()
+            raise
+        if acquired != 1:
+            await conn.close()
+            return False
+        self._leader_conn = conn
+        _logger.info("Dispatch planner is the leader in this process")
+        return True
+
+    async def _release_leadership(self):
+        conn, self._leader_conn = self._leader_conn, None
+        if conn is None:
+            return
+        try:
+            await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LEADER_LOCK})
+        except Exception:
+            pass  # closing the connection releases the lock anyway
+        finally:
+            await conn.close()
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._is_leader():
+                    await self.refresh_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("Dispatch planner cycle failed")
+            await asyncio.sleep(config.DISPATCH_PLANNER_INTERVAL_S)
+
+    async def refresh_all(self):
+        """Recompute plans that are missing, expired or built from stale inputs"""
+        started = time.perf_counter()
+        depot, model = config.DISPATCH_PLANNER_DEPOT, config.DISPATCH_PLANNER_MODEL
+        async with db_manager.get_read_session() as session:
+            trucks = await self._llm._get_active_trucks_sqlalchemy(session)
+            stations = await self._llm._get_stations_needing_refuel_sqlalchemy(session)
+            # Weather, travel costs and prompt block are shared by every truck
+            context = await self._llm.load_dispatch_context(session, depot, stations)
+
+        active_ids = [truck.id for truck in trucks]
+        depot_key = self._depot_key(depot)
+        async with db_manager.get_session() as session:
+            await session.execute(
+                delete(DispatchPlan).where(DispatchPlan.truck_id.notin_(active_ids))
+            )
+            await session.commit()
+            stored = {
+                truck_id: (fingerprint, computed_at)
+                for truck_id, fingerprint, computed_at in (
+                    await session.execute(
+                        select(
+                            DispatchPlan.truck_id,
+                            DispatchPlan.fingerprint,
+                            DispatchPlan.computed_at,
+                        ).where(
+                            DispatchPlan.depot_key == depot_key,
+                            DispatchPlan.llm_model == model,
+                        )
+                    )
+                ).all()
+            }
+
+        due = []
+        now = time.time()
+        for truck in trucks:
+            key = self._key(truck.id, depot, model)
+            fingerprint = plan_fingerprint(truck, stations)
+            cached = stored.get(truck.id)
+            if (
+                cached is None
+                or cached[0] != fingerprint
+                or now - cached[1] > config.DISPATCH_PLAN_TTL_S * 0.8
+            ):
+                due.append((truck, key, fingerprint))
+
+        # Spread recomputations over the interval instead of bursting the LLM
+        stagger = min(
+            config.DISPATCH_PLANNER_STAGGER_S,
+            config.DISPATCH_PLANNER_INTERVAL_S / max(1, len(due)),
+        )
+        semaphore = asyncio.Semaphore(config.DISPATCH_PLANNER_CONCURRENCY)
+        results = await asyncio.gather(
+            *(
+                self._refresh_truck(
+                    truck, context, key, fingerprint, i * stagger, semaphore
+                )
+                for i, (truck, key, fingerprint) in enumerate(due)
+            ),
+            return_exceptions=True,
+        )
+        self._last_cycle = {
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration_s": round(time.perf_counter() - started, 1),
+            "active_trucks": len(trucks),
+            "recomputed": sum(1 for r in results if r is True),
+        }
+
+    async def _refresh_truck(
+        self,
+        truck: TruckData,
+        context: DispatchContext,
+        key: PlanKey,
+        fingerprint: str,
+        delay: float,
+        semaphore: asyncio.Semaphore,
+    ) -> bool:
+        await asyncio.sleep(delay)
+        async with semaphore:
+            try:
+                result = await self._llm.optimize_dispatch_for_truck(
+                    truck, context, config.DISPATCH_PLANNER_MODEL, PRIORITY_BACKGROUND
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._counts["failed"] += 1
+                _logger.warning("Precomputing dispatch plan for %s failed: %s", truck.code, e)
+                return False
+        await self._save(key, fingerprint, result)
+        self._counts["computed"] += 1
+        return True
+
+    async def _save(self, key: PlanKey, fingerprint: str, result: Dict[str, Any]):
+        truck_id, depot_key, llm_model = key
+        values = {
+            "fingerprint": fingerprint,
+            # Round-trip through JSON so datetimes etc. are stored as strings
+            "result": json.loads(json.dumps(result, default=str)),
+            "computed_at": time.time(),
+        }
+        stmt = mysql_insert(DispatchPlan).values(
+            truck_id=truck_id, depot_key=depot_key, llm_model=llm_model, **values
+        )
+        async with db_manager.get_session() as session:
+            await session.execute(stmt.on_duplicate_key_update(**values))
+            await session.commit()
+
+    async def lookup(
+        self,
+        session: AsyncSession,
+        truck: TruckData,
+        stations: List[StationData],
+        depot_location: str,
+        llm_model: str,
+    ) -> Optional[PlanLookup]:
+        """
+        Return the stored plan when it is fresh and built from the given
+        truck/station state (as the caller read it for the request; the plan
+        itself is one primary-key read). Returns None when the planner is
+        disabled.
+        """
+        if not self.enabled:
+            return None
+
+        key = self._key(truck.id, depot_location, llm_model)
+        fingerprint = plan_fingerprint(truck, stations)
+        row = (
+            await session.execute(
+                select(
+                    DispatchPlan.fingerprint,
+                    DispatchPlan.result,
+                    DispatchPlan.computed_at,
+                ).where(
+                    DispatchPlan.truck_id == key[0],
+                    DispatchPlan.depot_key == key[1],
+                    DispatchPlan.llm_model == key[2],
+                )
+            )
+        ).first()
+        if row is None or time.time() - row.computed_at > config.DISPATCH_PLAN_TTL_S:
+            self._counts["misses"] += 1
+            return PlanLookup(key, fingerprint, None)
+        if row.fingerprint != fingerprint:
+            # Overwritten by store() or the next planner cycle
+            self._counts["invalidated"] += 1
+            return PlanLookup(key, fingerprint, None)
+
+        self._counts["hits"] += 1
+        plan = {
+            **row.result,
+            "plan_source": "precomputed",
+            "plan_computed_at": datetime.fromtimestamp(
+                row.computed_at, timezone.utc
+            ).isoformat(),
+        }
+        return PlanLookup(key, fingerprint, plan)
+
+    async def store(self, lookup: Optional[PlanLookup], result: Dict[str, Any]):
+        """Save a plan computed on demand for the inputs seen by lookup()"""
+        if lookup is None:
+            return
+        try:
+            await self._save(lookup.key, lookup.fingerprint, result)
+        except Exception as e:
+            # The plan was still returned; only the cache write is lost
+            _logger.warning(
+                "Storing dispatch plan for truck %s failed: %s", lookup.key[0], e
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "leader": self._leader_conn is not None,
+            **self._counts,
+            "last_cycle": self._last_cycle,
+        }
+
+
+# Global planner instance; started from the app lifespan when enabled
+dispatch_planner = DispatchPlanner()
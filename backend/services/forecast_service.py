@@ -0,0 +1,321 @@
+"""
+Hourly weather forecasts cached locally for planned departures and arrivals.
+
+On a schedule (WEATHER_FORECAST_INTERVAL_S) the forecast for every weather
+collection target (grid cells holding stations, plus depots) is fetched
+through the shared WeatherAPI client with the collector's pacing, and
+stored as one weather_forecasts row per place whose hours are parallel
+arrays. In memory each place keeps the same compact arrays, so
+"weather at X at time T" is a grid lookup plus an index into them and
+request paths never wait on WeatherAPI for a planned time.
+
+The fetch function is injectable (ForecastService(fetcher=...)) so the
+schedule and lookups can run against a stub.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from database import db_manager
+from models.data_models import Place, WeatherData
+from models.database_models import WeatherForecast as ForecastRecord
+from .api_utils import get_forecast_async
+from .weather_service import Cell, fetch_paced, grid_cell, nearest_in_grid, weather_service
+
+_logger = logging.getLogger(__name__)
+
+Fetcher = Callable[[str, int], Awaitable[Dict[str, Any]]]
+
+
+class HourlySeries:
+    """Hourly forecast for one place as parallel arrays starting at `start` (epoch s)"""
+
+    __slots__ = (
+        "city", "lat", "lon", "start", "fetched_at", "temp_c", "wind_kph",
+        "humidity", "precip_mm", "chance_of_rain", "conditions", "condition_idx",
+    )
+
+    def __init__(self, city: str, lat: float, lon: float, start: int, fetched_at: float):
+        self.city, self.lat, self.lon = city, lat, lon
+        self.start = start
+        self.fetched_at = fetched_at
+        self.temp_c = array("f")
+        self.wind_kph = array("f")
+        self.humidity = array("B")
+        self.precip_mm = array("f")
+        self.chance_of_rain = array("B")
+        self.conditions: List[str] = []
+        self.condition_idx = array("B")
+
+    def __len__(self) -> int:
+        return len(self.temp_c)
+
+    def _append(self, hour: Dict[str, Any]):
+        condition = hour["condition"]["text"]
+        if condition not in self.conditions:
+            self.conditions.append(condition)
+        self.temp_c.append(hour["temp_c"])
+        self.wind_kph.append(hour["wind_kph"])
+        self.humidity.append(int(hour["humidity"]))
+        self.precip_mm.append(hour.get("precip_mm", 0.0))
+        self.chance_of_rain.append(int(hour.get("chance_of_rain", 0)))
+        self.condition_idx.append(self.conditions.index(condition))
+
+    @classmethod
+    def from_api_response(cls, place: Place, data: Dict[str, Any], fetched_at: float) -> "HourlySeries":
+        """Build from a WeatherAPI forecast.json response (hours must be contiguous)"""
+        hours = [h for day in data["forecast"]["forecastday"] for h in day["hour"]]
+        hours.sort(key=lambda h: h["time_epoch"])
+        if not hours:
+            raise ValueError("forecast has no hours")
+        series = cls(place.city, place.lat, place.lon, int(hours[0]["time_epoch"]), fetched_at)
+        for hour in hours:
+            series._append(hour)
+        return series
+
+    def covers(self, when: float) -> bool:
+        return 0 <= (when - self.start) // 3600 < len(self)
+
+    def at(self, when: float) -> Optional[WeatherData]:
+        """Forecast for the hour containing `when` (epoch s), if covered"""
+        if not self.covers(when):
+            return None
+        index = int((when - self.start) // 3600)
+        return WeatherData(
+            city=self.city,
+            temp_c=round(self.temp_c[index], 1),
+            condition=self.conditions[self.condition_idx[index]],
+            wind_kph=round(self.wind_kph[index], 1),
+            humidity=self.humidity[index],
+            lat=self.lat,
+            lon=self.lon,
+            valid_at=datetime.fromtimestamp(self.start + index * 3600),
+        )
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "city": self.city,
+            "lat": self.lat,
+            "lon": self.lon,
+            "start_time": datetime.fromtimestamp(self.start, timezone.utc).replace(tzinfo=None),
+            "hours": len(self),
+            "series": {
+                "temp_c": [round(v, 1) for v in self.temp_c],
+                "wind_kph": [round(v, 1) for v in self.wind_kph],
+                "humidity": list(self.humidity),
+                "precip_mm": [round(v, 2) for v in self.precip_mm],
+                "chance_of_rain": list(self.chance_of_rain),
+                "conditions": self.conditions,
+                "condition_idx": list(self.condition_idx),
+            },
+            "fetched_at": datetime.fromtimestamp(self.fetched_at),
+        }
+
+    @classmethod
+    def from_record(cls, record: ForecastRecord) -> "HourlySeries":
+        start = int(record.start_time.replace(tzinfo=timezone.utc).timestamp())
+        series = cls(
+            record.city or "",
+            float(record.lat),
+            float(record.lon),
+            start,
+            record.fetched_at.timestamp(),
+        )
+        data = record.series
+        series.temp_c.extend(data["temp_c"])
+        series.wind_kph.extend(data["wind_kph"])
+        series.humidity.extend(data["humidity"])
+        series.precip_mm.extend(data["precip_mm"])
+        series.chance_of_rain.extend(data["chance_of_rain"])
+        series.conditions = list(data["conditions"])
+        series.condition_idx.extend(data["condition_idx"])
+        return series
+
+
+def resolve_request_time(
+    time_value: Optional[str], delivery_date: Optional[str] = None
+) -> Optional[datetime]:
+    """
+    Planned time from route request fields: an ISO datetime, or "HH:MM" on
+    `delivery_date` (today, or tomorrow once the time has passed, without
+    one). A date alone means midday. None when nothing usable is given.
+    """
+    day = None
+    if delivery_date:
+        try:
+            day = datetime.strptime(delivery_date.strip(), "%Y-%m-%d").date()
+        except ValueError:
+            pass
+
+    if time_value:
+        value = time_value.strip()
+        try:
+            parsed = datetime.fromisoformat(value)
+            # Aware times become local wall-clock time like the rest of the service
+            return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+        except ValueError:
+            pass
+        try:
+            clock = datetime.strptime(value, "%H:%M").time()
+        except ValueError:
+            clock = None
+        if clock is not None:
+            if day is not None:
+                return datetime.combine(day, clock)
+            planned = datetime.combine(datetime.now().date(), clock)
+            return planned if planned >= datetime.now() else planned + timedelta(days=1)
+
+    if day is not None:
+        return datetime.combine(day, datetime.min.time()).replace(hour=12)
+    return None
+
+
+class ForecastService:
+    """Schedules forecast fetches and answers time-specific weather lookups"""
+
+    def __init__(self, fetcher: Fetcher = get_forecast_async):
+        self._fetcher = fetcher
+        self._cells: Dict[Cell, HourlySeries] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._counts = {"cycles": 0, "fetched": 0, "failed": 0, "hits": 0, "misses": 0}
+        self._last_cycle: Dict[str, Any] = {}
+
+    # ----- local lookups -----
+
+    def at_point(self, lat: float, lon: float, when: datetime) -> Optional[WeatherData]:
+        """Forecast for the hour containing `when` near a position, from the local cache"""
+        epoch = when.timestamp()
+        oldest = time.time() - config.WEATHER_FORECAST_MAX_AGE_S
+        series = nearest_in_grid(
+            self._cells,
+            lat,
+            lon,
+            position=lambda s: (s.lat, s.lon),
+            usable=lambda s: s.fetched_at >= oldest and s.covers(epoch),
+        )
+        self._counts["hits" if series is not None else "misses"] += 1
+        return series.at(epoch) if series is not None else None
+
+    def for_place(self, place: Place, when: datetime) -> Optional[WeatherData]:
+        return self.at_point(place.lat, place.lon, when)
+
+    def _remember(self, series: HourlySeries):
+        cell = grid_cell(series.lat, series.lon)
+        current = self._cells.get(cell)
+        if current is None or current.fetched_at <= series.fetched_at:
+            self._cells[cell] = series
+
+    async def sync_from_db(self, session: AsyncSession):
+        """Load forecasts fetched within WEATHER_FORECAST_MAX_AGE_S (newest wins per cell)"""
+        since = datetime.now() - timedelta(seconds=config.WEATHER_FORECAST_MAX_AGE_S)
+        stmt = (
+            select(ForecastRecord)
+            .where(ForecastRecord.fetched_at >= since)
+            .order_by(ForecastRecord.fetched_at)
+        )
+        for record in (await session.execute(stmt)).scalars():
+            try:
+                self._remember(HourlySeries.from_record(record))
+            except (KeyError, TypeError, ValueError, OverflowError) as e:
+                _logger.warning("Skipping malformed forecast row %s: %s", record.id, e)
+
+    # ----- collection -----
+
+    async def _fetch(self, place: Place) -> Optional[HourlySeries]:
+        try:
+            data = await self._fetcher(f"{place.lat},{place.lon}", config.WEATHER_FORECAST_DAYS)
+            series = HourlySeries.from_api_response(place, data, time.time())
+        except Exception as e:
+            self._counts["failed"] += 1
+            _logger.warning("Forecast for %s failed: %s", place.label, e)
+            return None
+        self._counts["fetched"] += 1
+        return series
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """Fetch and store forecasts for every collection target; returns rows stored"""
+        started = time.perf_counter()
+        targets = await weather_service.collection_targets(session)
+        fetched = [s for s in await fetch_paced(targets, self._fetch) if s is not None]
+
+        if fetched:
+            await session.execute(insert(ForecastRecord), [s.to_record() for s in fetched])
+        # Older fetches are superseded; keep them only as long as they could be served
+        cutoff = datetime.now() - timedelta(seconds=config.WEATHER_FORECAST_MAX_AGE_S)
+        await session.execute(delete(ForecastRecord).where(ForecastRecord.fetched_at < cutoff))
+        await session.commit()
+        for series in fetched:
+            self._remember(series)
+
+        self._counts["cycles"] += 1
+        self._last_cycle = {
+            "finished_at": datetime.now().isoformat(),
+            "duration_s": round(time.perf_counter() - started, 1),
+            "targets": len(targets),
+            "stored": len(fetched),
+        }
+        _logger.info("Forecast cycle stored %d/%d places", len(fetched), len(targets))
+        return len(fetched)
+
+    # ----- background loop -----
+
+    async def start(self):
+        if self._task is None and config.WEATHER_FORECAST_ENABLED:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_forever(self):
+        """Forecast fetch loop (also used by the standalone weather_collector.py)"""
+        while True:
+            try:
+                async with db_manager.get_session() as session:
+                    await self.refresh(session)
+                interval = config.WEATHER_FORECAST_INTERVAL_S
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("Forecast cycle failed")
+                interval = min(300.0, config.WEATHER_FORECAST_INTERVAL_S)
+            await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+
+    async def _run(self):
+        if config.WEATHER_COLLECTOR_ENABLED:
+            await self.run_forever()
+            return
+        # Collector runs as a separate process: follow its rows instead
+        while True:
+            try:
+                async with db_manager.get_session() as session:
+                    await self.sync_from_db(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _logger.warning("Forecast sync from database failed: %s", e)
+            await asyncio.sleep(config.WEATHER_SYNC_INTERVAL_S * random.uniform(0.9, 1.1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": config.WEATHER_FORECAST_ENABLED,
+            "places": len(self._cells),
+            "hours": sum(len(s) for s in self._cells.values()),
+            **self._counts,
+            "last_cycle": self._last_cycle,
+        }
+
+
+# Global forecast service; the API process starts it from the app lifespan
+forecast_service = ForecastService()
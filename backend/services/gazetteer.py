@@ -0,0 +1,272 @@
+"""
+Offline gazetteer: resolves free-text locations to canonical places.
+
+Places come from the bundled city list (data/cities.csv) plus the centroid of
+every (city, region) that has stations in the database; station places use
+the database spelling so they can be matched with indexed equality
+predicates instead of leading-wildcard LIKE scans. Lookups try, in order,
+an exact normalized name, the best prefix match and, for names of at least
+GAZETTEER_FUZZY_MIN_CHARS, a trigram (Dice) fuzzy match. A region given
+with the name ("Toronto, ON", "London Ontario") must match: "Portland, ME"
+is unresolved rather than Portland OR, so callers fall back to the
+upstream geocoder or LIKE filters. Results are memoized, so repeat lookups
+cost a dict hit.
+"""
+
+import csv
+import logging
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from models.data_models import Place
+from models.database_models import Station
+
+_logger = logging.getLogger(__name__)
+
+CITIES_CSV = Path(__file__).resolve().parent.parent / "data" / "cities.csv"
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_WORD_ALIASES = {"saint": "st", "sainte": "ste", "mount": "mt", "fort": "ft"}
+
+REGION_NAMES = {
+    # Canadian provinces and territories
+    "alberta": "AB", "british columbia": "BC", "manitoba": "MB",
+    "new brunswick": "NB", "newfoundland and labrador": "NL",
+    "newfoundland": "NL", "nova scotia": "NS", "northwest territories": "NT",
+    "nunavut": "NU", "ontario": "ON", "prince edward island": "PE",
+    "quebec": "QC", "saskatchewan": "SK", "yukon": "YT",
+    # US states
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR",
+    "california": "CA", "colorado": "CO", "connecticut": "CT", "delaware": "DE",
+    "district of columbia": "DC", "florida": "FL", "georgia": "GA",
+    "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN",
+    "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI",
+    "minnesota": "MN", "mississippi": "MS", "missouri": "MO", "montana": "MT",
+    "nebraska": "NE", "nevada": "NV", "new hampshire": "NH",
+    "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH",
+    "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA",
+    "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+    "virginia": "VA", "washington": "WA", "west virginia": "WV",
+    "wisconsin": "WI", "wyoming": "WY",
+}
+_REGION_CODES = set(REGION_NAMES.values())
+
+
+def normalize_name(text: str) -> str:
+    """Accent-free, case-folded, punctuation-free form used for matching"""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    words = _NON_ALNUM.sub(" ", text).split()
+    return " ".join(_WORD_ALIASES.get(word, word) for word in words)
+
+
+def _region_code(text: str) -> Optional[str]:
+    normalized = normalize_name(text)
+    if normalized.upper() in _REGION_CODES:
+        return normalized.upper()
+    return REGION_NAMES.get(normalized)
+
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """In-memory place index with exact, prefix and trigram lookups"""
+
+    def __init__(self, csv_path: Path = CITIES_CSV):
+        self._bundled = self._load_csv(csv_path)
+        self._station_places: List[Place] = []
+        self._refreshed_at = 0.0
+        self._build()
+
+    @staticmethod
+    def _load_csv(path: Path) -> List[Place]:
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                return [
+                    Place(
+                        city=row["city"],
+                        region=row["region"],
+                        lat=float(row["lat"]),
+                        lon=float(row["lon"]),
+                        country=row.get("country") or None,
+                        population=int(row.get("population") or 0),
+                    )
+                    for row in csv.DictReader(f)
+                ]
+        except OSError as e:
+            _logger.warning("Bundled city list unavailable (%s): %s", path, e)
+            return []
+
+    def _build(self):
+        places: Dict[Tuple[str, str], Place] = {}
+        for place in self._bundled:
+            places[(normalize_name(place.city), place.region.upper())] = place
+        for place in self._station_places:
+            key = (normalize_name(place.city), place.region.upper())
+            bundled = places.get(key)
+            if bundled is not None:
+                # Keep the city-centre coordinates but the database spelling
+                place = Place(
+                    city=place.city,
+                    region=place.region,
+                    lat=bundled.lat,
+                    lon=bundled.lon,
+                    country=bundled.country,
+                    source="bundled",
+                    population=bundled.population,
+                    station_count=place.station_count,
+                )
+            places[key] = place
+
+        self._places = list(places.values())
+        self._by_name: Dict[str, List[int]] = {}
+        self._trigram_index: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        for i, place in enumerate(self._places):
+            name = normalize_name(place.city)
+            self._by_name.setdefault(name, []).append(i)
+            grams = _trigrams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(i)
+        self._sorted_names = sorted(self._by_name)
+        self._memo: Dict[str, Optional[Place]] = {}
+
+    def _rank(self, ids, region: Optional[str]) -> Optional[Place]:
+        candidates = [self._places[i] for i in ids]
+        if region:
+            candidates = [p for p in candidates if p.region.upper() == region]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda p: (p.station_count > 0, p.population))
+
+    def _prefix(self, name: str) -> List[int]:
+        ids: List[int] = []
+        start = bisect_left(self._sorted_names, name)
+        for candidate in self._sorted_names[start:]:
+            if not candidate.startswith(name):
+                break
+            ids.extend(self._by_name[candidate])
+        return ids
+
+    def _fuzzy(self, name: str, region: Optional[str]) -> Optional[Place]:
+        # Short names are too close to each other ("columbia" / "columbus")
+        if len(name) < config.GAZETTEER_FUZZY_MIN_CHARS:
+            return None
+        grams = _trigrams(name)
+        shared = Counter(i for gram in grams for i in self._trigram_index.get(gram, ()))
+        best, best_score = None, config.GAZETTEER_MIN_SCORE
+        for i, common in shared.items():
+            place = self._places[i]
+            if region and place.region.upper() != region:
+                continue
+            score = 2 * common / (len(grams) + self._gram_counts[i])
+            if score > best_score:
+                best, best_score = place, score
+        return best
+
+    def _lookup(self, name: str, region: Optional[str]) -> Optional[Place]:
+        if not name:
+            return None
+        exact = self._rank(self._by_name.get(name, ()), region)
+        if exact is not None:
+            return exact
+        if len(name) >= 3:
+            prefixed = self._rank(self._prefix(name), region)
+            if prefixed is not None:
+                return prefixed
+        return self._fuzzy(name, region)
+
+    def _split_region(self, text: str, key: str) -> Tuple[str, Optional[str]]:
+        """(normalized city, region code or None) for a location string"""
+        if "," in text:
+            city_part, region_part = text.rsplit(",", 1)
+            return normalize_name(city_part), _region_code(region_part)
+        if key not in self._by_name:
+            # Trailing region without a comma: "London Ontario", "Portland OR"
+            words = key.split()
+            for split in range(len(words) - 1, 0, -1):
+                region = _region_code(" ".join(words[split:]))
+                if region:
+                    return " ".join(words[:split]), region
+        return key, None
+
+    def resolve(self, text: Optional[str]) -> Optional[Place]:
+        """Canonical place for a location string, or None if nothing matches"""
+        if not text or not str(text).strip():
+            return None
+        key = normalize_name(text)
+        if key in self._memo:
+            return self._memo[key]
+
+        city, region = self._split_region(str(text), key)
+        # With a region, a same-named city elsewhere is not an answer
+        place = self._lookup(city, region)
+        if place is None and region is None and city != key:
+            place = self._lookup(key, None)
+
+        if len(self._memo) >= 10_000:
+            self._memo.clear()
+        self._memo[key] = place
+        return place
+
+    async def ensure_fresh(self, session: AsyncSession):
+        """Reload station centroids when they are older than GAZETTEER_REFRESH_S"""
+        if time.monotonic() - self._refreshed_at < config.GAZETTEER_REFRESH_S:
+            return
+        await self.refresh(session)
+
+    async def refresh(self, session: AsyncSession):
+        """Rebuild the index with the current station (city, region) centroids"""
+        stmt = (
+            select(
+                Station.city,
+                Station.region,
+                func.avg(Station.lat).label("lat"),
+                func.avg(Station.lon).label("lon"),
+                func.count().label("stations"),
+            )
+            .where(Station.city.is_not(None), Station.lat.is_not(None))
+            .group_by(Station.city, Station.region)
+        )
+        rows = (await session.execute(stmt)).all()
+        self._station_places = [
+            Place(
+                city=row.city,
+                region=row.region or "",
+                lat=float(row.lat),
+                lon=float(row.lon),
+                source="stations",
+                station_count=row.stations,
+            )
+            for row in rows
+        ]
+        self._refreshed_at = time.monotonic()
+        self._build()
+        _logger.info("Gazetteer loaded %d station places", len(rows))
+
+    def stats(self):
+        return {
+            "places": len(self._places),
+            "station_places": len(self._station_places),
+            "memoized": len(self._memo),
+        }
+
+
+# Global gazetteer shared by the optimization services
+gazetteer = Gazetteer()
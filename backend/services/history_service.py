@@ -0,0 +1,102 @@
+"""
+Chart-ready station fuel-level history.
+
+Series come from the rollup tier that fits the requested range (raw rows for
+short recent ranges, else hourly or daily rollups; see rollup_service), are
+downsampled server-side to the requested point count with LTTB or min/max
+bucketing, and are streamed as NDJSON: a meta line, then one line per
+station. Stations are loaded HISTORY_QUERY_GROUP at a time on the stream's
+own session, so neither the payload nor memory grows with the amount of
+raw history or the number of stations requested.
+"""
+
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+
+import numpy as np
+
+from config import config
+from database import db_manager
+from models.data_models import SeriesPoint
+from utils.downsampling import lttb_indices, minmax_indices
+from .rollup_service import rollup_service
+
+SOURCE = "station_fuel_levels"
+METRIC = "fuel_level_liters"
+COLUMNS = ["t", "avg", "min", "max", "last", "samples"]
+METHODS = ("lttb", "minmax")
+
+
+def downsample(points: List[SeriesPoint], threshold: int, method: str) -> List[SeriesPoint]:
+    """Reduce a series to at most `threshold` points"""
+    if len(points) <= threshold:
+        return points
+    if method == "minmax":
+        kept = minmax_indices(
+            np.fromiter((p.min for p in points), float, len(points)),
+            np.fromiter((p.max for p in points), float, len(points)),
+            threshold,
+        )
+    else:
+        kept = lttb_indices(
+            np.fromiter((p.t.timestamp() for p in points), float, len(points)),
+            np.fromiter((p.avg for p in points), float, len(points)),
+            threshold,
+        )
+    return [points[i] for i in kept]
+
+
+def _row(point: SeriesPoint) -> list:
+    return [
+        point.t.isoformat(),
+        round(point.avg, 2),
+        point.min,
+        point.max,
+        point.last,
+        point.samples,
+    ]
+
+
+async def stream_station_history(
+    station_ids: Sequence[int],
+    start: datetime,
+    end: datetime,
+    points: int,
+    method: str,
+    resolution: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """NDJSON lines: one meta line, then {"type": "series"} per station in request order"""
+    tier = resolution or rollup_service.choose_resolution(SOURCE, start, end)
+    yield json.dumps(
+        {
+            "type": "meta",
+            "metric": METRIC,
+            "resolution": tier,
+            "method": method,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "points": points,
+            "stations": len(station_ids),
+            "columns": COLUMNS,
+        }
+    ) + "\n"
+
+    group = max(1, config.HISTORY_QUERY_GROUP)
+    async with db_manager.get_read_session() as session:
+        for offset in range(0, len(station_ids), group):
+            ids = station_ids[offset : offset + group]
+            _, series = await rollup_service.history(
+                session, SOURCE, METRIC, ids, start, end, resolution=tier
+            )
+            for station_id in ids:
+                raw = series.get(str(station_id), [])
+                sampled = downsample(raw, points, method)
+                yield json.dumps(
+                    {
+                        "type": "series",
+                        "station_id": station_id,
+                        "source_points": len(raw),
+                        "data": [_row(p) for p in sampled],
+                    }
+                ) + "\n"
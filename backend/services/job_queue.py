@@ -0,0 +1,523 @@
+"""
+Asynchronous job queue for long-running optimizations.
+
+Submitting a job stores it and returns immediately; a fixed pool of worker
+tasks claims queued jobs, runs the registered handler with its own database
+session and records the result. Request concurrency is therefore decoupled
+from optimization concurrency: HTTP workers are free as soon as the job id is
+returned, while at most JOB_WORKERS optimizations run per process.
+
+Job stores are pluggable (JOB_STORE):
+    memory  - in-process dict + asyncio.Queue (default, lost on restart)
+    sqlite  - stdlib sqlite3 file, survives restarts
+    redis   - any Redis-protocol server (Redis, Valkey, a local stand-in);
+              requires the optional `redis` package or an injected client
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from database import db_manager
+from models.data_models import JobRecord
+from services.llm_scheduler import LLMQueueFullError
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency, only needed for JOB_STORE=redis
+    redis_asyncio = None
+
+# handler(job, session) -> JSON-serializable result
+JobHandler = Callable[[JobRecord, AsyncSession], Awaitable[Dict[str, Any]]]
+
+_logger = logging.getLogger(__name__)
+
+
+class JobStore(ABC):
+    """Persistence and hand-off of jobs between API handlers and workers"""
+
+    @abstractmethod
+    async def create(self, job: JobRecord):
+        """Persist a new job and make it available to claim()"""
+
+    @abstractmethod
+    async def claim(self, timeout: float) -> Optional[JobRecord]:
+        """Atomically take the oldest queued job and mark it running"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        pass
+
+    @abstractmethod
+    async def update(self, job_id: str, **fields) -> Optional[JobRecord]:
+        pass
+
+    @abstractmethod
+    async def requeue(self, job_id: str, delay: float) -> Optional[JobRecord]:
+        """Return a claimed job to the queue; it is not claimed again for `delay` seconds"""
+
+    async def close(self):
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local store; jobs are lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, JobRecord] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def _purge_expired(self):
+        cutoff = time.time() - config.JOB_TTL_S
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.is_finished and (job.finished_at or 0) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def create(self, job: JobRecord):
+        self._purge_expired()
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+
+    async def claim(self, timeout: float) -> Optional[JobRecord]:
+        try:
+            job_id = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        job = self._jobs.get(job_id)
+        if job is None or job.status != "queued":
+            return None
+        now = time.time()
+        job.status, job.started_at, job.updated_at = "running", now, now
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        return self._jobs.get(job_id)
+
+    async def update(self, job_id: str, **fields) -> Optional[JobRecord]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        return job
+
+    async def requeue(self, job_id: str, delay: float) -> Optional[JobRecord]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        await self.update(
+            job_id,
+            status="queued",
+            started_at=None,
+            run_after=time.time() + delay,
+            requeues=job.requeues + 1,
+        )
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job_id)
+        return job
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in a local SQLite file; sqlite3 calls run in a worker thread"""
+
+    _COLUMNS = (
+        "id", "kind", "params", "submitted_by", "status", "created_at",
+        "updated_at", "started_at", "finished_at", "result", "error",
+        "run_after", "requeues",
+    )
+    _JSON_COLUMNS = ("params", "result")
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS jobs ({', '.join(self._COLUMNS)}, "
+            "PRIMARY KEY (id))"
+        )
+        # Files created before a column was added
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in self._COLUMNS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)"
+        )
+        # Jobs that were running when the process died will never finish
+        self._conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', "
+            "finished_at = ? WHERE status = 'running'",
+            (time.time(),),
+        )
+
+    def _to_row(self, job: JobRecord) -> tuple:
+        data = job.to_dict()
+        return tuple(
+            json.dumps(data[c], default=str) if c in self._JSON_COLUMNS else data[c]
+            for c in self._COLUMNS
+        )
+
+    def _from_row(self, row: tuple) -> JobRecord:
+        data = dict(zip(self._COLUMNS, row))
+        for column in self._JSON_COLUMNS:
+            data[column] = json.loads(data[column]) if data[column] else None
+        data["requeues"] = data["requeues"] or 0
+        return JobRecord.from_dict(data)
+
+    def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+
+        return asyncio.to_thread(locked)
+
+    def _insert(self, job: JobRecord):
+        self._conn.execute(
+            "DELETE FROM jobs WHERE finished_at < ?", (time.time() - config.JOB_TTL_S,)
+        )
+        placeholders = ", ".join("?" for _ in self._COLUMNS)
+        self._conn.execute(f"INSERT INTO jobs VALUES ({placeholders})", self._to_row(job))
+
+    def _claim_one(self) -> Optional[JobRecord]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE status = 'queued' "
+                "AND (run_after IS NULL OR run_after <= ?) ORDER BY created_at LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            job = None
+            if row is not None:
+                job = self._from_row(row)
+                now = time.time()
+                job.status, job.started_at, job.updated_at = "running", now, now
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (job.status, now, now, job.id),
+                )
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return job
+
+    def _select(self, job_id: str) -> Optional[JobRecord]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def _update(self, job_id: str, fields: Dict[str, Any]) -> Optional[JobRecord]:
+        fields = {**fields, "updated_at": time.time()}
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        values = [
+            json.dumps(v, default=str) if name in self._JSON_COLUMNS else v
+            for name, v in fields.items()
+        ]
+        self._conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", (*values, job_id)
+        )
+        return self._select(job_id)
+
+    async def create(self, job: JobRecord):
+        await self._run(self._insert, job)
+
+    async def claim(self, timeout: float) -> Optional[JobRecord]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self._run(self._claim_one)
+            if job is not None or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(config.JOB_POLL_S, max(0.0, deadline - time.monotonic())))
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        return await self._run(self._select, job_id)
+
+    async def update(self, job_id: str, **fields) -> Optional[JobRecord]:
+        return await self._run(self._update, job_id, fields)
+
+    async def requeue(self, job_id: str, delay: float) -> Optional[JobRecord]:
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        return await self.update(
+            job_id,
+            status="queued",
+            started_at=None,
+            run_after=time.time() + delay,
+            requeues=job.requeues + 1,
+        )
+
+    async def close(self):
+        await self._run(self._conn.close)
+
+
+class RedisJobStore(JobStore):
+    """
+    Jobs as JSON strings plus a list used as the work queue. Requeued jobs
+    wait in a sorted set scored by their run_after time until they are due.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "managepetro:jobs"):
+        if client is None:
+            if redis_asyncio is None:
+                raise RuntimeError(
+                    "JOB_STORE=redis requires the 'redis' package (pip install redis)"
+                )
+            client = redis_asyncio.from_url(url, decode_responses=True)
+        self._client = client
+        self._prefix = prefix
+        self._queue_key = f"{prefix}:queue"
+        self._delayed_key = f"{prefix}:delayed"
+
+    def _key(self, job_id: str) -> str:
+        return f"{self._prefix}:{job_id}"
+
+    async def _save(self, job: JobRecord):
+        # Only finished jobs expire; a queued backlog must never vanish unrun
+        await self._client.set(
+            self._key(job.id),
+            json.dumps(job.to_dict(), default=str),
+            ex=config.JOB_TTL_S if job.is_finished else None,
+        )
+
+    async def _promote_due(self):
+        """Move requeued jobs whose delay has passed onto the work queue"""
+        due = await self._client.zrangebyscore(self._delayed_key, 0, time.time())
+        for job_id in due:
+            # zrem succeeds for exactly one process, so each job is pushed once
+            if await self._client.zrem(self._delayed_key, job_id):
+                await self._client.rpush(self._queue_key, job_id)
+
+    async def create(self, job: JobRecord):
+        await self._save(job)
+        await self._client.rpush(self._queue_key, job.id)
+
+    async def claim(self, timeout: float) -> Optional[JobRecord]:
+        await self._promote_due()
+        item = await self._client.blpop(self._queue_key, timeout=max(1, int(timeout)))
+        if not item:
+            return None
+        job = await self.get(item[1])
+        if job is None or job.status != "queued":
+            return None
+        now = time.time()
+        job.status, job.started_at, job.updated_at = "running", now, now
+        await self._save(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        raw = await self._client.get(self._key(job_id))
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        return JobRecord.from_dict(json.loads(raw))
+
+    async def update(self, job_id: str, **fields) -> Optional[JobRecord]:
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        await self._save(job)
+        return job
+
+    async def requeue(self, job_id: str, delay: float) -> Optional[JobRecord]:
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        run_after = time.time() + delay
+        job = await self.update(
+            job_id,
+            status="queued",
+            started_at=None,
+            run_after=run_after,
+            requeues=job.requeues + 1,
+        )
+        await self._client.zadd(self._delayed_key, {job_id: run_after})
+        return job
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_job_store() -> JobStore:
+    """Build the store selected by JOB_STORE"""
+    if config.JOB_STORE == "sqlite":
+        return SQLiteJobStore(config.JOB_SQLITE_PATH)
+    if config.JOB_STORE == "redis":
+        return RedisJobStore(config.JOB_REDIS_URL)
+    return InMemoryJobStore()
+
+
+class JobQueue:
+    """Registry of job handlers plus the worker pool that runs them"""
+
+    def __init__(self):
+        self.store: Optional[JobStore] = None
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def start(self, store: Optional[JobStore] = None):
+        self.store = store or create_job_store()
+        self._changed = asyncio.Condition()
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(config.JOB_WORKERS)
+        ]
+        _logger.info(
+            "Job queue started with %s workers (%s store)",
+            config.JOB_WORKERS,
+            type(self.store).__name__,
+        )
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.store is not None:
+            await self.store.close()
+
+    async def submit(self, kind: str, params: Dict[str, Any], submitted_by: str) -> JobRecord:
+        if self.store is None:
+            raise RuntimeError("Job queue is not running")
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        now = time.time()
+        job = JobRecord(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            params=params,
+            submitted_by=submitted_by,
+            created_at=now,
+            updated_at=now,
+        )
+        await self.store.create(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        if self.store is None:
+            return None
+        return await self.store.get(job_id)
+
+    async def wait_for_change(self, job_id: str, since: float) -> Optional[JobRecord]:
+        """
+        Return the job once its updated_at moves past `since`, or after
+        JOB_POLL_S (jobs run by other processes are only seen by polling).
+        """
+        job = await self.get(job_id)
+        if job is None or job.updated_at > since:
+            return job
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), config.JOB_POLL_S)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get(job_id)
+
+    async def _update(self, job_id: str, **fields):
+        await self.store.update(job_id, **fields)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _worker(self, number: int):
+        while True:
+            try:
+                job = await self.store.claim(timeout=config.JOB_POLL_S)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("Job worker %s failed to claim a job", number)
+                await asyncio.sleep(config.JOB_POLL_S)
+                continue
+            if job is not None:
+                await self._run(job)
+
+    async def _run(self, job: JobRecord):
+        async with self._changed:
+            self._changed.notify_all()  # claim() marked the job running
+        handler = self._handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind '{job.kind}'")
+            async with db_manager.get_read_session() as session:
+                result = await asyncio.wait_for(
+                    handler(job, session), timeout=config.JOB_DEADLINE_S
+                )
+        except asyncio.CancelledError:
+            # Worker is shutting down; record the outcome before exiting
+            await asyncio.shield(
+                self._update(
+                    job.id,
+                    status="cancelled",
+                    error="Server shut down before the job finished",
+                    finished_at=time.time(),
+                )
+            )
+            raise
+        except LLMQueueFullError as e:
+            await self._requeue(job, e)
+        except asyncio.TimeoutError:
+            _logger.warning("Job %s (%s) exceeded its deadline", job.id, job.kind)
+            await self._update(
+                job.id,
+                status="failed",
+                error=f"Job timed out after {config.JOB_DEADLINE_S:g}s",
+                finished_at=time.time(),
+            )
+        except Exception as e:
+            _logger.exception("Job %s (%s) failed", job.id, job.kind)
+            await self._update(
+                job.id, status="failed", error=str(e), finished_at=time.time()
+            )
+        else:
+            await self._update(
+                job.id, status="succeeded", result=result, finished_at=time.time()
+            )
+
+    async def _requeue(self, job: JobRecord, error: LLMQueueFullError):
+        """LLM admission was refused: put the job back with exponential backoff"""
+        if job.requeues >= config.JOB_MAX_REQUEUES:
+            _logger.warning(
+                "Job %s (%s) gave up after %s requeues", job.id, job.kind, job.requeues
+            )
+            await self._update(
+                job.id, status="failed", error=str(error), finished_at=time.time()
+            )
+            return
+        backoff = config.JOB_POLL_S * 2 ** job.requeues
+        delay = max(error.retry_after, backoff) * random.uniform(1.0, 1.25)
+        _logger.info(
+            "Job %s (%s) not admitted by the LLM scheduler, retrying in %.1fs",
+            job.id,
+            job.kind,
+            delay,
+        )
+        await self.store.requeue(job.id, delay)
+        async with self._changed:
+            self._changed.notify_all()
+
+
+# Global job queue; handlers are registered by the API module
+job_queue = JobQueue()
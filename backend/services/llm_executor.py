@@ -0,0 +1,356 @@
+"""
+Resilient LLM execution layer on top of lc_router.
+
+`LLMExecutor.run` executes one logical LLM request against a fallback chain
+of models (e.g. gemini-2.5-flash -> openai:gpt-4o-mini -> anthropic:claude).
+When an attempt fails (quota, timeout, provider outage) the next model in the
+chain is tried instead of failing the whole request. With hedging enabled, a
+second model is fired when the first has not produced a token within the
+hedge delay; the first attempt to finish wins and the loser is cancelled.
+
+Per-model latency is tracked in a rolling window and the p95 time-to-first-
+token drives the hedge delay once enough samples exist; non-streaming calls
+(no first token to observe) use the p95 of their own attempt latency and are
+not hedged until they have enough samples. Each attempt first takes a slot
+from `llm_scheduler`, and the hedge clock only starts once it has one, so
+queueing time is excluded from both the latency samples and the hedge delay,
+and provider rate limits apply to fallbacks and hedges too.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from config import config
+from .lc_router import resolve_model
+from .llm_scheduler import PRIORITY_ROUTE, LLMQueueFullError, llm_scheduler
+
+T = TypeVar("T")
+
+# attempt(model_id, mark_first_token) -> result
+Attempt = Callable[[str, Callable[[], None]], Awaitable[T]]
+
+_logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when every model in the fallback chain failed."""
+
+    def __init__(self, message: str, causes: Tuple[BaseException, ...] = ()):
+        super().__init__(message)
+        # The exception each model's attempt failed with, in chain order
+        self.causes = causes
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(
+        marker in message
+        for marker in ("quota", "rate limit", "rate_limit", "resource_exhausted", "429")
+    )
+
+
+class LatencyTracker:
+    """Rolling per-model latency samples (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._first_token: Dict[str, Deque[float]] = {}
+        self._total: Dict[str, Deque[float]] = {}
+        # Whole-attempt latency of non-streaming calls
+        self._blocking: Dict[str, Deque[float]] = {}
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+
+    def _samples(self, store: Dict[str, Deque[float]], model_id: str) -> Deque[float]:
+        if model_id not in store:
+            store[model_id] = deque(maxlen=self._window)
+        return store[model_id]
+
+    def record(
+        self,
+        model_id: str,
+        outcome: str,
+        total_s: float,
+        first_token_s: Optional[float] = None,
+        streaming: bool = True,
+    ):
+        counts = self._outcomes.setdefault(model_id, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome != "success":
+            return
+        self._samples(self._total, model_id).append(total_s)
+        if first_token_s is not None:
+            self._samples(self._first_token, model_id).append(first_token_s)
+        if not streaming:
+            self._samples(self._blocking, model_id).append(total_s)
+
+    def p95(self, model_id: str, streaming: bool = True) -> Optional[float]:
+        """p95 time to first token (streaming) or attempt latency (non-streaming)"""
+        store = self._first_token if streaming else self._blocking
+        samples = store.get(model_id)
+        if not samples or len(samples) < config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return _percentile(list(samples), 0.95)
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for model_id in set(self._outcomes) | set(self._total):
+            total = list(self._total.get(model_id, []))
+            first = list(self._first_token.get(model_id, []))
+            blocking = list(self._blocking.get(model_id, []))
+            result[model_id] = {
+                "outcomes": dict(self._outcomes.get(model_id, {})),
+                "samples": len(total),
+                "p50_total_ms": round(_percentile(total, 0.5) * 1000) if total else None,
+                "p95_total_ms": round(_percentile(total, 0.95) * 1000) if total else None,
+                "p50_first_token_ms": round(_percentile(first, 0.5) * 1000) if first else None,
+                "p95_first_token_ms": round(_percentile(first, 0.95) * 1000) if first else None,
+                "p95_non_streaming_ms": (
+                    round(_percentile(blocking, 0.95) * 1000) if blocking else None
+                ),
+            }
+        return result
+
+
+class _AttemptState:
+    """Progress of one running attempt, as watched by the hedging loop"""
+
+    def __init__(self):
+        self.admitted = asyncio.Event()  # holds its scheduler slot
+        self.admitted_at = 0.0
+        self.first_token = asyncio.Event()
+
+
+class LLMExecutor:
+    """Runs LLM attempts with failover along a fallback chain and optional hedging"""
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self._hedges_fired = 0
+        self._hedges_won = 0
+        self._failovers = 0
+
+    def _provider_configured(self, model_id: str) -> bool:
+        provider, _ = resolve_model(model_id)
+        key = {
+            "openai": config.OPENAI_API_KEY,
+            "anthropic": config.ANTHROPIC_API_KEY,
+            "google": config.GEMINI_API_KEY,
+        }.get(provider)
+        return bool(key)
+
+    def chain_for(self, model_id: str) -> List[str]:
+        """Requested model first, then configured fallbacks with an API key"""
+        chain = [model_id]
+        for fallback in config.LLM_FALLBACK_CHAIN:
+            if fallback not in chain and self._provider_configured(fallback):
+                chain.append(fallback)
+        return chain
+
+    def hedge_delay(self, model_id: str, streaming: bool) -> Optional[float]:
+        """
+        Seconds after admission to wait for output before firing a hedge
+        request, or None to not hedge (non-streaming calls without samples)
+        """
+        observed = self.latency.p95(model_id, streaming)
+        if not streaming:
+            # A whole answer takes far longer than a first token, so neither
+            # the LLM_HEDGE_AFTER_MS default nor its ceiling applies
+            if observed is None:
+                return None
+            return max(observed, config.LLM_HEDGE_MIN_MS / 1000)
+        default = config.LLM_HEDGE_AFTER_MS / 1000
+        if observed is None:
+            return default
+        # Never hedge faster than the configured floor; the ceiling keeps a
+        # degraded provider's slow samples from disabling hedging altogether.
+        return min(max(observed, config.LLM_HEDGE_MIN_MS / 1000), default * 2)
+
+    def check_admission(self, model_id: str, priority: int = PRIORITY_ROUTE):
+        """Raise LLMQueueFullError if no model in the chain can take the call"""
+        llm_scheduler.check_admission(self.chain_for(model_id), priority)
+
+    async def _timed_attempt(
+        self,
+        model_id: str,
+        attempt: Attempt,
+        state: _AttemptState,
+        priority: int,
+        tokens: int,
+        streaming: bool,
+    ):
+        async with llm_scheduler.slot(model_id, priority, tokens):
+            state.admitted_at = time.perf_counter()
+            state.admitted.set()
+            return await self._run_attempt(model_id, attempt, state.first_token, streaming)
+
+    async def _run_attempt(
+        self,
+        model_id: str,
+        attempt: Attempt,
+        first_token: asyncio.Event,
+        streaming: bool = True,
+    ):
+        started = time.perf_counter()
+        first_token_at: List[float] = []
+
+        def mark_first_token():
+            if not first_token.is_set():
+                first_token_at.append(time.perf_counter() - started)
+                first_token.set()
+
+        try:
+            result = await asyncio.wait_for(
+                attempt(model_id, mark_first_token),
+                timeout=config.LLM_ATTEMPT_TIMEOUT_S,
+            )
+        except asyncio.CancelledError:
+            self.latency.record(model_id, "cancelled", time.perf_counter() - started)
+            raise
+        except asyncio.TimeoutError:
+            self.latency.record(model_id, "timeout", time.perf_counter() - started)
+            raise TimeoutError(
+                f"{model_id} did not respond within {config.LLM_ATTEMPT_TIMEOUT_S}s"
+            )
+        except Exception as e:
+            self.latency.record(model_id, "error", time.perf_counter() - started)
+            if _is_rate_limit_error(e):
+                llm_scheduler.note_rate_limited(model_id)
+            raise
+
+        self.latency.record(
+            model_id,
+            "success",
+            time.perf_counter() - started,
+            first_token_at[0] if first_token_at else None,
+            streaming,
+        )
+        return result
+
+    async def run(
+        self,
+        model_id: str,
+        attempt: Attempt,
+        streaming: bool = True,
+        priority: int = PRIORITY_ROUTE,
+        tokens: int = 0,
+    ):
+        """
+        Execute `attempt` against `model_id`, failing over / hedging along the
+        fallback chain. `attempt` must call its `mark_first_token` argument
+        when the provider starts producing output (streaming calls) - for
+        non-streaming calls hedging uses the p95 of their own attempt latency.
+        `priority` and `tokens` are passed to the admission scheduler.
+        """
+        candidates: Deque[str] = deque(self.chain_for(model_id))
+        running: Dict[asyncio.Task, Tuple[str, _AttemptState]] = {}
+        errors: List[str] = []
+        causes: List[BaseException] = []
+        queue_errors: List[LLMQueueFullError] = []
+        # Hedge attempt -> the attempt it was started alongside
+        hedges: Dict[asyncio.Task, asyncio.Task] = {}
+
+        def launch() -> asyncio.Task:
+            model = candidates.popleft()
+            state = _AttemptState()
+            task = asyncio.create_task(
+                self._timed_attempt(model, attempt, state, priority, tokens, streaming)
+            )
+            running[task] = (model, state)
+            return task
+
+        launch()
+        try:
+            while running:
+                timeout = None
+                waiting_for = set(running)
+                admission = None
+                if config.LLM_HEDGE_ENABLED and candidates and len(running) == 1:
+                    (model, state), = running.values()
+                    if not state.admitted.is_set():
+                        # The hedge clock starts once the attempt holds its slot
+                        admission = asyncio.ensure_future(state.admitted.wait())
+                        waiting_for.add(admission)
+                    elif not state.first_token.is_set():
+                        delay = self.hedge_delay(model, streaming)
+                        if delay is not None:
+                            elapsed = time.perf_counter() - state.admitted_at
+                            timeout = max(0.0, delay - elapsed)
+
+                try:
+                    done, _ = await asyncio.wait(
+                        waiting_for, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    if admission is not None:
+                        admission.cancel()
+                done.discard(admission)
+
+                if not done:
+                    if admission is not None:
+                        continue  # admitted: now wait out the hedge delay
+                    (slow_task, (model, state)), = running.items()
+                    if not state.first_token.is_set():
+                        _logger.info(
+                            "No output from %s within hedge delay; hedging with %s",
+                            model,
+                            candidates[0],
+                        )
+                        self._hedges_fired += 1
+                        hedges[launch()] = slow_task
+                    continue
+
+                for task in done:
+                    model, _ = running.pop(task)
+                    if task.exception() is None:
+                        if model != model_id:
+                            _logger.info("LLM request served by fallback %s", model)
+                        hedged_task = hedges.get(task)
+                        if hedged_task is not None:
+                            if hedged_task.done():
+                                # The slow attempt had already failed: a failover
+                                self._failovers += 1
+                            else:
+                                self._hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, LLMQueueFullError):
+                        queue_errors.append(error)
+                    _logger.warning("LLM attempt with %s failed: %s", model, error)
+                    errors.append(f"{model}: {error}")
+                    causes.append(error)
+
+                if not running and candidates:
+                    self._failovers += 1
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        if queue_errors and len(queue_errors) == len(errors):
+            # Nothing actually failed upstream; every provider was saturated
+            raise min(queue_errors, key=lambda e: e.retry_after)
+        raise LLMUnavailableError("; ".join(errors), tuple(causes))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fallback_chain": list(config.LLM_FALLBACK_CHAIN),
+            "hedging_enabled": config.LLM_HEDGE_ENABLED,
+            "hedges_fired": self._hedges_fired,
+            "hedges_won": self._hedges_won,
+            "failovers": self._failovers,
+            "models": self.latency.stats(),
+            "admission": llm_scheduler.stats(),
+        }
+
+
+# Global executor instance shared by all LLMService instances
+llm_executor = LLMExecutor()
@@ -0,0 +1,242 @@
+"""
+Admission control for LLM calls.
+
+Every provider gets its own `ProviderQueue` with token buckets for requests
+and tokens per minute plus a cap on concurrent calls, so bursts of API
+traffic are smoothed to the provider's quota instead of failing together
+with quota errors. Waiting calls are served by priority (single-truck
+dispatch before route optimization before batch recommendations, with
+background precomputation last) and FIFO within a priority. When a queue is
+full, callers get `LLMQueueFullError` carrying a Retry-After estimate, which
+the API maps to HTTP 429.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+from utils.rate_limit import TokenBucket
+from .lc_router import resolve_model
+
+# Lower value = served first
+PRIORITY_DISPATCH = 0
+PRIORITY_ROUTE = 1
+PRIORITY_BATCH = 2
+# Precomputation nobody is waiting for yet
+PRIORITY_BACKGROUND = 3
+
+_logger = logging.getLogger(__name__)
+
+
+class LLMQueueFullError(Exception):
+    """Raised when an LLM call cannot be admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus output"""
+    return len(prompt) // 4 + config.LLM_EST_OUTPUT_TOKENS
+
+
+class ProviderQueue:
+    """Rate limits, concurrency cap and priority wait queue for one provider"""
+
+    def __init__(self, provider: str, limits: Dict[str, int]):
+        self.provider = provider
+        self.max_concurrency = max(1, limits["concurrency"])
+        self.requests = TokenBucket(limits["rpm"])
+        self.tokens = TokenBucket(limits["tpm"])
+        self.active = 0
+        # (priority, sequence, tokens, future)
+        self._waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._hold_times: Deque[float] = deque(maxlen=50)
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected": 0,
+            "evicted": 0,
+            "timed_out": 0,
+            "rate_limited": 0,
+        }
+
+    def _live_waiters(self) -> List[Tuple[int, int, int, asyncio.Future]]:
+        return [w for w in self._waiters if not w[3].done()]
+
+    def _admission_delay(self, tokens: int) -> Optional[float]:
+        """Seconds until a call could start, or None while concurrency is maxed"""
+        if self.active >= self.max_concurrency:
+            return None
+        return max(self.requests.time_until(1), self.tokens.time_until(tokens))
+
+    def _admit(self, tokens: int):
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        self.active += 1
+        self.counters["admitted"] += 1
+
+    def _pump(self):
+        """Admit waiters in priority order while limits allow"""
+        self._timer = None
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._admission_delay(tokens)
+            if delay is None:
+                return  # release() pumps again
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            heapq.heappop(self._waiters)
+            self._admit(tokens)
+            future.set_result(None)
+
+    def retry_after(self) -> float:
+        """Estimated seconds until a newly queued call would be admitted"""
+        backlog = len(self._live_waiters()) + 1
+        avg_hold = (
+            sum(self._hold_times) / len(self._hold_times) if self._hold_times else 5.0
+        )
+        by_concurrency = avg_hold * backlog / self.max_concurrency
+        by_rate = self.requests.time_until(min(backlog, self.requests.capacity or 1))
+        return max(1.0, by_concurrency, by_rate)
+
+    def _reject(self, counter: str) -> LLMQueueFullError:
+        self.counters[counter] += 1
+        retry_after = self.retry_after()
+        return LLMQueueFullError(
+            f"{self.provider} LLM queue is full; retry in {math.ceil(retry_after)}s",
+            retry_after,
+        )
+
+    def _make_room(self, priority: int) -> bool:
+        """Ensure a queue slot for `priority`, evicting a lower-priority waiter"""
+        waiters = self._live_waiters()
+        if len(waiters) < config.LLM_QUEUE_MAX:
+            return True
+        victim = max(waiters, key=lambda w: (w[0], w[1]))
+        if victim[0] <= priority:
+            return False
+        victim[3].set_exception(self._reject("evicted"))
+        return True
+
+    def can_admit(self, priority: int) -> bool:
+        waiters = self._live_waiters()
+        return len(waiters) < config.LLM_QUEUE_MAX or any(
+            w[0] > priority for w in waiters
+        )
+
+    async def acquire(self, priority: int, tokens: int):
+        if not self._live_waiters() and self._admission_delay(tokens) == 0:
+            self._admit(tokens)
+            return
+
+        if not self._make_room(priority):
+            raise self._reject("rejected")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters, (priority, next(self._sequence), tokens, future)
+        )
+        self.counters["queued"] += 1
+        if self._timer is None:
+            self._pump()
+
+        try:
+            await asyncio.wait_for(future, timeout=config.LLM_QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                return  # admitted just as the timeout fired
+            raise self._reject("timed_out")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(0.0)
+            raise
+
+    def release(self, held_s: float):
+        self.active -= 1
+        if held_s:
+            self._hold_times.append(held_s)
+        if self._timer is None:
+            self._pump()
+
+    def note_rate_limited(self):
+        """Provider rejected a call despite our limits: pause admissions briefly"""
+        self.counters["rate_limited"] += 1
+        self.requests.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        waiters = self._live_waiters()
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "waiting": len(waiters),
+            "waiting_by_priority": {
+                str(p): sum(1 for w in waiters if w[0] == p)
+                for p in sorted({w[0] for w in waiters})
+            },
+            **self.counters,
+        }
+
+
+class LLMScheduler:
+    """Per-provider admission queues shared by every LLM call in the process"""
+
+    def __init__(self):
+        self._queues: Dict[str, ProviderQueue] = {}
+
+    def _queue(self, model_id: str) -> ProviderQueue:
+        provider, _ = resolve_model(model_id)
+        if provider not in self._queues:
+            limits = config.LLM_PROVIDER_LIMITS.get(
+                provider, config.LLM_PROVIDER_LIMITS["default"]
+            )
+            self._queues[provider] = ProviderQueue(provider, limits)
+        return self._queues[provider]
+
+    def check_admission(self, model_ids: Iterable[str], priority: int):
+        """Fail fast (before any DB/weather work) when every provider queue is full"""
+        queues = [self._queue(model_id) for model_id in model_ids]
+        if any(queue.can_admit(priority) for queue in queues):
+            return
+        retry_after = min(queue.retry_after() for queue in queues)
+        for queue in queues:
+            queue.counters["rejected"] += 1
+        raise LLMQueueFullError(
+            f"LLM queues are full; retry in {math.ceil(retry_after)}s", retry_after
+        )
+
+    @asynccontextmanager
+    async def slot(self, model_id: str, priority: int, tokens: int):
+        """Hold one admitted call to `model_id`'s provider for the block's duration"""
+        queue = self._queue(model_id)
+        await queue.acquire(priority, tokens)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            yield
+        finally:
+            queue.release(loop.time() - started)
+
+    def note_rate_limited(self, model_id: str):
+        _logger.warning("Provider rate limit hit for %s; pausing admissions", model_id)
+        self._queue(model_id).note_rate_limited()
+
+    def stats(self) -> Dict[str, Any]:
+        return {provider: queue.stats() for provider, queue in self._queues.items()}
+
+
+# Global scheduler instance shared by all LLM calls
+llm_scheduler = LLMScheduler()
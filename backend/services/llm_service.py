@@ -5,7 +5,15 @@ from sqlalchemy import select, and_, or_, func, text
 from sqlalchemy.exc import SQLAlchemyError
 from .prompt_service import PromptService
 from .api_utils import get_weather_async
+from .matrix_service import matrix_service
+from .reachability_service import reachability_service
+from .dispatch_grounding import ground_dispatch_plan
+from .gazetteer import gazetteer
+from . import read_queries
+from .weather_service import weather_service
+from .forecast_service import forecast_service, resolve_request_time
 from config import config
+from database import release_connection
 from models.database_models import Station, Truck, Delivery
 from models.data_models import (
     StationData,
@@ -15,83 +23,68 @@ from models.data_models import (
     WeatherResult,
     WeatherData,
     RouteOptimizationResponse,
+    DispatchContext,
 )
-from typing import Dict, Any, Optional, List
+from models.llm_output_models import (
+    RouteOptimizationOutput,
+    DispatchOptimizationOutput,
+    BatchDispatchOutput,
+)
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, Dict, Any, Optional, List, Tuple, Type
+import asyncio
 import logging
+import time
+from dataclasses import replace
+from datetime import datetime
 import re
 from utils.serializers import station_available_dict, truck_simple_dict
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from .lc_router import get_chat_model
+from .llm_executor import llm_executor, LLMUnavailableError
+from .llm_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_DISPATCH,
+    PRIORITY_ROUTE,
+    LLMQueueFullError,
+    estimate_tokens,
+)
+from .response_parser import (
+    ParsedResponse,
+    PARENTHESIZED_RE,
+    clean_markdown,
+    parse_key_value_lines,
+)
 import os 
 
+SCRIPT_BLOCK_RE = re.compile(r"(?i)<script.*?>.*?</script>", re.DOTALL)
+
+
+class StructuredOutputUnsupported(Exception):
+    """No model in the chain can produce schema-constrained output"""
+
+
+class StructuredOutputInvalid(ValueError):
+    """The model answered, but not with output matching the schema"""
+
+    def __init__(self, message: str, raw_text: str = ""):
+        super().__init__(message)
+        # Sanitized text content of the reply, if it had any
+        self.raw_text = raw_text
+
 
 class LLMService:
     def __init__(self):
         self.prompt_service = PromptService()
         self._logger = logging.getLogger(__name__)
 
-    def _extract_section(self, ai_response: str, section_name: str) -> str:
-        """
-        Helper method to extract a section from AI response
-        Returns the content between section_name and next ### marker
-        """
-        if section_name not in ai_response:
-            return ""
-
-        section_content = ai_response.split(section_name)[1]
-        if "###" in section_content:
-            section_content = section_content.split("###")[0]
-
-        return section_content.strip()
-
     def _clean_markdown(self, text: str) -> str:
         """
         Remove markdown formatting from text.
         Removes bold (**), italic (*), and other common markdown syntax.
         """
-        if not text:
-            return text
-
-        import re
-
-        cleaned = text
-        # Remove bold markdown (**text**)
-        cleaned = re.sub(r"\*\*(.+?)\*\*", r"\1", cleaned)
-        # Remove italic markdown (*text* but not ** which is already handled)
-        cleaned = re.sub(r"(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)", r"\1", cleaned)
-        # Remove underline markdown (__text__ and _text_)
-        cleaned = re.sub(r"__(.+?)__", r"\1", cleaned)
-        cleaned = re.sub(r"_(.+?)_", r"\1", cleaned)
-        # Remove standalone ** or * that weren't part of pairs
-        cleaned = re.sub(r"\*\*", "", cleaned)
-        cleaned = re.sub(r"(?<!\w)\*(?!\w)", "", cleaned)
-
-        return cleaned.strip()
-
-    def _parse_key_value_lines(self, text: str, mappings: dict) -> dict:
-        """
-        Helper method to parse key-value pairs from text lines
-        mappings: dict of {search_key: result_key}
-        Example: {"Total Distance:": "total_distance"}
-        """
-        result = {}
-        lines = text.split("\n")
-
-        for line in lines:
-            line = line.strip()
-            for search_key, result_key in mappings.items():
-                if search_key in line:
-                    # Split only once after the search key to preserve time values (e.g., "6:00 AM")
-                    parts = line.split(search_key, 1)
-                    if len(parts) > 1:
-                        value = parts[1].strip()
-                        if value:  # Only add if not empty
-                            # Clean markdown formatting from the value
-                            result[result_key] = self._clean_markdown(value)
-                    break  # Move to next line after finding a match
-
-        return result
+        return clean_markdown(text)
 
     async def optimize_route(
     self,
@@ -106,14 +99,26 @@ class LLMService:
     delivery_date: Optional[str] = None,
     vehicle_type: str = "fuel_delivery_truck",
     notes: Optional[str] = None,
+    weather_data: Optional[WeatherResult] = None,
+    db_data: Optional[DatabaseResult] = None,
     ) -> Dict[str, Any]:
-        """Generate route optimization using standardized data models with SQLAlchemy 2.0"""
+        """
+        Generate route optimization using standardized data models with SQLAlchemy 2.0.
+        Callers that already loaded `weather_data` / `db_data` (batch routes)
+        can pass them in to skip the lookups.
+        """
+        llm_executor.check_admission(llm_model, PRIORITY_ROUTE)
 
         # Get standardized data using SQLAlchemy
-        db_data = await self._get_database_data_sqlalchemy(
-            session, from_location, to_location
-        )
-        weather_data = await self._get_weather_data(from_location, to_location)
+        if db_data is None:
+            db_data = await self._get_database_data_sqlalchemy(
+                session, from_location, to_location
+            )
+            await release_connection(session)
+        if weather_data is None:
+            weather_data = await self._get_weather_data(
+                from_location, to_location, departure_time, arrival_time, delivery_date
+            )
 
         # Create prompt with standardized data
         comprehensive_prompt = self.prompt_service.format_comprehensive_prompt(
@@ -122,6 +127,7 @@ class LLMService:
             stations_data=db_data.stations,
             historical_routes=db_data.deliveries,
             weather_data=weather_data,
+            station_weather=weather_service.for_stations(db_data.stations),
             vehicle_type=vehicle_type,
             departure_time=departure_time,
             arrival_time=arrival_time,
@@ -130,7 +136,19 @@ class LLMService:
             notes=notes,
         )
 
-        ai_response = await self._call_llm(comprehensive_prompt, llm_model)
+        structured, ai_response = await self._call_llm_with_schema(
+            comprehensive_prompt, llm_model, RouteOptimizationOutput, PRIORITY_ROUTE
+        )
+        if structured is not None:
+            return self._build_comprehensive_from_structured(
+                structured,
+                ai_response,
+                db_data,
+                weather_data,
+                departure_time,
+                arrival_time,
+                time_mode,
+            )
         # Debug: log ai response type/size for troubleshooting frontend display issues
         try:
             self._logger.debug(
@@ -155,35 +173,116 @@ class LLMService:
     session: AsyncSession,
     # Default model is Gemini 2.5 Flash; override by passing llm_model in API request (e.g., 'openai:gpt-4o', 'anthropic:claude-3-sonnet')
     llm_model: str = os.getenv("DEFAULT_LLM_MODEL", "models/gemini-2.5-flash"),
+    priority: int = PRIORITY_DISPATCH,
+    inputs: Optional[Tuple[TruckData, List[StationData]]] = None,
     ) -> Dict[str, Any]:
-        """Optimize dispatch route for a truck to deliver fuel to stations in need using SQLAlchemy 2.0"""
+        """
+        Optimize dispatch route for a truck to deliver fuel to stations in need using SQLAlchemy 2.0.
+        Pass `inputs` from load_dispatch_inputs() to skip reading them again.
+        """
+        llm_executor.check_admission(llm_model, priority)
         try:
-            # Get truck details using SQLAlchemy
-            truck = await self._get_truck_by_id_sqlalchemy(session, truck_id)
-            if not truck:
-                raise ValueError(f"Truck {truck_id} not found")
-
-            # Get stations needing fuel using SQLAlchemy
-            stations_needing_fuel = await self._get_stations_needing_refuel_sqlalchemy(
-                session
+            truck, stations = inputs or await self.load_dispatch_inputs(session, truck_id)
+            context = await self.load_dispatch_context(session, depot_location, stations)
+            return await self.optimize_dispatch_for_truck(
+                truck, context, llm_model, priority
             )
 
-            # Get weather for depot location
-            try:
-                depot_weather = await get_weather_async(depot_location)
-            except:
-                depot_weather = WeatherData(depot_location, 20, "Clear", 10, 50)
+        except Exception as e:
+            print(f"Dispatch optimization failed: {e}")
+            raise
+
+    async def load_dispatch_inputs(
+        self, session: AsyncSession, truck_id: str
+    ) -> Tuple[TruckData, List[StationData]]:
+        """The truck and the stations needing fuel that a dispatch plan is built from"""
+        # Get truck details using SQLAlchemy
+        truck = await self._get_truck_by_id_sqlalchemy(session, truck_id)
+        if not truck:
+            raise ValueError(f"Truck {truck_id} not found")
+        return truck, await self._get_stations_needing_refuel_sqlalchemy(session)
+
+    async def load_dispatch_context(
+        self,
+        session: AsyncSession,
+        depot_location: str,
+        stations: Optional[List[StationData]] = None,
+    ) -> DispatchContext:
+        """Load the inputs shared by every truck's dispatch plan from one depot"""
+        # Get stations needing fuel using SQLAlchemy, unless the caller already has them
+        if stations is None:
+            stations = await self._get_stations_needing_refuel_sqlalchemy(session)
+        stations_needing_fuel = stations
+        await gazetteer.ensure_fresh(session)
+        # Nothing below reads the database
+        await release_connection(session)
+
+        # Get weather for depot location
+        try:
+            depot_weather = await self._get_location_weather(depot_location)
+        except Exception:
+            depot_weather = WeatherData(depot_location, 20, "Clear", 10, 50)
+
+        # Depot coordinates from the gazetteer, else from the weather lookup
+        depot_place = gazetteer.resolve(depot_location)
+        if depot_place is not None:
+            depot_point = depot_place.point
+        elif depot_weather.lat is not None and depot_weather.lon is not None:
+            depot_point = (depot_weather.lat, depot_weather.lon)
+        else:
+            depot_point = None
+
+        # Road distances/times between the stations, fetched as one matrix
+        travel_costs = await matrix_service.station_costs(stations_needing_fuel)
+        # Conditions at every station from the local grid, no API calls
+        station_weather = weather_service.for_stations(stations_needing_fuel)
+
+        return DispatchContext(
+            depot_location=depot_location,
+            stations=stations_needing_fuel,
+            depot_weather=depot_weather,
+            stations_prompt=self.prompt_service.format_dispatch_stations(
+                stations_needing_fuel, travel_costs, station_weather
+            ),
+            travel_costs=travel_costs,
+            depot_point=depot_point,
+            station_weather=station_weather,
+        )
+
+    async def optimize_dispatch_for_truck(
+        self,
+        truck: TruckData,
+        context: DispatchContext,
+        llm_model: str,
+        priority: int = PRIORITY_DISPATCH,
+    ) -> Dict[str, Any]:
+        """Dispatch plan for one truck from a preloaded context (no DB access)"""
+        stations, stations_prompt = await self._reachable_dispatch_stations(
+            truck, context
+        )
+
+        # Create dispatch optimization prompt
+        prompt = self._create_dispatch_prompt(
+            truck=truck,
+            stations=stations,
+            depot_location=context.depot_location,
+            depot_weather=context.depot_weather,
+            stations_prompt=stations_prompt,
+        )
 
-            # Create dispatch optimization prompt
-            prompt = self._create_dispatch_prompt(
+        # Get AI optimization
+        structured, ai_response = await self._call_llm_with_schema(
+            prompt, llm_model, DispatchOptimizationOutput, priority
+        )
+        if structured is not None:
+            result = self._build_dispatch_from_structured(
+                structured,
+                ai_response=ai_response,
                 truck=truck,
-                stations=stations_needing_fuel,
-                depot_location=depot_location,
-                depot_weather=depot_weather,
+                stations=stations,
+                depot_location=context.depot_location,
             )
-
-            # Get AI optimization
-            ai_response = await self._call_llm(prompt, llm_model)
+        else:
             # Debug: log ai response type/size for troubleshooting frontend display issues
             try:
                 self._logger.debug(
@@ -192,25 +291,235 @@ class LLMService:
                     len(ai_response) if ai_response is not None else 0,
                 )
                 if ai_response:
-                    self._logger.debug(
-                        "ai_response preview: %s", str(ai_response)[:300]
-                    )
+                    self._logger.debug("ai_response preview: %s", str(ai_response)[:300])
             except Exception:
-                self._logger.exception(
-                    "optimize_dispatch ai_response repr logging failed"
-                )
+                self._logger.exception("optimize_dispatch ai_response repr logging failed")
 
-            # Parse and return dispatch plan
-            return self._parse_dispatch_response(
+            # Parse dispatch plan
+            result = self._parse_dispatch_response(
                 ai_response=ai_response,
                 truck=truck,
-                stations=stations_needing_fuel,
-                depot_location=depot_location,
+                stations=stations,
+                depot_location=context.depot_location,
             )
 
-        except Exception as e:
-            print(f"Dispatch optimization failed: {e}")
-            raise
+        # Replace the model's distances/ETAs with one real multi-stop route
+        if config.DISPATCH_ROUTE_GROUNDING:
+            await ground_dispatch_plan(result, stations, context.depot_point)
+        return result
+
+    async def _reachable_dispatch_stations(
+        self, truck: TruckData, context: DispatchContext
+    ) -> Tuple[List[StationData], Optional[str]]:
+        """Narrow the context's stations to those this truck can reach from the depot"""
+        if (
+            not config.REACHABLE_FILTER_ENABLED
+            or not context.stations
+            or not truck.max_range_km
+            or context.depot_point is None
+        ):
+            return context.stations, context.stations_prompt
+
+        reachable = await reachability_service.reachable_stations(
+            context.depot_point,
+            context.stations,
+            truck.max_range_km * config.REACHABLE_RANGE_FRACTION,
+        )
+        if len(reachable) == len(context.stations):
+            return context.stations, context.stations_prompt
+        self._logger.debug(
+            "Truck %s can reach %d of %d stations",
+            truck.code,
+            len(reachable),
+            len(context.stations),
+        )
+        return reachable, self.prompt_service.format_dispatch_stations(
+            reachable, context.travel_costs, context.station_weather
+        )
+
+    async def prepare_fleet_dispatch(
+        self,
+        session: AsyncSession,
+        depot_location: str,
+        truck_ids: Optional[List[str]] = None,
+    ) -> Tuple[List[TruckData], List[str], DispatchContext]:
+        """
+        Load everything a fleet-wide plan needs in one pass: the trucks
+        (all active ones unless `truck_ids` is given), the identifiers that
+        matched no truck, and the shared dispatch context.
+        """
+        if truck_ids:
+            trucks, missing = [], []
+            for truck_id in truck_ids:
+                truck = await self._get_truck_by_id_sqlalchemy(session, truck_id)
+                if truck is None:
+                    missing.append(truck_id)
+                elif all(t.id != truck.id for t in trucks):
+                    trucks.append(truck)
+        else:
+            trucks, missing = await self._get_active_trucks_sqlalchemy(session), []
+        context = await self.load_dispatch_context(session, depot_location)
+        return trucks, missing, context
+
+    async def stream_fleet_dispatch(
+        self,
+        trucks: List[TruckData],
+        context: DispatchContext,
+        llm_model: str,
+        max_concurrency: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Plan every truck against the shared context, at most `max_concurrency`
+        at a time, yielding each truck's outcome as soon as it completes.
+        Pending plans are cancelled if the consumer stops iterating.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def plan(truck: TruckData) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.perf_counter()
+                outcome = {"type": "truck", "truck_id": truck.id, "truck_code": truck.code}
+                try:
+                    result = await self.optimize_dispatch_for_truck(
+                        truck, context, llm_model, PRIORITY_BATCH
+                    )
+                    outcome.update(status="ok", result=result)
+                except LLMQueueFullError as e:
+                    outcome.update(status="error", error=str(e), retry_after=e.retry_after)
+                except Exception as e:
+                    self._logger.warning("Fleet plan for %s failed: %s", truck.code, e)
+                    outcome.update(status="error", error=str(e))
+                outcome["duration_s"] = round(time.perf_counter() - started, 2)
+                return outcome
+
+        tasks = [asyncio.create_task(plan(truck)) for truck in trucks]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def optimize_routes_batch(
+        self,
+        session: AsyncSession,
+        lanes: List[Dict[str, Any]],
+        llm_model: str,
+        max_concurrency: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Optimize many (from, to, date) lanes at once. Weather is fetched once
+        per distinct city and DB context once per distinct city pair, then the
+        LLM calls run concurrently; weather lookups and LLM calls each run at
+        most `max_concurrency` at a time. Identical lanes are optimized once. Returns one outcome per lane, in order.
+        """
+
+        def norm(location: str) -> str:
+            place = gazetteer.resolve(location)
+            if place is not None:
+                return place.label.casefold()
+            return " ".join(location.split()).casefold()
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def location_weather(city: str):
+            async with semaphore:
+                return await self._get_location_weather(city)
+
+        # Weather: one request per distinct city, at most max_concurrency at once
+        cities = {}
+        for lane in lanes:
+            for location in (lane["from_location"], lane["to_location"]):
+                cities.setdefault(norm(location), location)
+        fetched = await asyncio.gather(
+            *(location_weather(city) for city in cities.values()),
+            return_exceptions=True,
+        )
+        weather = {
+            key: None if isinstance(result, BaseException) else result
+            for key, result in zip(cities, fetched)
+        }
+
+        # DB context: one load per distinct city pair (the session is not
+        # safe for concurrent use, so these run sequentially)
+        db_context: Dict[Tuple[str, str], Any] = {}
+        for lane in lanes:
+            pair = (norm(lane["from_location"]), norm(lane["to_location"]))
+            if pair not in db_context:
+                try:
+                    db_context[pair] = await self._get_database_data_sqlalchemy(
+                        session, lane["from_location"], lane["to_location"]
+                    )
+                except Exception as e:
+                    db_context[pair] = e
+        await release_connection(session)
+
+        async def optimize(lane: Dict[str, Any]) -> Dict[str, Any]:
+            pair = (norm(lane["from_location"]), norm(lane["to_location"]))
+            if isinstance(db_context[pair], Exception):
+                raise db_context[pair]
+            from_weather, to_weather = weather[pair[0]], weather[pair[1]]
+            planned = resolve_request_time(None, lane.get("delivery_date"))
+            if planned is not None:
+                # Forecasts for the delivery date come from the local cache
+                from_weather = self._cached_forecast(lane["from_location"], planned) or from_weather
+                to_weather = self._cached_forecast(lane["to_location"], planned) or to_weather
+            # Same fallback as _get_weather_data, but only for the side that failed
+            empty_weather = WeatherData("Unknown", 0, "Unknown", 0, 0)
+            if from_weather is None:
+                from_weather = empty_weather
+            if to_weather is None:
+                to_weather = empty_weather
+            async with semaphore:
+                return await self.optimize_route(
+                    lane["from_location"],
+                    lane["to_location"],
+                    session,
+                    llm_model,
+                    delivery_date=lane.get("delivery_date"),
+                    vehicle_type=lane.get("vehicle_type") or "fuel_delivery_truck",
+                    notes=lane.get("notes"),
+                    weather_data=WeatherResult(from_weather, to_weather),
+                    db_data=db_context[pair],
+                )
+
+        # Identical lanes share one optimization
+        unique: Dict[Tuple, asyncio.Task] = {}
+        lane_tasks = []
+        for lane in lanes:
+            key = (
+                norm(lane["from_location"]),
+                norm(lane["to_location"]),
+                lane.get("delivery_date"),
+                lane.get("vehicle_type"),
+                lane.get("notes"),
+            )
+            if key not in unique:
+                unique[key] = asyncio.create_task(optimize(lane))
+            lane_tasks.append(unique[key])
+
+        try:
+            await asyncio.gather(*unique.values(), return_exceptions=True)
+        finally:
+            for task in unique.values():
+                task.cancel()
+
+        outcomes = []
+        for index, (lane, task) in enumerate(zip(lanes, lane_tasks)):
+            outcome = {
+                "index": index,
+                "from_location": lane["from_location"],
+                "to_location": lane["to_location"],
+            }
+            error = task.exception()
+            if error is None:
+                outcome.update(status="ok", result=task.result())
+            else:
+                outcome.update(status="error", error=str(error))
+                if isinstance(error, LLMQueueFullError):
+                    outcome["retry_after"] = error.retry_after
+            outcomes.append(outcome)
+        return outcomes
 
     async def get_dispatch_recommendations(
         self,
@@ -222,6 +531,7 @@ class LLMService:
         filter_city: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Get AI-powered batch dispatch recommendations for optimal truck-station matching"""
+        llm_executor.check_admission(llm_model, PRIORITY_BATCH)
         try:
             # Get all active trucks
             trucks = await self._get_active_trucks_sqlalchemy(session)
@@ -237,6 +547,7 @@ class LLMService:
             stations_needing_fuel = await self._get_stations_needing_refuel_sqlalchemy(
                 session, filter_region=filter_region, filter_city=filter_city
             )
+            await release_connection(session)
             if not stations_needing_fuel:
                 filter_msg = ""
                 if filter_region:
@@ -254,8 +565,8 @@ class LLMService:
 
             # Get weather for depot location
             try:
-                depot_weather = await get_weather_async(depot_location)
-            except:
+                depot_weather = await self._get_location_weather(depot_location)
+            except Exception:
                 depot_weather = WeatherData(depot_location, 20, "Clear", 10, 50)
 
             # Create batch dispatch recommendations prompt
@@ -268,15 +579,25 @@ class LLMService:
             )
 
             # Get AI recommendations
-            ai_response = await self._call_llm(prompt, llm_model)
+            structured, ai_response = await self._call_llm_with_schema(
+                prompt, llm_model, BatchDispatchOutput, PRIORITY_BATCH
+            )
 
             # Parse and return recommendations
-            result = self._parse_batch_dispatch_response(
-                ai_response=ai_response,
-                trucks=trucks,
-                stations=stations_needing_fuel,
-                depot_location=depot_location,
-            )
+            if structured is not None:
+                result = self._build_batch_dispatch_from_structured(
+                    structured,
+                    ai_response=ai_response,
+                    trucks=trucks,
+                    stations=stations_needing_fuel,
+                )
+            else:
+                result = self._parse_batch_dispatch_response(
+                    ai_response=ai_response,
+                    trucks=trucks,
+                    stations=stations_needing_fuel,
+                    depot_location=depot_location,
+                )
             
             # Add filter information to response
             result["filter_region"] = filter_region
@@ -288,11 +609,26 @@ class LLMService:
             print(f"Batch dispatch recommendations failed: {e}")
             raise
 
+    def _location_filter(self, location: str):
+        """
+        Station predicate for a location: indexed city/region equality when
+        the gazetteer resolves it, substring match otherwise.
+        """
+        place = gazetteer.resolve(location)
+        if place is not None:
+            return and_(Station.city == place.city, Station.region == place.region)
+        return or_(
+            Station.city.like(f"%{location}%"),
+            Station.region.like(f"%{location}%"),
+        )
+
     async def _get_database_data_sqlalchemy(
         self, session: AsyncSession, from_location: str, to_location: str
     ) -> DatabaseResult:
         """Query database using SQLAlchemy 2.0 and return standardized data models"""
         try:
+            await gazetteer.ensure_fresh(session)
+
             # Get stations with fuel above minimum threshold
             stations_stmt = (
                 select(Station)
@@ -341,10 +677,8 @@ class LLMService:
                         Delivery.delivery_date
                         >= func.date_sub(func.now(), text("INTERVAL 30 DAY")),
                         or_(
-                            Station.city.like(f"%{from_location}%"),
-                            Station.region.like(f"%{from_location}%"),
-                            Station.city.like(f"%{to_location}%"),
-                            Station.region.like(f"%{to_location}%"),
+                            self._location_filter(from_location),
+                            self._location_filter(to_location),
                         ),
                     )
                 )
@@ -399,13 +733,58 @@ class LLMService:
             self._logger.exception("SQLAlchemy database query failed")
             raise
 
+    async def _get_location_weather(
+        self, location: str, when: Optional[datetime] = None
+    ) -> WeatherData:
+        """
+        Weather for a free-text location. Locations the gazetteer knows are
+        queried by coordinates (no server-side geocoding, one cache entry per
+        place however the name was typed) and keep the canonical city name.
+        Places covered by the weather collector are served locally, and a
+        planned time `when` is answered from the forecast cache when covered.
+        """
+        if when is not None:
+            forecast = self._cached_forecast(location, when)
+            if forecast is not None:
+                return forecast
+        place = gazetteer.resolve(location)
+        if place is None:
+            return await get_weather_async(location)
+        collected = weather_service.latest(place)
+        if collected is not None:
+            # The nearest cell may be labelled with a neighbouring city
+            return replace(collected, city=place.city, location=place.city)
+        weather = await get_weather_async(f"{place.lat},{place.lon}")
+        return replace(weather, city=place.city, location=place.city)
+
+    def _cached_forecast(self, location: str, when: datetime) -> Optional[WeatherData]:
+        """Forecast for a location at `when` from the local cache only"""
+        place = gazetteer.resolve(location)
+        if place is None:
+            return None
+        forecast = forecast_service.for_place(place, when)
+        if forecast is None:
+            return None
+        return replace(forecast, city=place.city, location=place.city)
+
     async def _get_weather_data(
-        self, from_location: str, to_location: str
+        self,
+        from_location: str,
+        to_location: str,
+        departure_time: Optional[str] = None,
+        arrival_time: Optional[str] = None,
+        delivery_date: Optional[str] = None,
     ) -> WeatherResult:
-        """Get weather data using standardized models (async)"""
+        """
+        Get weather data using standardized models (async). With planned
+        times, the origin uses the departure forecast and the destination
+        the arrival forecast (the departure one if no arrival is given).
+        """
+        departs = resolve_request_time(departure_time, delivery_date)
+        arrives = resolve_request_time(arrival_time, delivery_date) or departs
         try:
-            from_weather = await get_weather_async(from_location)
-            to_weather = await get_weather_async(to_location)
+            from_weather = await self._get_location_weather(from_location, departs)
+            to_weather = await self._get_location_weather(to_location, arrives)
             return WeatherResult(from_weather, to_weather)
         except Exception as e:
             self._logger.exception("Weather data failed")
@@ -413,143 +792,12 @@ class LLMService:
             empty_weather = WeatherData("Unknown", 0, "Unknown", 0, 0)
             return WeatherResult(empty_weather, empty_weather)
 
-    async def get_all_stations_sqlalchemy(
-        self, session: AsyncSession
-    ) -> list[StationData]:
-        """Get all stations using SQLAlchemy 2.0 - new method"""
-        try:
-            stmt = select(Station).order_by(Station.name)
-            result = await session.execute(stmt)
-            stations_orm = result.scalars().all()
-
-            # Convert SQLAlchemy models to data models
-            stations = []
-            for station in stations_orm:
-                station_data = StationData(
-                    id=station.id,
-                    code=station.code,
-                    name=station.name,
-                    lat=float(station.lat) if station.lat else None,
-                    lon=float(station.lon) if station.lon else None,
-                    city=station.city,
-                    region=station.region,
-                    fuel_type=station.fuel_type,
-                    capacity_liters=(
-                        float(station.capacity_liters)
-                        if station.capacity_liters
-                        else None
-                    ),
-                    current_level_liters=(
-                        float(station.current_level_liters)
-                        if station.current_level_liters
-                        else None
-                    ),
-                    request_method=station.request_method,
-                    low_fuel_threshold=(
-                        float(station.low_fuel_threshold)
-                        if station.low_fuel_threshold
-                        else None
-                    ),
-                )
-                stations.append(station_data)
-
-            return stations
-        except SQLAlchemyError as e:
-            self._logger.exception("SQLAlchemy error getting stations")
-            return []
-        except Exception as e:
-            self._logger.exception("Failed to get stations")
-            return []
-
-    async def get_all_trucks_sqlalchemy(self, session: AsyncSession) -> list[TruckData]:
-        """Get all trucks using SQLAlchemy 2.0 - new method"""
-        try:
-            stmt = select(Truck).order_by(Truck.code)
-            result = await session.execute(stmt)
-            trucks_orm = result.scalars().all()
-
-            trucks = []
-            for truck in trucks_orm:
-                # Get compartments using SQLAlchemy relationship
-                await session.refresh(truck, attribute_names=["compartments"])
-
-                compartments = []
-                for comp in truck.compartments:
-                    compartments.append(
-                        {
-                            "compartment_number": comp.compartment_number,
-                            "fuel_type": comp.fuel_type,
-                            "capacity_liters": float(comp.capacity_liters),
-                            "current_level_liters": float(comp.current_level_liters),
-                        }
-                    )
-
-                truck_data = TruckData(
-                    id=truck.id,
-                    code=truck.code,
-                    plate=truck.plate,
-                    capacity_liters=(
-                        float(truck.capacity_liters) if truck.capacity_liters else None
-                    ),
-                    fuel_level_percent=truck.fuel_level_percent,
-                    fuel_type=truck.fuel_type,
-                    status=truck.status,
-                    compartments=compartments,
-                )
-                trucks.append(truck_data)
-
-            return trucks
-        except SQLAlchemyError as e:
-            self._logger.exception("SQLAlchemy error getting trucks")
-            return []
-        except Exception as e:
-            self._logger.exception("Failed to get trucks")
-            return []
-
     async def _get_active_trucks_sqlalchemy(
         self, session: AsyncSession
     ) -> List[TruckData]:
-        """Get all active trucks using SQLAlchemy 2.0"""
+        """Get all active trucks with their compartments (Core read, no ORM objects)"""
         try:
-            # Query active trucks
-            stmt = select(Truck).where(Truck.status == "active")
-            result = await session.execute(stmt)
-            trucks_orm = result.scalars().all()
-
-            trucks = []
-            for truck_orm in trucks_orm:
-                # Get compartments
-                await session.refresh(truck_orm, attribute_names=["compartments"])
-                
-                compartments = []
-                for comp in truck_orm.compartments:
-                    compartments.append(
-                        {
-                            "compartment_number": comp.compartment_number,
-                            "fuel_type": comp.fuel_type,
-                            "capacity_liters": float(comp.capacity_liters),
-                            "current_level_liters": float(comp.current_level_liters),
-                        }
-                    )
-
-                trucks.append(
-                    TruckData(
-                        id=truck_orm.id,
-                        code=truck_orm.code,
-                        plate=truck_orm.plate,
-                        capacity_liters=(
-                            float(truck_orm.capacity_liters)
-                            if truck_orm.capacity_liters
-                            else None
-                        ),
-                        fuel_level_percent=truck_orm.fuel_level_percent,
-                        fuel_type=truck_orm.fuel_type,
-                        status=truck_orm.status,
-                        compartments=compartments,
-                    )
-                )
-            
-            return trucks
+            return await read_queries.active_trucks(session)
         except SQLAlchemyError as e:
             self._logger.exception("SQLAlchemy error getting active trucks")
             return []
@@ -638,57 +886,11 @@ class LLMService:
     async def _get_stations_needing_refuel_sqlalchemy(
         self, session: AsyncSession, filter_region: Optional[str] = None, filter_city: Optional[str] = None
     ) -> List[StationData]:
-        """Get stations that need refueling using SQLAlchemy 2.0 with optional filters"""
+        """Get stations that need refueling, most urgent first, with optional filters"""
         try:
-            # Build filter conditions
-            filter_conditions = [
-                Station.current_level_liters.isnot(None),
-                Station.capacity_liters.isnot(None),
-                Station.capacity_liters > 0,
-                Station.low_fuel_threshold.isnot(None),
-                Station.current_level_liters < Station.low_fuel_threshold,
-            ]
-            
-            # Add regional filters if provided
-            if filter_region:
-                filter_conditions.append(Station.region == filter_region)
-            if filter_city:
-                filter_conditions.append(Station.city == filter_city)
-            
-            # Calculate fuel percentage and filter for low fuel stations
-            stmt = (
-                select(Station)
-                .where(and_(*filter_conditions))
-                .order_by(
-                    # Order by urgency - lowest fuel percentage first
-                    (Station.current_level_liters / Station.capacity_liters).asc()
-                )
+            return await read_queries.stations_needing_refuel(
+                session, filter_region, filter_city
             )
-
-            result = await session.execute(stmt)
-            stations_orm = result.scalars().all()
-
-            stations = []
-            for station in stations_orm:
-                station_data = StationData(
-                    id=station.id,
-                    code=station.code,
-                    name=station.name,
-                    lat=station.lat,
-                    lon=station.lon,
-                    city=station.city,
-                    region=station.region,
-                    fuel_type=station.fuel_type,
-                    capacity_liters=station.capacity_liters,
-                    current_level_liters=station.current_level_liters,
-                    request_method=station.request_method,
-                    low_fuel_threshold=station.low_fuel_threshold,
-                    needs_refuel=station.current_level_liters
-                    < station.low_fuel_threshold,
-                )
-                stations.append(station_data)
-
-            return stations
         except SQLAlchemyError as e:
             self._logger.exception("SQLAlchemy error getting stations needing refuel")
             return []
@@ -794,29 +996,208 @@ class LLMService:
             else:
                 self._logger.exception("API call failed: %s", e)
                 raise
-    async def _call_llm(self, prompt: str, model_id: str) -> str:
+    def _sanitize_ai_text(self, text: str) -> str:
+        """Remove script blocks and escape angle brackets in LLM output"""
+        text = SCRIPT_BLOCK_RE.sub("", text)
+        return text.replace("<", "&lt;").replace(">", "&gt;").strip()
+
+    def _sanitize_structured(self, value: Any) -> Any:
+        """Apply _sanitize_ai_text to every string in a dumped structured answer"""
+        if isinstance(value, str):
+            return self._sanitize_ai_text(value)
+        if isinstance(value, dict):
+            return {k: self._sanitize_structured(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._sanitize_structured(v) for v in value]
+        return value
+
+    def _message_text(self, message: Any) -> str:
+        """Sanitized text content of a chat message (string or content blocks)"""
+        content = getattr(message, "content", None)
+        if isinstance(content, list):
+            content = "".join(
+                block if isinstance(block, str) else str(block.get("text", ""))
+                for block in content
+                if isinstance(block, (str, dict))
+            )
+        return self._sanitize_ai_text(content) if isinstance(content, str) else ""
+
+    def _render_structured(self, parsed: BaseModel) -> str:
+        """Plain-text summary of a structured answer that came without analysis"""
+        lines: List[str] = []
+
+        def label(name: str) -> str:
+            return name.replace("_", " ").capitalize()
+
+        def add(name: str, value: Any, indent: str):
+            if isinstance(value, dict):
+                lines.append(f"{indent}{label(name)}:")
+                for key, item in value.items():
+                    add(key, item, indent + "  ")
+            elif isinstance(value, list):
+                if value:
+                    lines.append(f"{indent}{label(name)}:")
+                for n, item in enumerate(value, 1):
+                    if isinstance(item, dict):
+                        item = ", ".join(
+                            f"{label(k)}: {v}"
+                            for k, v in item.items()
+                            if v not in (None, "")
+                        )
+                    lines.append(f"{indent}  {n}. {item}")
+            elif value not in (None, ""):
+                lines.append(f"{indent}{label(name)}: {value}")
+
+        for name, value in parsed.model_dump(exclude={"analysis"}).items():
+            add(name, value, "")
+        return "\n".join(lines)
+
+    async def _call_llm(
+        self, prompt: str, model_id: str, priority: int = PRIORITY_ROUTE
+    ) -> str:
         """
         Generic async LLM call via LangChain with multi-provider support
-        (OpenAI, Anthropic, or Google Gemini)
+        (OpenAI, Anthropic, or Google Gemini). Fails over / hedges along the
+        configured fallback chain through llm_executor; `priority` orders the
+        call in the provider's admission queue.
         """
-        try:
-            chat = get_chat_model(model_id, temperature=0.2)
+
+        async def attempt(model: str, mark_first_token) -> str:
+            chat = get_chat_model(model, temperature=0.2)
 
             prompt_template = ChatPromptTemplate.from_template("{input}")
             chain = prompt_template | chat | StrOutputParser()
 
-            result = await chain.ainvoke({"input": prompt})
+            # Stream so the executor can see time-to-first-token for hedging
+            chunks = []
+            async for chunk in chain.astream({"input": prompt}):
+                mark_first_token()
+                chunks.append(chunk)
+            return "".join(chunks)
 
-            # Sanitize basic HTML/Markdown
-            import re
-            result = re.sub(r"(?i)<script.*?>.*?</script>", "", result, flags=re.DOTALL)
-            result = result.replace("<", "&lt;").replace(">", "&gt;")
+        try:
+            result = await llm_executor.run(
+                model_id,
+                attempt,
+                streaming=True,
+                priority=priority,
+                tokens=estimate_tokens(prompt),
+            )
 
-            return result.strip()
+            # Sanitize basic HTML/Markdown
+            return self._sanitize_ai_text(result)
+        except LLMQueueFullError:
+            raise
+        except LLMUnavailableError:
+            self._logger.exception("LLM call failed on every model in the chain")
+            raise
         except Exception as e:
             self._logger.exception("LLM call failed: %s", e)
             raise Exception(f"LLM call failed: {e}")
 
+    async def _call_llm_structured(
+        self,
+        prompt: str,
+        model_id: str,
+        schema: Type[BaseModel],
+        priority: int = PRIORITY_ROUTE,
+    ) -> Tuple[BaseModel, str]:
+        """
+        Ask the provider for output matching `schema` (JSON schema / tool calling).
+
+        Returns (parsed, analysis text). Raises StructuredOutputUnsupported when
+        no model in the chain supports structured output and
+        StructuredOutputInvalid when the answer does not validate.
+        """
+        structured_prompt = self.prompt_service.with_structured_output_instructions(
+            prompt
+        )
+
+        async def attempt(model: str, mark_first_token) -> Dict[str, Any]:
+            chat = get_chat_model(model, temperature=0.2)
+            try:
+                structured_chat = chat.with_structured_output(schema, include_raw=True)
+            except NotImplementedError as e:
+                raise StructuredOutputUnsupported(f"{model}: {e}") from e
+
+            prompt_template = ChatPromptTemplate.from_template("{input}")
+            chain = prompt_template | structured_chat
+            return await chain.ainvoke({"input": structured_prompt})
+
+        try:
+            result = await llm_executor.run(
+                model_id,
+                attempt,
+                streaming=False,
+                priority=priority,
+                tokens=estimate_tokens(structured_prompt),
+            )
+        except LLMUnavailableError as e:
+            if e.causes and all(
+                isinstance(cause, StructuredOutputUnsupported) for cause in e.causes
+            ):
+                raise StructuredOutputUnsupported(str(e)) from e
+            raise
+
+        raw_text = self._message_text(result.get("raw"))
+        parsed = result.get("parsed")
+        if parsed is None:
+            raise StructuredOutputInvalid(
+                str(result.get("parsing_error") or "no structured answer"), raw_text
+            )
+        try:
+            parsed = schema.model_validate(
+                self._sanitize_structured(parsed.model_dump())
+            )
+        except ValidationError as e:
+            raise StructuredOutputInvalid(str(e), raw_text) from e
+        analysis = parsed.analysis.strip() or raw_text or self._render_structured(parsed)
+        return parsed, analysis
+
+    async def _call_llm_with_schema(
+        self,
+        prompt: str,
+        model_id: str,
+        schema: Type[BaseModel],
+        priority: int = PRIORITY_ROUTE,
+    ) -> Tuple[Optional[BaseModel], str]:
+        """
+        Prefer structured output; fall back to the markdown prompt + parsers.
+
+        Returns (structured, ai_text). When `structured` is None the caller is
+        expected to run the markdown parsers over `ai_text`. An answer that
+        does not validate is parsed from its raw text; the markdown prompt is
+        sent only when structured output is unsupported or the reply had no
+        text. Outages, timeouts and full queues propagate rather than
+        re-running the chain.
+        """
+        if config.LLM_STRUCTURED_OUTPUT:
+            try:
+                return await self._call_llm_structured(
+                    prompt, model_id, schema, priority
+                )
+            except StructuredOutputInvalid as e:
+                if e.raw_text:
+                    self._logger.warning(
+                        "Structured output from %s invalid (%s); parsing its raw reply",
+                        model_id,
+                        e,
+                    )
+                    return None, e.raw_text
+                self._logger.warning(
+                    "Structured output from %s invalid with no raw reply (%s); "
+                    "using the markdown prompt",
+                    model_id,
+                    e,
+                )
+            except StructuredOutputUnsupported as e:
+                self._logger.warning(
+                    "Structured output unsupported by %s (%s); using the markdown prompt",
+                    model_id,
+                    e,
+                )
+        return None, await self._call_llm(prompt, model_id, priority)
+
     def _parse_comprehensive_response(
         self,
         ai_response: str,
@@ -828,13 +1209,14 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Parse AI response using standardized data models"""
 
-        # Extract parsed data
+        # Extract parsed data (tokenize the response once for all extractors)
         try:
-            parsed_directions = self._extract_directions_from_ai(ai_response)
+            parsed = ParsedResponse(ai_response)
+            parsed_directions = self._extract_directions_from_ai(parsed)
             route_summary = self._extract_route_summary_from_ai(
-                ai_response, weather_data.from_location, weather_data.to_location
+                parsed, weather_data.from_location, weather_data.to_location
             )
-            traffic_info = self._extract_traffic_info_from_ai(ai_response)
+            traffic_info = self._extract_traffic_info_from_ai(parsed)
         except Exception as e:
             print(f"Failed to parse AI response: {e}")
             parsed_directions = [{"step": 1, "instruction": "See AI analysis below"}]
@@ -845,6 +1227,94 @@ class LLMService:
             }
             traffic_info = {"note": "Traffic analysis in AI response"}
 
+        return self._build_comprehensive_response(
+            route_summary,
+            parsed_directions,
+            traffic_info,
+            db_data,
+            weather_data,
+            ai_response,
+            departure_time,
+            arrival_time,
+            time_mode,
+        )
+
+    def _build_comprehensive_from_structured(
+        self,
+        structured: RouteOptimizationOutput,
+        ai_response: str,
+        db_data: DatabaseResult,
+        weather_data: WeatherResult,
+        departure_time: Optional[str] = None,
+        arrival_time: Optional[str] = None,
+        time_mode: str = "departure",
+    ) -> Dict[str, Any]:
+        """Build the route response from a schema-validated LLM answer"""
+        route_summary = {
+            "from": weather_data.from_location.city,
+            "to": weather_data.to_location.city,
+            "ai_generated": True,
+            **self._non_empty_fields(structured.route_summary),
+        }
+
+        parsed_directions = [
+            {
+                "step": idx,
+                "instruction": self._clean_markdown(step.instruction),
+                "distance": step.distance or "N/A",
+                "duration": step.duration or "N/A",
+                "maneuver": self._detect_maneuver(step.instruction),
+            }
+            for idx, step in enumerate(structured.directions, start=1)
+        ] or [
+            {
+                "step": 1,
+                "instruction": "Follow AI-generated route (see full analysis below)",
+                "distance": "See AI analysis",
+                "duration": "See AI analysis",
+                "maneuver": "straight",
+            }
+        ]
+
+        traffic_info = {
+            "ai_analysis": True,
+            **self._non_empty_fields(structured.traffic_conditions),
+        }
+
+        return self._build_comprehensive_response(
+            route_summary,
+            parsed_directions,
+            traffic_info,
+            db_data,
+            weather_data,
+            ai_response,
+            departure_time,
+            arrival_time,
+            time_mode,
+        )
+
+    def _non_empty_fields(self, model: BaseModel) -> Dict[str, Any]:
+        """Dump a structured output model, dropping empty values and markdown"""
+        return {
+            key: self._clean_markdown(value) if isinstance(value, str) else value
+            for key, value in model.model_dump().items()
+            if value not in (None, "")
+        }
+
+    def _build_comprehensive_response(
+        self,
+        route_summary: Dict[str, Any],
+        parsed_directions: List[Dict[str, Any]],
+        traffic_info: Dict[str, Any],
+        db_data: DatabaseResult,
+        weather_data: WeatherResult,
+        ai_response: str,
+        departure_time: Optional[str] = None,
+        arrival_time: Optional[str] = None,
+        time_mode: str = "departure",
+    ) -> Dict[str, Any]:
+        """Fill defaults and assemble the route optimization API response"""
+
         # Add time-based information to traffic_info
         if time_mode == "departure" and departure_time:
             traffic_info["requested_departure"] = departure_time
@@ -902,7 +1372,7 @@ class LLMService:
 
         return response.to_api_dict()
 
-    def _extract_directions_from_ai(self, ai_response: str) -> list:
+    def _extract_directions_from_ai(self, parsed: ParsedResponse) -> list:
         """
         Robust parser for turn-by-turn directions from AI response.
         - Flexible heading detection (case-insensitive, with or without ###)
@@ -910,47 +1380,35 @@ class LLMService:
         - Parses inline and next-line distance/duration info
         """
 
-        import re
         directions = []
 
         try:
-            # 1️⃣ Try to isolate a "TURN-BY-TURN DIRECTIONS" section (case-insensitive)
-            section_match = re.search(
-                r"(?:^|\n)#+\s*TURN[- ]?BY[- ]?TURN DIRECTIONS\s*(.*?)(?:\n#+|\Z)",
-                ai_response,
-                flags=re.I | re.S,
-            )
-            text_to_parse = section_match.group(1) if section_match else ai_response
+            # 1️⃣ Try to isolate a "TURN-BY-TURN DIRECTIONS" section
+            has_section = parsed.has_section("TURN BY TURN DIRECTIONS")
 
             # 2️⃣ Find numbered steps: 1. / 1) / 1 -
-            step_pattern = re.compile(r"^\s*(\d+)[\.\)\-]\s+(.*)$", re.M)
-            steps = list(step_pattern.finditer(text_to_parse))
-
-            for idx, match in enumerate(steps, start=1):
-                step_no = int(match.group(1))
-                instruction = match.group(2).strip()
-
-                # Normalize step number (sometimes LLM restarts numbering)
-                if step_no != idx:
-                    step_no = idx
+            steps = parsed.numbered_steps(
+                "TURN BY TURN DIRECTIONS" if has_section else None
+            )
 
+            # Step numbers are normalized to enumerate order (sometimes the LLM
+            # restarts numbering)
+            for step_no, (instruction, following_lines) in enumerate(steps, start=1):
                 # Defaults
                 distance = "N/A"
                 duration = "N/A"
 
                 # 3️⃣ Try inline "(12.3 km, 15 min)" format
-                paren_match = re.search(r"\(([^)]+)\)", instruction)
+                paren_match = PARENTHESIZED_RE.search(instruction)
                 if paren_match and "km" in paren_match.group(1) and "min" in paren_match.group(1):
                     parts = [p.strip() for p in paren_match.group(1).split(",")]
                     if len(parts) >= 2:
                         distance, duration = parts[0], parts[1]
                     # Remove the parentheses text from the instruction
-                    instruction = re.sub(r"\([^)]+\)", "", instruction).strip()
+                    instruction = PARENTHESIZED_RE.sub("", instruction).strip()
 
                 # 4️⃣ Try next-line "Distance: ... | Duration: ..." format
-                step_end = match.end()
-                next_chunk = text_to_parse[step_end:].split("\n", 3)[:3]  # next few lines
-                for line in next_chunk:
+                for line in following_lines[:2]:
                     line = line.strip()
                     if "Distance:" in line and "Duration:" in line and "|" in line:
                         parts = [p.strip() for p in line.split("|")]
@@ -960,18 +1418,7 @@ class LLMService:
                         break
 
                 # 5️⃣ Detect maneuver type
-                maneuver = "straight"
-                low_instr = instruction.lower()
-                if "left" in low_instr:
-                    maneuver = "turn-left"
-                elif "right" in low_instr:
-                    maneuver = "turn-right"
-                elif "merge" in low_instr:
-                    maneuver = "merge"
-                elif "exit" in low_instr:
-                    maneuver = "exit-right"
-                elif "arriv" in low_instr:
-                    maneuver = "arrive"
+                maneuver = self._detect_maneuver(instruction)
 
                 directions.append(
                     {
@@ -984,13 +1431,13 @@ class LLMService:
                 )
 
             # 6️⃣ Fallback: Look for numbered lines in the entire AI response if section is empty
-            if not directions:
-                fallback_steps = re.findall(r"^\s*(\d+)[\.\)\-]\s+(.*)$", ai_response, flags=re.M)
-                for idx, (_, instr) in enumerate(fallback_steps, start=1):
+            if not directions and has_section:
+                fallback_steps = parsed.numbered_steps()
+                for idx, (instr, _) in enumerate(fallback_steps, start=1):
                     directions.append(
                         {
                             "step": idx,
-                            "instruction": instr.strip(),
+                            "instruction": instr,
                             "distance": "Generated by AI",
                             "duration": "See AI analysis",
                             "maneuver": "straight",
@@ -1025,9 +1472,24 @@ class LLMService:
 
         return directions
 
+    def _detect_maneuver(self, instruction: str) -> str:
+        """Infer a maneuver icon type from a direction instruction"""
+        low_instr = instruction.lower()
+        if "left" in low_instr:
+            return "turn-left"
+        elif "right" in low_instr:
+            return "turn-right"
+        elif "merge" in low_instr:
+            return "merge"
+        elif "exit" in low_instr:
+            return "exit-right"
+        elif "arriv" in low_instr:
+            return "arrive"
+        return "straight"
+
     def _extract_route_summary_from_ai(
         self,
-        ai_response: str,
+        parsed: ParsedResponse,
         from_weather: WeatherData,
         to_weather: WeatherData,
     ) -> dict:
@@ -1040,7 +1502,7 @@ class LLMService:
 
         try:
             # Look for ROUTE SUMMARY section
-            summary_section = self._extract_section(ai_response, "ROUTE SUMMARY")
+            summary_section = parsed.section_lines("ROUTE SUMMARY")
 
             if summary_section:
                 # Define mappings for key-value extraction
@@ -1057,21 +1519,20 @@ class LLMService:
                     "Recommended Arrival Time:": "recommended_arrival_time",
                 }
 
-                parsed = self._parse_key_value_lines(summary_section, mappings)
-                summary.update(parsed)
+                summary.update(parse_key_value_lines(summary_section, mappings))
 
         except Exception as e:
             print(f"Error parsing route summary: {e}")
 
         return summary
 
-    def _extract_traffic_info_from_ai(self, ai_response: str) -> dict:
+    def _extract_traffic_info_from_ai(self, parsed: ParsedResponse) -> dict:
         """Extract traffic conditions from AI response"""
         traffic_info = {"ai_analysis": True}
 
         try:
             # Look for TRAFFIC CONDITIONS section
-            traffic_section = self._extract_section(ai_response, "TRAFFIC CONDITIONS")
+            traffic_section = parsed.section_lines("TRAFFIC CONDITIONS")
 
             if traffic_section:
                 mappings = {
@@ -1081,8 +1542,7 @@ class LLMService:
                     "Expected Delays:": "delays",
                 }
 
-                parsed = self._parse_key_value_lines(traffic_section, mappings)
-                traffic_info.update(parsed)
+                traffic_info.update(parse_key_value_lines(traffic_section, mappings))
 
         except Exception as e:
             print(f"Error parsing traffic info: {e}")
@@ -1095,6 +1555,7 @@ class LLMService:
         stations: List[StationData],
         depot_location: str,
         depot_weather: WeatherData,
+        stations_prompt: Optional[str] = None,
     ) -> str:
         """Create a prompt for dispatch optimization using prompt service"""
         return self.prompt_service.format_dispatch_prompt(
@@ -1102,6 +1563,7 @@ class LLMService:
             stations=stations,
             depot_location=depot_location,
             depot_weather=depot_weather,
+            stations_text=stations_prompt,
         )
 
     def _parse_dispatch_response(
@@ -1113,10 +1575,12 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Parse the AI response for dispatch optimization"""
 
+        parsed = ParsedResponse(ai_response)
+
         # Extract dispatch summary using helper
         dispatch_summary = {}
         try:
-            summary_section = self._extract_section(ai_response, "DISPATCH SUMMARY")
+            summary_section = parsed.section_lines("DISPATCH SUMMARY")
 
             if summary_section:
                 mappings = {
@@ -1128,20 +1592,17 @@ class LLMService:
                     "Return to Depot:": "return_time",
                 }
 
-                dispatch_summary = self._parse_key_value_lines(
-                    summary_section, mappings
-                )
+                dispatch_summary = parse_key_value_lines(summary_section, mappings)
         except Exception as e:
             print(f"Error parsing dispatch summary: {e}")
 
         # Extract route stops
         route_stops = []
         try:
-            route_section = self._extract_section(ai_response, "OPTIMIZED ROUTE")
+            lines = parsed.section_lines("OPTIMIZED ROUTE")
 
-            if route_section:
+            if lines:
                 # Parse numbered route items
-                lines = route_section.split("\n")
                 current_stop = {}
 
                 for line in lines:
@@ -1195,6 +1656,44 @@ class LLMService:
         except Exception:
             self._logger.exception("Error parsing route stops")
 
+        return self._build_dispatch_response(
+            dispatch_summary, route_stops, truck, stations, depot_location, ai_response
+        )
+
+    def _build_dispatch_from_structured(
+        self,
+        structured: DispatchOptimizationOutput,
+        ai_response: str,
+        truck: TruckData,
+        stations: List[StationData],
+        depot_location: str,
+    ) -> Dict[str, Any]:
+        """Build the dispatch response from a schema-validated LLM answer"""
+        route_stops = []
+        for stop in sorted(structured.route_stops, key=lambda s: s.step_number):
+            fields = self._non_empty_fields(stop)
+            fields.pop("step_number", None)
+            route_stops.append(fields)
+
+        return self._build_dispatch_response(
+            self._non_empty_fields(structured.dispatch_summary),
+            route_stops,
+            truck,
+            stations,
+            depot_location,
+            ai_response,
+        )
+
+    def _build_dispatch_response(
+        self,
+        dispatch_summary: Dict[str, Any],
+        route_stops: List[Dict[str, Any]],
+        truck: TruckData,
+        stations: List[StationData],
+        depot_location: str,
+        ai_response: str,
+    ) -> Dict[str, Any]:
+        """Assemble the dispatch optimization API response"""
         return {
             "dispatch_summary": dispatch_summary,
             "truck": truck_simple_dict(truck),
@@ -1219,6 +1718,7 @@ class LLMService:
             depot_location=depot_location,
             depot_weather=depot_weather,
             max_recommendations=max_recommendations,
+            station_weather=weather_service.for_stations(stations),
         )
 
     def _parse_batch_dispatch_response(
@@ -1230,54 +1730,68 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Parse AI response for batch dispatch recommendations"""
         recommendations = []
-        
+        parsed = ParsedResponse(ai_response)
+
         try:
-            # Extract recommendations section
-            recs_section = self._extract_section(ai_response, "DISPATCH RECOMMENDATIONS")
-            
-            if recs_section:
-                # Parse each recommendation
-                rec_blocks = recs_section.split("\n\n")
-                for block in rec_blocks:
-                    if not block.strip():
-                        continue
-                    
-                    rec = {}
-                    lines = block.strip().split("\n")
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith("Truck:"):
-                            rec["truck_code"] = line.replace("Truck:", "").strip()
-                        elif line.startswith("Priority:"):
-                            rec["priority"] = line.replace("Priority:", "").strip()
-                        elif line.startswith("Stations:"):
-                            rec["station_count"] = line.replace("Stations:", "").strip()
-                        elif line.startswith("Route:"):
-                            rec["route_summary"] = line.replace("Route:", "").strip()
-                        elif line.startswith("Total Distance:"):
-                            rec["total_distance"] = line.replace("Total Distance:", "").strip()
-                        elif line.startswith("Estimated Duration:"):
-                            rec["estimated_duration"] = line.replace("Estimated Duration:", "").strip()
-                        elif line.startswith("Total Fuel Delivery:"):
-                            rec["total_fuel_delivery"] = line.replace("Total Fuel Delivery:", "").strip()
-                        elif line.startswith("Rationale:"):
-                            rec["rationale"] = line.replace("Rationale:", "").strip()
-                    
-                    if rec.get("truck_code"):
-                        recommendations.append(rec)
+            # Parse each blank-line separated recommendation block
+            mappings = {
+                "Truck:": "truck_code",
+                "Priority:": "priority",
+                "Stations:": "station_count",
+                "Route:": "route_summary",
+                "Total Distance:": "total_distance",
+                "Estimated Duration:": "estimated_duration",
+                "Total Fuel Delivery:": "total_fuel_delivery",
+                "Rationale:": "rationale",
+            }
+            for block in parsed.section_blocks("DISPATCH RECOMMENDATIONS"):
+                rec = parse_key_value_lines(block, mappings, prefix_only=True)
+                if rec.get("truck_code"):
+                    recommendations.append(rec)
         except Exception:
             self._logger.exception("Error parsing batch dispatch recommendations")
-        
+
         # Extract summary
         summary = ""
         try:
-            summary_section = self._extract_section(ai_response, "EXECUTIVE SUMMARY")
-            if summary_section:
-                summary = summary_section.strip()
+            summary = parsed.section_text("EXECUTIVE SUMMARY")
         except Exception:
             pass
-        
+
+        return self._build_batch_dispatch_response(
+            recommendations, summary, trucks, stations, ai_response
+        )
+
+    def _build_batch_dispatch_from_structured(
+        self,
+        structured: BatchDispatchOutput,
+        ai_response: str,
+        trucks: List[TruckData],
+        stations: List[StationData],
+    ) -> Dict[str, Any]:
+        """Build batch recommendations from a schema-validated LLM answer"""
+        recommendations = [
+            self._non_empty_fields(rec)
+            for rec in structured.recommendations
+            if rec.truck_code
+        ]
+        return self._build_batch_dispatch_response(
+            recommendations,
+            structured.executive_summary.strip(),
+            trucks,
+            stations,
+            ai_response,
+        )
+
+    def _build_batch_dispatch_response(
+        self,
+        recommendations: List[Dict[str, Any]],
+        summary: str,
+        trucks: List[TruckData],
+        stations: List[StationData],
+        ai_response: str,
+    ) -> Dict[str, Any]:
+        """Assemble the batch dispatch recommendations API response"""
         return {
             "recommendations": recommendations,
             "summary": summary or ai_response[:500],  # Fallback to first 500 chars
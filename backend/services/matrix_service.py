@@ -0,0 +1,184 @@
+"""
+Travel-cost matrices (road distance and drive time) between sets of points.
+
+Costs come from TomTom's Matrix Routing API in as few calls as possible: each
+cell is cached on its own (keyed by the ~10 m quantized endpoints and travel
+mode), so when only a few points change, just the rows and columns that
+touch them are requested again. Requests larger than MATRIX_MAX_CELLS are
+split into chunks, of which at most MATRIX_CONCURRENCY are in flight at a
+time (across all callers) so a cold cache does not burst the rate limit or
+trip the upstream circuit breaker. Cells TomTom cannot route, failed calls and
+MATRIX_PROVIDER=haversine (useful locally, without API quota) fall back to
+a straight-line estimate scaled by MATRIX_ROAD_FACTOR.
+"""
+
+import asyncio
+import logging
+from math import atan2, cos, radians, sin, sqrt
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import config
+from models.data_models import StationData, TravelCost
+from utils.ttl_cache import TTLCache
+from .api_utils import calculate_matrix_async
+from .route_cache import quantize_point
+
+_logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+
+def haversine_km(a: Point, b: Point) -> float:
+    """Great-circle distance between two (lat, lon) points in km"""
+    lat1, lon1, lat2, lon2 = map(radians, (a[0], a[1], b[0], b[1]))
+    h = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * atan2(sqrt(h), sqrt(1 - h))
+
+
+def estimate_cost(origin: Point, destination: Point) -> TravelCost:
+    """Straight-line fallback scaled to approximate road distance"""
+    distance_km = haversine_km(origin, destination) * config.MATRIX_ROAD_FACTOR
+    duration_min = distance_km / max(1.0, config.MATRIX_FALLBACK_SPEED_KMH) * 60
+    return TravelCost(round(distance_km, 1), round(duration_min, 1), source="estimate")
+
+
+def _chunks(rows: List[int], cols: List[int], max_cells: int):
+    """Split a rows x cols request into blocks of at most max_cells cells"""
+    col_step = max(1, min(len(cols), max_cells))
+    row_step = max(1, max_cells // col_step)
+    for c in range(0, len(cols), col_step):
+        for r in range(0, len(rows), row_step):
+            yield rows[r : r + row_step], cols[c : c + col_step]
+
+
+class MatrixService:
+    """Batched, cell-cached travel-cost lookups"""
+
+    def __init__(self):
+        # Cells are all the same size, so the entry count is the only bound
+        self._cells = TTLCache(
+            max_entries=config.MATRIX_CACHE_MAX_CELLS,
+            max_bytes=config.MATRIX_CACHE_MAX_CELLS,
+        )
+        self._requests = asyncio.Semaphore(max(1, config.MATRIX_CONCURRENCY))
+        self._counts = {"api_calls": 0, "api_cells": 0, "estimated_cells": 0, "failed_calls": 0}
+
+    def _cell_key(self, origin: Point, destination: Point, travel_mode: str) -> str:
+        return f"{quantize_point(origin)}>{quantize_point(destination)}|{travel_mode}"
+
+    async def get_matrix(
+        self,
+        origins: Sequence[Point],
+        destinations: Sequence[Point],
+        travel_mode: str = "truck",
+    ) -> List[List[TravelCost]]:
+        """Travel cost from every origin to every destination, as rows of origins"""
+        matrix: List[List[Optional[TravelCost]]] = [
+            [None] * len(destinations) for _ in origins
+        ]
+        missing = set()
+        for i, origin in enumerate(origins):
+            for j, destination in enumerate(destinations):
+                if quantize_point(origin) == quantize_point(destination):
+                    matrix[i][j] = TravelCost(0.0, 0.0, source="estimate")
+                    continue
+                cached = self._cells.get(self._cell_key(origin, destination, travel_mode))
+                if cached is not None:
+                    matrix[i][j] = cached
+                else:
+                    missing.add((i, j))
+
+        if missing and config.MATRIX_PROVIDER == "tomtom":
+            rows = sorted({i for i, _ in missing})
+            cols = sorted({j for _, j in missing})
+            gaps: Dict[Tuple[int, ...], List[int]] = {}
+            if len(missing) * 2 >= len(rows) * len(cols):
+                # Mostly empty: one (chunked) request for every gap
+                gaps[tuple(cols)] = rows
+            else:
+                # Rows missing the same columns share a request, so a point that
+                # moved costs one row plus one column rather than the whole matrix
+                for i in rows:
+                    row_gaps = tuple(sorted(j for r, j in missing if r == i))
+                    gaps.setdefault(row_gaps, []).append(i)
+            blocks = [
+                block
+                for cols, rows in gaps.items()
+                for block in _chunks(rows, list(cols), config.MATRIX_MAX_CELLS)
+            ]
+            await asyncio.gather(
+                *(
+                    self._fetch_block(origins, destinations, r, c, travel_mode, matrix)
+                    for r, c in blocks
+                )
+            )
+
+        for i, j in missing:
+            if matrix[i][j] is None:
+                matrix[i][j] = estimate_cost(origins[i], destinations[j])
+                self._counts["estimated_cells"] += 1
+        return matrix
+
+    async def _fetch_block(
+        self,
+        origins: Sequence[Point],
+        destinations: Sequence[Point],
+        rows: List[int],
+        cols: List[int],
+        travel_mode: str,
+        matrix: List[List[Optional[TravelCost]]],
+    ):
+        try:
+            async with self._requests:
+                response = await calculate_matrix_async(
+                    [origins[i] for i in rows],
+                    [destinations[j] for j in cols],
+                    travelMode=travel_mode,
+                )
+        except Exception as e:
+            self._counts["failed_calls"] += 1
+            _logger.warning(
+                "Matrix request (%dx%d) failed, using estimates: %s", len(rows), len(cols), e
+            )
+            return
+        self._counts["api_calls"] += 1
+
+        for cell in response.get("data", []):
+            summary = cell.get("routeSummary")
+            if not summary:
+                continue  # detailedError: leave for the estimate fallback
+            i = rows[cell["originIndex"]]
+            j = cols[cell["destinationIndex"]]
+            if matrix[i][j] is not None:
+                continue
+            cost = TravelCost(
+                round(summary["lengthInMeters"] / 1000, 1),
+                round(summary["travelTimeInSeconds"] / 60, 1),
+            )
+            matrix[i][j] = cost
+            self._cells.set(
+                self._cell_key(origins[i], destinations[j], travel_mode),
+                cost,
+                config.MATRIX_CACHE_TTL_S,
+            )
+            self._counts["api_cells"] += 1
+
+    async def station_costs(
+        self, stations: List[StationData], travel_mode: str = "truck"
+    ) -> Dict[Tuple[int, int], TravelCost]:
+        """Pairwise travel costs between stations keyed by (from id, to id)"""
+        points = [(s.lat, s.lon) for s in stations]
+        matrix = await self.get_matrix(points, points, travel_mode)
+        return {
+            (a.id, b.id): matrix[i][j]
+            for i, a in enumerate(stations)
+            for j, b in enumerate(stations)
+            if a.id != b.id
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": config.MATRIX_PROVIDER, **self._counts, "cache": self._cells.stats()}
+
+
+# Global matrix service shared by dispatch prompts and solvers
+matrix_service = MatrixService()
@@ -1,12 +1,13 @@
 from pathlib import Path
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from models.data_models import (
     StationData,
     DeliveryData,
     WeatherResult,
     TruckData,
     WeatherData,
+    TravelCost,
 )
 
 
@@ -24,6 +25,10 @@ class PromptService:
         with open(template_path, "r", encoding="utf-8") as f:
             return f.read()
 
+    def with_structured_output_instructions(self, prompt: str) -> str:
+        """Append the schema-based response instructions to a formatted prompt"""
+        return f"{prompt}\n\n{self.load_template('structured_output_instructions')}"
+
     def format_comprehensive_prompt(
         self,
         from_location: str,
@@ -31,13 +36,14 @@ class PromptService:
         stations_data: List[StationData],
         historical_routes: List[DeliveryData],
         weather_data: WeatherResult,
+        station_weather: Optional[Dict[int, WeatherData]] = None,
         **kwargs,
     ) -> str:
         """Create comprehensive prompt using standardized data models"""
         template = self.load_template("comprehensive_route_optimization")
 
         # Format data using standardized models
-        stations_text = self._format_stations_data(stations_data)
+        stations_text = self._format_stations_data(stations_data, station_weather)
         historical_text = self._format_historical_data(historical_routes)
         weather_text = self._format_weather_data(weather_data)
 
@@ -77,7 +83,11 @@ class PromptService:
 
         return formatted_prompt
 
-    def _format_stations_data(self, stations: List[StationData]) -> str:
+    def _format_stations_data(
+        self,
+        stations: List[StationData],
+        station_weather: Optional[Dict[int, WeatherData]] = None,
+    ) -> str:
         """Format station data using standardized models"""
         if not stations:
             return "No fuel stations data available."
@@ -92,6 +102,9 @@ class PromptService:
             formatted += f"  Priority: {station.priority_level}, "
             formatted += f"Needs Refuel: {'Yes' if station.needs_refuel else 'No'}\n"
             formatted += f"  Coordinates: {station.lat:.4f}, {station.lon:.4f}\n"
+            weather = (station_weather or {}).get(station.id)
+            if weather is not None:
+                formatted += f"  Weather: {self._format_station_weather(weather)}\n"
 
         return formatted
 
@@ -115,30 +128,50 @@ class PromptService:
 
     def _format_weather_data(self, weather: WeatherResult) -> str:
         """Format weather data using standardized models"""
-        formatted = "Current Weather Conditions:\n"
-        formatted += (
-            f"From {weather.from_location.city}: {weather.from_location.temp_c}°C, "
-        )
-        formatted += f"{weather.from_location.condition}, Wind: {weather.from_location.wind_kph} km/h\n"
-        formatted += f"To {weather.to_location.city}: {weather.to_location.temp_c}°C, "
-        formatted += f"{weather.to_location.condition}, Wind: {weather.to_location.wind_kph} km/h\n"
+        from_w, to_w = weather.from_location, weather.to_location
+        if from_w.valid_at is None and to_w.valid_at is None:
+            formatted = "Current Weather Conditions:\n"
+            from_when = to_when = ""
+        else:
+            # Forecasts for the planned times; either side may still be current
+            formatted = "Weather Conditions at the Planned Times:\n"
+            from_when, to_when = self._weather_time(from_w), self._weather_time(to_w)
+        formatted += f"From {from_w.city}{from_when}: {from_w.temp_c}°C, "
+        formatted += f"{from_w.condition}, Wind: {from_w.wind_kph} km/h\n"
+        formatted += f"To {to_w.city}{to_when}: {to_w.temp_c}°C, "
+        formatted += f"{to_w.condition}, Wind: {to_w.wind_kph} km/h\n"
         return formatted
 
+    def _weather_time(self, weather: WeatherData) -> str:
+        if weather.valid_at is None:
+            return " (current)"
+        return f" (forecast for {weather.valid_at:%Y-%m-%d %H:%M})"
+
+    def _format_station_weather(self, weather: WeatherData) -> str:
+        """One-line conditions for a station (locally collected reading)"""
+        return f"{weather.condition}, {weather.temp_c:.0f}°C, Wind: {weather.wind_kph:.0f} km/h"
+
     def format_dispatch_prompt(
         self,
         truck: TruckData,
         stations: List[StationData],
         depot_location: str,
         depot_weather: WeatherData,
+        stations_text: Optional[str] = None,
     ) -> str:
-        """Create dispatch optimization prompt using standardized data models"""
+        """
+        Create dispatch optimization prompt using standardized data models.
+        Pass `stations_text` (from format_dispatch_stations) to reuse one
+        formatted station block across many trucks.
+        """
         template = self.load_template("dispatch_optimization")
 
         # Format compartments info
         compartments_text = self._format_compartments_data(truck)
         
         # Format stations info
-        stations_text = self._format_dispatch_stations_data(stations)
+        if stations_text is None:
+            stations_text = self._format_dispatch_stations_data(stations)
         
         # Format depot weather
         weather_text = f"{depot_weather.condition}, {depot_weather.temp_c}°C, Wind: {depot_weather.wind_kph} km/h"
@@ -176,8 +209,22 @@ class PromptService:
         else:
             return f"  - Single compartment: {truck.fuel_type} - {truck.capacity_liters} L"
 
-    def _format_dispatch_stations_data(self, stations: List[StationData]) -> str:
-        """Format stations needing fuel for dispatch"""
+    def format_dispatch_stations(
+        self,
+        stations: List[StationData],
+        travel_costs: Optional[Dict[Tuple[int, int], TravelCost]] = None,
+        station_weather: Optional[Dict[int, WeatherData]] = None,
+    ) -> str:
+        """Station block of the dispatch prompt, shared by every truck"""
+        return self._format_dispatch_stations_data(stations, travel_costs, station_weather)
+
+    def _format_dispatch_stations_data(
+        self,
+        stations: List[StationData],
+        travel_costs: Optional[Dict[Tuple[int, int], TravelCost]] = None,
+        station_weather: Optional[Dict[int, WeatherData]] = None,
+    ) -> str:
+        """Format stations needing fuel for dispatch, using road costs when given"""
         if not stations:
             return "No stations requiring fuel delivery."
 
@@ -190,6 +237,11 @@ class PromptService:
             nearby = []
             for other in stations:
                 if other.id != station.id:
+                    cost = (travel_costs or {}).get((station.id, other.id))
+                    if cost is not None:
+                        if cost.distance_km <= 50:
+                            nearby.append(f"{other.name} ({other.code}) - {cost.distance_km:.1f} km by road (~{cost.duration_min:.0f} min), {other.priority_level} priority")
+                        continue
                     distance = station.distance_to(other)
                     if distance <= 50:
                         nearby.append(f"{other.name} ({other.code}) - {distance:.1f} km, {other.priority_level} priority")
@@ -204,6 +256,10 @@ class PromptService:
    - Needed: {needed} L
    - Priority: {station.priority_level}
    - Request Method: {station.request_method}"""
+
+            weather = (station_weather or {}).get(station.id)
+            if weather is not None:
+                formatted += f"\n   - Weather: {self._format_station_weather(weather)}"
             
             if nearby:
                 formatted += f"\n   - Nearby Stations (within 50 km): {'; '.join(nearby[:3])}"  # Show up to 3 nearby
@@ -219,6 +275,7 @@ class PromptService:
         depot_location: str,
         depot_weather: WeatherData,
         max_recommendations: int,
+        station_weather: Optional[Dict[int, WeatherData]] = None,
     ) -> str:
         """Create batch dispatch recommendations prompt"""
         template = self.load_template("batch_dispatch_recommendations")
@@ -227,7 +284,9 @@ class PromptService:
         trucks_text = self._format_trucks_summary(trucks)
         
         # Format stations info
-        stations_text = self._format_dispatch_stations_data(stations)
+        stations_text = self._format_dispatch_stations_data(
+            stations, station_weather=station_weather
+        )
         
         # Format depot weather
         weather_text = f"{depot_weather.condition}, {depot_weather.temp_c}°C, Wind: {depot_weather.wind_kph} km/h"
@@ -0,0 +1,194 @@
+"""
+Reachable-range polygons and vectorized station filtering.
+
+TomTom's calculateReachableRange returns the isochrone boundary a vehicle
+can reach on a given budget. Polygons are cached per (origin cell, budget
+type, budget bucket): origins are snapped to ~100 m and budgets rounded
+down to REACHABLE_BUDGET_STEPS, so trucks with similar range from the same
+depot share one upstream call and the answer is never more generous than
+the real budget. Cached polygons are prepared once and tested against all
+candidate stations with a single shapely.contains_xy call. If TomTom is
+unavailable or returns no usable polygon, the filter falls back to a
+straight-line radius.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from config import config
+from models.data_models import StationData
+from utils.ttl_cache import TTLCache
+from .api_utils import calculate_reachable_range_async
+
+_logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+# Budgets are rounded down to a multiple of these steps for the cache key
+REACHABLE_BUDGET_STEPS = {
+    "distance": 10_000.0,  # meters
+    "time": 600.0,  # seconds
+    "fuel": 10.0,  # liters
+    "energy": 5.0,  # kWh
+}
+
+# ~100 m; origins closer than this share cached polygons
+ORIGIN_DECIMALS = 3
+
+
+def bucket_budget(budget_type: str, budget_value: float) -> float:
+    """Round a budget down to its cache bucket (budgets below one step are kept)"""
+    step = REACHABLE_BUDGET_STEPS.get(budget_type)
+    if not step or budget_value < step:
+        return float(budget_value)
+    return float(budget_value // step * step)
+
+
+class ReachableRange:
+    """A cached reachable-range response and its prepared polygon"""
+
+    def __init__(self, response: Dict[str, Any]):
+        self.response = response
+        boundary = response.get("reachableRange", {}).get("boundary") or []
+        self.polygon: Optional[Polygon] = None
+        if len(boundary) >= 3:
+            polygon = Polygon([(p["longitude"], p["latitude"]) for p in boundary])
+            if not polygon.is_valid:
+                polygon = polygon.buffer(0)
+            # A degenerate boundary (collinear / repeated points) has no area
+            if not polygon.is_empty and polygon.area > 0:
+                shapely.prepare(polygon)
+                self.polygon = polygon
+
+    def contains(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Boolean mask of the points inside the polygon (which must exist)"""
+        return shapely.contains_xy(self.polygon, lons, lats)
+
+
+def within_radius(
+    origin: Point, lats: np.ndarray, lons: np.ndarray, radius_km: float
+) -> np.ndarray:
+    """Vectorized haversine check used when no polygon is available"""
+    lat1, lon1 = np.radians(origin[0]), np.radians(origin[1])
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    h = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 6371.0 * 2 * np.arcsin(np.sqrt(h)) <= radius_km
+
+
+class ReachabilityService:
+    """Cached reachable-range lookups and point-in-polygon filtering"""
+
+    def __init__(self):
+        self._ranges = TTLCache(
+            max_entries=config.REACHABLE_CACHE_MAX_ENTRIES,
+            max_bytes=config.REACHABLE_CACHE_MAX_ENTRIES,
+        )
+        self._pending: Dict[Tuple, asyncio.Task] = {}
+        self._counts = {"api_calls": 0, "failed_calls": 0, "filtered": 0, "fallback_filters": 0}
+
+    def _key(self, origin: Point, budget_type: str, budget_value: float, options: Dict[str, Any]):
+        return (
+            round(float(origin[0]), ORIGIN_DECIMALS),
+            round(float(origin[1]), ORIGIN_DECIMALS),
+            budget_type,
+            budget_value,
+            tuple(sorted((k, str(v)) for k, v in options.items())),
+        )
+
+    async def get_range(
+        self,
+        origin: Point,
+        budget_value: float,
+        budget_type: str = "distance",
+        bucket: bool = True,
+        **options,
+    ) -> ReachableRange:
+        """
+        Reachable range from origin, served from cache when possible.
+        With bucket=True the budget is rounded down to its cache bucket.
+        """
+        if bucket:
+            budget_value = bucket_budget(budget_type, budget_value)
+        key = self._key(origin, budget_type, budget_value, options)
+        cached = self._ranges.get(key)
+        if cached is not None:
+            return cached
+
+        # Concurrent misses for the same key share one upstream call
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch(key, origin, budget_value, budget_type, options)
+            )
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        key: Tuple,
+        origin: Point,
+        budget_value: float,
+        budget_type: str,
+        options: Dict[str, Any],
+    ) -> ReachableRange:
+        try:
+            response = await calculate_reachable_range_async(
+                origin=origin,
+                budget_value=budget_value,
+                budget_type=budget_type,
+                **options,
+            )
+        except Exception:
+            self._counts["failed_calls"] += 1
+            raise
+        self._counts["api_calls"] += 1
+        reachable = ReachableRange(response)
+        if reachable.polygon is not None:
+            # Unusable answers are not cached, so the next lookup retries
+            self._ranges.set(key, reachable, config.REACHABLE_CACHE_TTL_S)
+        return reachable
+
+    async def reachable_stations(
+        self,
+        origin: Point,
+        stations: List[StationData],
+        range_km: float,
+    ) -> List[StationData]:
+        """Stations that can be reached from origin within range_km of driving"""
+        if not stations:
+            return []
+        lats = np.fromiter((s.lat for s in stations), dtype=float, count=len(stations))
+        lons = np.fromiter((s.lon for s in stations), dtype=float, count=len(stations))
+        mask = None
+        try:
+            reachable = await self.get_range(origin, range_km * 1000, "distance")
+            if reachable.polygon is not None:
+                mask = reachable.contains(lats, lons)
+            else:
+                _logger.warning(
+                    "Reachable range from %s has no usable polygon, using straight-line radius",
+                    origin,
+                )
+        except Exception as e:
+            _logger.warning("Reachable range unavailable, using straight-line radius: %s", e)
+        if mask is None:
+            self._counts["fallback_filters"] += 1
+            mask = within_radius(origin, lats, lons, range_km)
+        self._counts["filtered"] += 1
+        return [station for station, inside in zip(stations, mask) if inside]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counts, "cache": self._ranges.stats()}
+
+
+# Global reachability service used by the dispatch flows
+reachability_service = ReachabilityService()
@@ -0,0 +1,203 @@
+"""
+Column-only read queries for the list endpoints and dispatch inputs.
+
+Each query is a Core `select()` of just the columns the response needs,
+executed on the session's connection, so no ORM entities, identity-map
+entries or lazy loads are created and rows go straight to the row
+serializers in utils/serializers.py (or into StationData/TruckData for
+dispatch). DECIMAL columns are typed as Float, so the result processor
+hands back floats and nothing converts Decimals per field afterwards.
+
+Statements are built once at import with bind parameters for their inputs,
+so every call hits the same entry in the engine's compiled-statement cache.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, Integer, bindparam, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.data_models import StationData, TruckData
+from models.database_models import Delivery, Station, Truck, TruckCompartment
+from utils.serializers import (
+    station_dict_from_row,
+    trip_detail_from_row,
+    trip_dict_from_row,
+    truck_dict_from_row,
+)
+
+_stations = Station.__table__
+_trucks = Truck.__table__
+_compartments = TruckCompartment.__table__
+_deliveries = Delivery.__table__
+
+
+def _num(column):
+    """
+    DECIMAL column read as a float by the result processor. Not a CAST:
+    SQLAlchemy drops CAST(... AS DOUBLE) on MySQL with a warning.
+    """
+    return type_coerce(column, Float).label(column.name)
+
+
+# Same order as StationData's fields, so rows unpack straight into it
+_STATION_COLUMNS = (
+    _stations.c.id,
+    _stations.c.code,
+    _stations.c.name,
+    _stations.c.city,
+    _stations.c.region,
+    _num(_stations.c.lat),
+    _num(_stations.c.lon),
+    _stations.c.fuel_type,
+    _num(_stations.c.capacity_liters),
+    _num(_stations.c.current_level_liters),
+    _stations.c.request_method,
+    _num(_stations.c.low_fuel_threshold),
+)
+_STATIONS = select(*_STATION_COLUMNS).order_by(_stations.c.name)
+_STATION_BY_ID = select(*_STATION_COLUMNS).where(_stations.c.id == bindparam("value"))
+_STATION_BY_CODE = select(*_STATION_COLUMNS).where(_stations.c.code == bindparam("value"))
+_STATIONS_NEEDING_REFUEL = (
+    select(*_STATION_COLUMNS)
+    .where(
+        _stations.c.current_level_liters.isnot(None),
+        _stations.c.capacity_liters.isnot(None),
+        _stations.c.capacity_liters > 0,
+        _stations.c.low_fuel_threshold.isnot(None),
+        _stations.c.current_level_liters < _stations.c.low_fuel_threshold,
+    )
+    # Most urgent (lowest fuel percentage) first
+    .order_by((_stations.c.current_level_liters / _stations.c.capacity_liters).asc())
+)
+
+# Same order as TruckData's leading fields
+_TRUCK_COLUMNS = (
+    _trucks.c.id,
+    _trucks.c.code,
+    _trucks.c.plate,
+    _num(_trucks.c.capacity_liters),
+    _trucks.c.fuel_level_percent,
+    _trucks.c.fuel_type,
+    _trucks.c.status,
+)
+_TRUCKS = select(*_TRUCK_COLUMNS).order_by(_trucks.c.code)
+_ACTIVE_TRUCKS = select(*_TRUCK_COLUMNS).where(_trucks.c.status == "active")
+_COMPARTMENT_COLUMNS = (
+    _compartments.c.truck_id,
+    _compartments.c.compartment_number,
+    _compartments.c.fuel_type,
+    _num(_compartments.c.capacity_liters),
+    _num(_compartments.c.current_level_liters),
+)
+_COMPARTMENTS = select(*_COMPARTMENT_COLUMNS).order_by(
+    _compartments.c.truck_id, _compartments.c.compartment_number
+)
+_ACTIVE_TRUCK_COMPARTMENTS = (
+    select(*_COMPARTMENT_COLUMNS)
+    .join(_trucks, _trucks.c.id == _compartments.c.truck_id)
+    .where(_trucks.c.status == "active")
+    .order_by(_compartments.c.truck_id, _compartments.c.compartment_number)
+)
+
+_TRIP_COLUMNS = (
+    _deliveries.c.id,
+    _deliveries.c.volume_liters,
+    _deliveries.c.delivery_date,
+    _deliveries.c.status,
+    _stations.c.name.label("station_name"),
+    _stations.c.code.label("station_code"),
+    _stations.c.city,
+    _stations.c.region,
+    _num(_stations.c.lat),
+    _num(_stations.c.lon),
+)
+_TRIPS = (
+    select(*_TRIP_COLUMNS)
+    .join(_stations, _deliveries.c.station_id == _stations.c.id)
+    .order_by(_deliveries.c.delivery_date.desc())
+    .limit(bindparam("limit", type_=Integer))
+)
+_DELIVERED_TRIPS = _TRIPS.where(_deliveries.c.status == "delivered")
+_TRIP = (
+    select(
+        *_TRIP_COLUMNS,
+        _trucks.c.code.label("truck_code"),
+        _trucks.c.plate.label("truck_plate"),
+    )
+    .join(_stations, _deliveries.c.station_id == _stations.c.id)
+    .join(_trucks, _deliveries.c.truck_id == _trucks.c.id)
+    .where(_deliveries.c.id == bindparam("trip_id"))
+)
+
+
+async def _rows(session: AsyncSession, stmt, params: Optional[Dict[str, Any]] = None):
+    connection = await session.connection()
+    return (await connection.execute(stmt, params or {})).all()
+
+
+def _compartments_by_truck(rows) -> Dict[int, List[Dict[str, Any]]]:
+    grouped = defaultdict(list)
+    for truck_id, number, fuel_type, capacity, current in rows:
+        grouped[truck_id].append(
+            {
+                "compartment_number": number,
+                "fuel_type": fuel_type,
+                "capacity_liters": capacity,
+                "current_level_liters": current,
+            }
+        )
+    return grouped
+
+
+async def stations_api(session: AsyncSession) -> List[Dict[str, Any]]:
+    """All stations in API shape, ordered by name"""
+    return [station_dict_from_row(row) for row in await _rows(session, _STATIONS)]
+
+
+async def station_api(session: AsyncSession, kind: str, value) -> Optional[Dict[str, Any]]:
+    """One station in API shape by ("id", int) or ("code", str)"""
+    stmt = _STATION_BY_ID if kind == "id" else _STATION_BY_CODE
+    rows = await _rows(session, stmt, {"value": value})
+    return station_dict_from_row(rows[0]) if rows else None
+
+
+async def stations_needing_refuel(
+    session: AsyncSession, filter_region: Optional[str] = None, filter_city: Optional[str] = None
+) -> List[StationData]:
+    """Stations below their low-fuel threshold, most urgent first"""
+    stmt = _STATIONS_NEEDING_REFUEL
+    if filter_region:
+        stmt = stmt.where(_stations.c.region == filter_region)
+    if filter_city:
+        stmt = stmt.where(_stations.c.city == filter_city)
+    return [StationData(*row) for row in await _rows(session, stmt)]
+
+
+async def trucks_api(session: AsyncSession) -> List[Dict[str, Any]]:
+    """All trucks with their compartments in API shape, ordered by code (two queries)"""
+    trucks = await _rows(session, _TRUCKS)
+    compartments = _compartments_by_truck(await _rows(session, _COMPARTMENTS))
+    return [truck_dict_from_row(row, compartments.get(row.id, [])) for row in trucks]
+
+
+async def active_trucks(session: AsyncSession) -> List[TruckData]:
+    """Active trucks with their compartments (two queries)"""
+    trucks = await _rows(session, _ACTIVE_TRUCKS)
+    compartments = _compartments_by_truck(await _rows(session, _ACTIVE_TRUCK_COMPARTMENTS))
+    return [TruckData(*row, compartments=compartments.get(row[0], [])) for row in trucks]
+
+
+async def trips_api(
+    session: AsyncSession, limit: int, successful_only: bool = False
+) -> List[Dict[str, Any]]:
+    """Most recent deliveries in API shape"""
+    stmt = _DELIVERED_TRIPS if successful_only else _TRIPS
+    return [trip_dict_from_row(row) for row in await _rows(session, stmt, {"limit": limit})]
+
+
+async def trip_api(session: AsyncSession, trip_id: int) -> Optional[Dict[str, Any]]:
+    """One delivery with its truck in API shape"""
+    rows = await _rows(session, _TRIP, {"trip_id": trip_id})
+    return trip_detail_from_row(rows[0]) if rows else None
@@ -0,0 +1,85 @@
+"""
+Request-scoped cancellation for long-running endpoints.
+
+`run_request_scoped` runs an endpoint's work (LLM call, weather fetches, DB
+queries) as its own task and cancels it as soon as the client disconnects or
+the endpoint's deadline passes. Cancellation propagates through every await in
+the task, so the LLM executor cancels in-flight provider calls and releases
+their admission slots, httpx aborts pending requests and SQLAlchemy rolls the
+session back instead of finishing work nobody will read.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, TypeVar
+
+from fastapi import HTTPException, Request
+
+from config import config
+
+T = TypeVar("T")
+
+# Non-standard status popularised by nginx for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
+
+_logger = logging.getLogger(__name__)
+
+
+class RequestScopeStats:
+    """Counters for abandoned and timed-out requests per endpoint"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, label: str, outcome: str):
+        counts = self._counts.setdefault(label, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {label: dict(counts) for label, counts in self._counts.items()}
+
+
+request_scope_stats = RequestScopeStats()
+
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(config.DISCONNECT_POLL_S)
+
+
+async def run_request_scoped(
+    request: Request, work: Awaitable[T], deadline_s: float, label: str
+) -> T:
+    """
+    Await `work`, cancelling it when the client goes away (HTTP 499) or when
+    `deadline_s` elapses (HTTP 504). A non-positive deadline disables it.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher},
+            timeout=deadline_s if deadline_s > 0 else None,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if task in done:
+            request_scope_stats.record(label, "completed")
+            return task.result()
+        if watcher in done:
+            _logger.info("%s: client disconnected, cancelling work", label)
+            request_scope_stats.record(label, "client_disconnected")
+            raise HTTPException(
+                status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request"
+            )
+        _logger.warning("%s: deadline of %ss exceeded, cancelling work", label, deadline_s)
+        request_scope_stats.record(label, "deadline_exceeded")
+        raise HTTPException(
+            status_code=504,
+            detail=f"{label} timed out after {deadline_s:g}s",
+        )
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # Let cleanup (slot release, session rollback) run before returning
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,175 @@
+"""
+Single-pass tokenizer for markdown LLM responses.
+
+`ParsedResponse` scans an AI response once, recording where every heading
+starts so section lookups, key/value extraction and numbered-step parsing all
+read from the same line index instead of re-splitting the full response per
+lookup. All patterns are compiled once at import time.
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Headings: "### ROUTE SUMMARY", "## Turn-by-Turn Directions ##"
+HEADING_RE = re.compile(r"^\s*#{1,6}\s*(.*?)\s*#*\s*$")
+# Characters ignored when comparing section names
+NAME_NOISE_RE = re.compile(r"[^A-Z0-9]+")
+# Numbered steps: "1. ...", "1) ...", "1 - ..."
+NUMBERED_STEP_RE = re.compile(r"^\s*(\d+)[\.\)\-]\s+(.*)$")
+# Inline "(12.3 km, 15 min)" distance/duration suffix
+PARENTHESIZED_RE = re.compile(r"\(([^)]+)\)")
+# Leading list markers before a "Key: value" line ("- ", "* ", "• ")
+LIST_MARKER_RE = re.compile(r"^(?:[-*•]\s+)+")
+
+# Markdown cleanup (see clean_markdown)
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+ITALIC_RE = re.compile(r"(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)")
+DOUBLE_UNDERSCORE_RE = re.compile(r"__(.+?)__")
+UNDERSCORE_RE = re.compile(r"_(.+?)_")
+STRAY_BOLD_RE = re.compile(r"\*\*")
+STRAY_STAR_RE = re.compile(r"(?<!\w)\*(?!\w)")
+
+
+def normalize_section_name(name: str) -> str:
+    """Upper-case a heading and collapse punctuation/markdown to single spaces"""
+    return NAME_NOISE_RE.sub(" ", name.upper()).strip()
+
+
+def clean_markdown(text: str) -> str:
+    """
+    Remove markdown formatting from text.
+    Removes bold (**), italic (*), and other common markdown syntax.
+    """
+    if not text:
+        return text
+    if "*" not in text and "_" not in text:
+        return text.strip()
+
+    cleaned = BOLD_RE.sub(r"\1", text)
+    cleaned = ITALIC_RE.sub(r"\1", cleaned)
+    cleaned = DOUBLE_UNDERSCORE_RE.sub(r"\1", cleaned)
+    cleaned = UNDERSCORE_RE.sub(r"\1", cleaned)
+    cleaned = STRAY_BOLD_RE.sub("", cleaned)
+    cleaned = STRAY_STAR_RE.sub("", cleaned)
+    return cleaned.strip()
+
+
+class ParsedResponse:
+    """Line and section index over one AI response, built in a single scan"""
+
+    def __init__(self, text: Optional[str]):
+        self.text = text or ""
+        self.lines: List[str] = self.text.split("\n")
+        # (normalized heading, first content line, end line exclusive)
+        self._sections: List[Tuple[str, int, int]] = []
+
+        heading_start: Optional[int] = None
+        heading_name = ""
+        for idx, line in enumerate(self.lines):
+            if "#" not in line:
+                continue
+            match = HEADING_RE.match(line)
+            if not match:
+                continue
+            if heading_start is not None:
+                self._sections.append((heading_name, heading_start, idx))
+            heading_name = normalize_section_name(match.group(1))
+            heading_start = idx + 1
+        if heading_start is not None:
+            self._sections.append((heading_name, heading_start, len(self.lines)))
+
+    def _find(self, section_name: str) -> Optional[Tuple[int, int]]:
+        """Locate a section's line range; exact heading match wins over partial"""
+        wanted = normalize_section_name(section_name)
+        partial = None
+        for name, start, end in self._sections:
+            if name == wanted:
+                return start, end
+            if partial is None and wanted in name:
+                partial = (start, end)
+        if partial is not None:
+            return partial
+
+        # The model sometimes drops the "###" (e.g. "**ROUTE SUMMARY**");
+        # fall back to the first line mentioning the name, up to the next heading.
+        for idx, line in enumerate(self.lines):
+            if wanted and wanted in normalize_section_name(line):
+                end = next(
+                    (start - 1 for _, start, _ in self._sections if start - 1 > idx),
+                    len(self.lines),
+                )
+                return idx + 1, end
+        return None
+
+    def has_section(self, section_name: str) -> bool:
+        return self._find(section_name) is not None
+
+    def section_lines(self, section_name: str) -> List[str]:
+        """Raw lines of a section (empty list when the section is missing)"""
+        span = self._find(section_name)
+        if span is None:
+            return []
+        return self.lines[span[0] : span[1]]
+
+    def section_text(self, section_name: str) -> str:
+        """Section body between its heading and the next heading"""
+        return "\n".join(self.section_lines(section_name)).strip()
+
+    def section_blocks(self, section_name: str) -> Iterator[List[str]]:
+        """Yield blank-line separated blocks of stripped, non-empty lines"""
+        block: List[str] = []
+        for line in self.section_lines(section_name):
+            stripped = line.strip()
+            if stripped:
+                block.append(stripped)
+            elif block:
+                yield block
+                block = []
+        if block:
+            yield block
+
+    def key_values(self, section_name: str, mappings: Dict[str, str]) -> Dict[str, str]:
+        """
+        Parse "Key: value" lines of a section.
+        mappings: dict of {search_key: result_key}
+        Example: {"Total Distance:": "total_distance"}
+        """
+        return parse_key_value_lines(self.section_lines(section_name), mappings)
+
+    def numbered_steps(
+        self, section_name: Optional[str] = None
+    ) -> List[Tuple[str, List[str]]]:
+        """
+        Numbered items of a section (or the whole response) with the lines
+        that follow each item up to the next item.
+        """
+        lines = self.section_lines(section_name) if section_name else self.lines
+        steps: List[Tuple[str, List[str]]] = []
+        for line in lines:
+            match = NUMBERED_STEP_RE.match(line)
+            if match:
+                steps.append((match.group(2).strip(), []))
+            elif steps:
+                steps[-1][1].append(line)
+        return steps
+
+
+def parse_key_value_lines(
+    lines: List[str], mappings: Dict[str, str], prefix_only: bool = False
+) -> Dict[str, str]:
+    """
+    Match each line against the first mapping key it contains (or starts
+    with, when prefix_only is set).
+    """
+    result = {}
+    for line in lines:
+        line = LIST_MARKER_RE.sub("", line.strip())
+        for search_key, result_key in mappings.items():
+            if line.startswith(search_key) if prefix_only else search_key in line:
+                # Split only once after the search key to preserve time values (e.g., "6:00 AM")
+                value = line.split(search_key, 1)[1].strip()
+                if value:  # Only add if not empty
+                    # Clean markdown formatting from the value
+                    result[result_key] = clean_markdown(value)
+                break  # Move to next line after finding a match
+    return result
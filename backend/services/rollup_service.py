@@ -0,0 +1,411 @@
+"""
+Rollups and retention for the append-only time-series tables.
+
+station_fuel_levels and weather_data only ever grow. This service keeps
+hourly and daily aggregates (samples, min, max, sum, last) per series in
+metric_rollups, folded in incrementally: each source has a watermark (the
+highest raw id already rolled up), and roll_up() reads the rows after it
+in ROLLUP_BATCH_ROWS batches and merges their buckets into the existing
+rollup rows. The weather collector calls it after every insert batch and
+the background loop picks up everything else (e.g. IoT fuel readings).
+
+Raw rows older than their retention (and already rolled up) and hourly
+rollups older than ROLLUP_HOURLY_RETENTION_DAYS are deleted in
+ROLLUP_DELETE_CHUNK primary-key chunks, each its own short transaction,
+so retention never holds long locks. history() picks the tier for a
+requested range: raw for short recent ranges, then hourly, then daily.
+
+Rows are assumed to be committed in id order (one writer per table); a
+row committed with an id below the watermark would not be rolled up.
+"""
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from database import db_manager
+from models.data_models import SeriesPoint
+from models.database_models import MetricRollup, RollupWatermark, StationFuelLevel
+from models.database_models import WeatherData as WeatherRecord
+
+_logger = logging.getLogger(__name__)
+
+RESOLUTIONS = ("hour", "day")
+
+
+@dataclass(frozen=True)
+class RollupSource:
+    """A raw time-series table and the columns that are rolled up"""
+
+    model: Any
+    time_column: str
+    key_column: str
+    metrics: Tuple[str, ...]
+    retention_setting: str  # Config attribute holding the raw retention in days
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def raw_retention_days(self) -> float:
+        return getattr(config, self.retention_setting)
+
+
+SOURCES: Dict[str, RollupSource] = {
+    source.name: source
+    for source in (
+        RollupSource(
+            StationFuelLevel,
+            "recorded_at",
+            "station_id",
+            ("fuel_level_liters",),
+            "FUEL_LEVEL_RAW_RETENTION_DAYS",
+        ),
+        RollupSource(
+            WeatherRecord,
+            "collected_at",
+            "city",
+            ("temperature", "wind", "humidity"),
+            "WEATHER_RAW_RETENTION_DAYS",
+        ),
+    )
+}
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    if resolution == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class _Aggregate:
+    __slots__ = ("samples", "min", "max", "sum", "last", "last_at")
+
+    def __init__(self):
+        self.samples = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.sum = 0.0
+        self.last = 0.0
+        self.last_at = datetime.min
+
+    def add(self, value: float, ts: datetime):
+        self.samples += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        if ts >= self.last_at:
+            self.last, self.last_at = value, ts
+
+    def merge_into(self, row: MetricRollup):
+        row.samples += self.samples
+        row.min_value = min(row.min_value, self.min)
+        row.max_value = max(row.max_value, self.max)
+        row.sum_value += self.sum
+        if self.last_at >= row.last_at:
+            row.last_value, row.last_at = self.last, self.last_at
+
+
+class RollupService:
+    """Incremental hourly/daily rollups, chunked retention and tiered history reads"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._counts = {"rolled_up_rows": 0, "deleted_raw_rows": 0, "deleted_rollups": 0}
+        self._last_run: Dict[str, Any] = {}
+
+    # ----- incremental rollups -----
+
+    async def _locked_watermark(self, session: AsyncSession, source: str) -> RollupWatermark:
+        """The source's watermark row, locked until commit so only one roller runs"""
+        stmt = (
+            select(RollupWatermark)
+            .where(RollupWatermark.source == source)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        watermark = (await session.execute(stmt)).scalar_one_or_none()
+        if watermark is not None:
+            return watermark
+        try:
+            session.add(RollupWatermark(source=source, last_id=0))
+            await session.commit()
+        except IntegrityError:
+            # Another process created it first
+            await session.rollback()
+        return (await session.execute(stmt)).scalar_one()
+
+    async def roll_up(self, session: AsyncSession, source_name: str) -> int:
+        """Fold raw rows past the watermark into the rollups; returns rows processed"""
+        source = SOURCES[source_name]
+        model = source.model
+        columns = [
+            model.id,
+            getattr(model, source.time_column),
+            getattr(model, source.key_column),
+            *(getattr(model, metric) for metric in source.metrics),
+        ]
+        processed = 0
+        async with self._lock:
+            while True:
+                watermark = await self._locked_watermark(session, source_name)
+                stmt = (
+                    select(*columns)
+                    .where(model.id > watermark.last_id)
+                    .order_by(model.id)
+                    .limit(config.ROLLUP_BATCH_ROWS)
+                )
+                rows = (await session.execute(stmt)).all()
+                if not rows:
+                    await session.commit()
+                    break
+
+                aggregates: Dict[Tuple[str, str, str, datetime], _Aggregate] = {}
+                for row in rows:
+                    ts, key = row[1], row[2]
+                    if ts is None or key is None:
+                        continue
+                    for metric, value in zip(source.metrics, row[3:]):
+                        if value is None:
+                            continue
+                        for resolution in RESOLUTIONS:
+                            bucket = (metric, str(key), resolution, bucket_start(ts, resolution))
+                            aggregate = aggregates.get(bucket)
+                            if aggregate is None:
+                                aggregate = aggregates[bucket] = _Aggregate()
+                            aggregate.add(float(value), ts)
+                await self._merge(session, source_name, aggregates)
+
+                watermark.last_id = rows[-1][0]
+                watermark.updated_at = datetime.now()
+                await session.commit()
+                processed += len(rows)
+                if len(rows) < config.ROLLUP_BATCH_ROWS:
+                    break
+
+        self._counts["rolled_up_rows"] += processed
+        return processed
+
+    async def _merge(
+        self,
+        session: AsyncSession,
+        source_name: str,
+        aggregates: Dict[Tuple[str, str, str, datetime], _Aggregate],
+    ):
+        if not aggregates:
+            return
+        starts = [bucket[3] for bucket in aggregates]
+        stmt = select(MetricRollup).where(
+            MetricRollup.source == source_name,
+            MetricRollup.series_key.in_({bucket[1] for bucket in aggregates}),
+            MetricRollup.bucket_start.between(min(starts), max(starts)),
+        )
+        existing = {
+            (r.metric, r.series_key, r.resolution, r.bucket_start): r
+            for r in (await session.execute(stmt)).scalars()
+        }
+        for bucket, aggregate in aggregates.items():
+            row = existing.get(bucket)
+            if row is not None:
+                aggregate.merge_into(row)
+                continue
+            metric, key, resolution, start = bucket
+            session.add(
+                MetricRollup(
+                    source=source_name,
+                    metric=metric,
+                    series_key=key,
+                    resolution=resolution,
+                    bucket_start=start,
+                    samples=aggregate.samples,
+                    min_value=aggregate.min,
+                    max_value=aggregate.max,
+                    sum_value=aggregate.sum,
+                    last_value=aggregate.last,
+                    last_at=aggregate.last_at,
+                )
+            )
+
+    # ----- retention -----
+
+    async def _delete_chunked(self, session: AsyncSession, model: Any, *conditions) -> int:
+        """Delete matching rows in primary-key chunks, one short transaction each"""
+        deleted = 0
+        while True:
+            stmt = (
+                select(model.id)
+                .where(*conditions)
+                .order_by(model.id)
+                .limit(config.ROLLUP_DELETE_CHUNK)
+            )
+            ids = (await session.execute(stmt)).scalars().all()
+            if not ids:
+                break
+            await session.execute(delete(model).where(model.id.in_(ids)))
+            await session.commit()
+            deleted += len(ids)
+            if len(ids) < config.ROLLUP_DELETE_CHUNK:
+                break
+            # Let other writers in between chunks
+            await asyncio.sleep(config.ROLLUP_DELETE_PAUSE_S)
+        return deleted
+
+    async def enforce_retention(self, session: AsyncSession) -> Dict[str, int]:
+        """Drop expired raw rows (only once rolled up) and expired hourly rollups"""
+        now = datetime.now()
+        deleted: Dict[str, int] = {}
+        for name, source in SOURCES.items():
+            if source.raw_retention_days <= 0:
+                continue
+            watermark = await session.get(RollupWatermark, name)
+            if watermark is None:
+                continue
+            model = source.model
+            cutoff = now - timedelta(days=source.raw_retention_days)
+            deleted[name] = await self._delete_chunked(
+                session,
+                model,
+                getattr(model, source.time_column) < cutoff,
+                model.id <= watermark.last_id,
+            )
+            self._counts["deleted_raw_rows"] += deleted[name]
+
+        if config.ROLLUP_HOURLY_RETENTION_DAYS > 0:
+            cutoff = now - timedelta(days=config.ROLLUP_HOURLY_RETENTION_DAYS)
+            deleted["metric_rollups"] = await self._delete_chunked(
+                session,
+                MetricRollup,
+                MetricRollup.resolution == "hour",
+                MetricRollup.bucket_start < cutoff,
+            )
+            self._counts["deleted_rollups"] += deleted["metric_rollups"]
+        return deleted
+
+    # ----- history reads -----
+
+    def choose_resolution(self, source_name: str, start: datetime, end: datetime) -> str:
+        """Finest tier that still holds the whole range and keeps the row count sane"""
+        now = datetime.now()
+        span = end - start
+        raw_days = SOURCES[source_name].raw_retention_days
+        if span <= timedelta(hours=config.ROLLUP_RAW_MAX_SPAN_H) and (
+            raw_days <= 0 or start >= now - timedelta(days=raw_days)
+        ):
+            return "raw"
+        hourly_days = config.ROLLUP_HOURLY_RETENTION_DAYS
+        if span <= timedelta(days=config.ROLLUP_HOURLY_MAX_SPAN_D) and (
+            hourly_days <= 0 or start >= now - timedelta(days=hourly_days)
+        ):
+            return "hour"
+        return "day"
+
+    async def history(
+        self,
+        session: AsyncSession,
+        source_name: str,
+        metric: str,
+        series_keys: Sequence[Any],
+        start: datetime,
+        end: datetime,
+        resolution: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, List[SeriesPoint]]]:
+        """
+        Points per series key between start and end, oldest first, from the
+        given tier or the one choose_resolution() picks. Returns (tier, series).
+        """
+        source = SOURCES[source_name]
+        if metric not in source.metrics:
+            raise ValueError(f"Unknown metric {metric!r} for {source_name}")
+        resolution = resolution or self.choose_resolution(source_name, start, end)
+        series: Dict[str, List[SeriesPoint]] = {str(key): [] for key in series_keys}
+
+        if resolution == "raw":
+            model = source.model
+            time_col = getattr(model, source.time_column)
+            key_col = getattr(model, source.key_column)
+            value_col = getattr(model, metric)
+            stmt = (
+                select(key_col, time_col, value_col)
+                .where(key_col.in_(series_keys), time_col.between(start, end))
+                .order_by(key_col, time_col)
+            )
+            for key, ts, value in (await session.execute(stmt)).all():
+                if value is None:
+                    continue
+                value = float(value)
+                series[str(key)].append(SeriesPoint(ts, value, value, value, value))
+            return resolution, series
+
+        stmt = (
+            select(MetricRollup)
+            .where(
+                MetricRollup.source == source_name,
+                MetricRollup.metric == metric,
+                MetricRollup.series_key.in_(list(series)),
+                MetricRollup.resolution == resolution,
+                MetricRollup.bucket_start.between(bucket_start(start, resolution), end),
+            )
+            .order_by(MetricRollup.series_key, MetricRollup.bucket_start)
+        )
+        for row in (await session.execute(stmt)).scalars():
+            series[row.series_key].append(
+                SeriesPoint(
+                    row.bucket_start,
+                    row.sum_value / row.samples,
+                    row.min_value,
+                    row.max_value,
+                    row.last_value,
+                    row.samples,
+                )
+            )
+        return resolution, series
+
+    # ----- background loop -----
+
+    async def run_once(self, session: AsyncSession) -> Dict[str, Any]:
+        rolled = {name: await self.roll_up(session, name) for name in SOURCES}
+        deleted = await self.enforce_retention(session)
+        self._last_run = {
+            "finished_at": datetime.now().isoformat(),
+            "rolled_up": rolled,
+            "deleted": deleted,
+        }
+        return self._last_run
+
+    async def start(self):
+        if self._task is None and config.ROLLUP_ENABLED:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with db_manager.get_session() as session:
+                    await self.run_once(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("Rollup run failed")
+            await asyncio.sleep(config.ROLLUP_INTERVAL_S * random.uniform(0.9, 1.1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": config.ROLLUP_ENABLED, **self._counts, "last_run": self._last_run}
+
+
+# Global rollup service; the API process runs its loop from the app lifespan
+rollup_service = RollupService()
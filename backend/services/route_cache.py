@@ -0,0 +1,186 @@
+"""
+Cache for TomTom calculateRoute responses.
+
+Keys are built from the route's coordinates quantized to ~10 m (4 decimal
+places), the routing options and, for traffic-aware routes, a time-of-day
+bucket, so repeat legs between the same sites are served from memory.
+Traffic-aware routes expire quickly (ROUTE_CACHE_TRAFFIC_TTL_S); routes
+computed without live traffic are effectively static and kept much longer
+(ROUTE_CACHE_STATIC_TTL_S). The in-memory cache is LRU-bounded by
+ROUTE_CACHE_MAX_MB; when ROUTE_CACHE_PATH is set, entries are also written
+to a SQLite file and reloaded on startup.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import config
+from utils.ttl_cache import TTLCache
+
+_logger = logging.getLogger(__name__)
+
+# 4 decimal places of latitude/longitude is roughly 11 m
+COORD_PRECISION = 4
+
+
+def quantize_point(point: Tuple[float, float]) -> str:
+    """Stable ~10 m resolution key for a (lat, lon) point"""
+    return f"{round(float(point[0]), COORD_PRECISION)},{round(float(point[1]), COORD_PRECISION)}"
+
+
+def _is_traffic_enabled(options: Dict[str, Any]) -> bool:
+    value = options.get("traffic", True)
+    if isinstance(value, str):
+        return value.strip().lower() not in ("false", "0", "no")
+    return bool(value)
+
+
+def _traffic_bucket(options: Dict[str, Any]) -> str:
+    """Time-of-day bucket that traffic-aware routes are keyed on"""
+    depart_at = options.get("departAt")
+    when = datetime.now()
+    if depart_at and depart_at != "now":
+        try:
+            when = datetime.fromisoformat(str(depart_at))
+        except ValueError:
+            return f"departAt={depart_at}"
+    minutes = when.hour * 60 + when.minute
+    day = "weekend" if when.weekday() >= 5 else "weekday"
+    return f"{day}:{minutes // max(1, config.ROUTE_CACHE_TRAFFIC_BUCKET_MIN)}"
+
+
+def route_cache_key(
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    waypoints: Optional[List[Tuple[float, float]]],
+    options: Dict[str, Any],
+) -> Tuple[str, bool]:
+    """Return (cache key, traffic_sensitive) for a calculateRoute call"""
+    points = [origin, *(waypoints or []), destination]
+    traffic = _is_traffic_enabled(options)
+    normalized = {
+        k: str(v).strip().lower()
+        for k, v in options.items()
+        if k not in ("traffic", "departAt") and v is not None
+    }
+    normalized.setdefault("routetype", normalized.pop("routeType", "fastest"))
+    normalized.setdefault("travelmode", normalized.pop("travelMode", "car"))
+    key = "|".join(
+        [
+            ":".join(quantize_point(p) for p in points),
+            json.dumps(normalized, sort_keys=True),
+            _traffic_bucket(options) if traffic else "static",
+        ]
+    )
+    return key, traffic
+
+
+class RouteCache:
+    """Memory-bounded route cache with optional SQLite persistence"""
+
+    def __init__(self):
+        self._memory = TTLCache(
+            max_entries=config.ROUTE_CACHE_MAX_ENTRIES,
+            max_bytes=int(config.ROUTE_CACHE_MAX_MB * 1024 * 1024),
+        )
+        self._path = config.ROUTE_CACHE_PATH
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = False
+        self._stored = 0
+
+    @property
+    def enabled(self) -> bool:
+        return config.ROUTE_CACHE_ENABLED
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS routes ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+        return self._conn
+
+    async def load(self):
+        """
+        Warm the memory cache from the SQLite file (no-op without a path).
+        The file is read and parsed in a worker thread, off the event loop.
+        """
+        if self._loaded or not self.enabled or not self._path:
+            return
+        self._loaded = True
+        now = time.time()
+        entries = await asyncio.to_thread(self._read, now)
+        for key, route, expires_at, size in entries:
+            self._memory.set(key, route, expires_at - now, size)
+        _logger.info("Loaded %d cached routes from %s", len(entries), self._path)
+
+    def _read(self, now: float) -> List[Tuple[str, Dict[str, Any], float, int]]:
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM routes WHERE expires_at <= ?", (now,))
+                conn.commit()
+                rows = conn.execute(
+                    "SELECT key, expires_at, payload FROM routes ORDER BY expires_at"
+                ).fetchall()
+        except sqlite3.Error as e:
+            _logger.warning("Could not load route cache from %s: %s", self._path, e)
+            return []
+        return [
+            (key, json.loads(payload), expires_at, len(payload))
+            for key, expires_at, payload in rows
+        ]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return self._memory.get(key)
+
+    async def set(self, key: str, route: Dict[str, Any], traffic: bool):
+        if not self.enabled:
+            return
+        ttl_s = config.ROUTE_CACHE_TRAFFIC_TTL_S if traffic else config.ROUTE_CACHE_STATIC_TTL_S
+        payload = json.dumps(route, separators=(",", ":"))
+        self._memory.set(key, route, ttl_s, len(payload))
+        self._stored += 1
+        if self._path:
+            await asyncio.to_thread(self._persist, key, time.time() + ttl_s, payload)
+
+    def _persist(self, key: str, expires_at: float, payload: str):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO routes (key, expires_at, payload) VALUES (?, ?, ?)",
+                    (key, expires_at, payload),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            _logger.warning("Could not persist cached route: %s", e)
+
+    def clear(self):
+        self._memory.clear()
+        if self._path:
+            with self._lock:
+                self._connect().execute("DELETE FROM routes")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "persistent": bool(self._path),
+            "stored": self._stored,
+            **self._memory.stats(),
+        }
+
+
+# Global route cache used by calculate_route_async
+route_cache = RouteCache()
@@ -0,0 +1,109 @@
+"""
+In-flight deduplication ("single-flight") for identical optimization calls.
+
+The first request for a key starts the work as its own task; identical
+requests that arrive while it is running attach to that task and share its
+result instead of repeating the DB reads, weather calls and LLM completion.
+Because the work is detached from the request that started it, it must open
+its own DB session. It is cancelled only when every attached request has
+gone away (client disconnects / deadlines), never because one of them did.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_logger = logging.getLogger(__name__)
+
+
+# Place names in request bodies: case and spacing do not change the answer
+LOCATION_FIELDS = frozenset(
+    {"from_location", "to_location", "depot_location", "filter_region", "filter_city"}
+)
+
+
+def normalize_payload(
+    payload: Dict[str, Any], fold: Iterable[str] = LOCATION_FIELDS
+) -> str:
+    """
+    Canonical key for a request body: sorted keys, the `fold` fields trimmed
+    and case-folded. Every other value (notes, truck ids, codes) is compared
+    verbatim, since the first caller's value is the one the work sees.
+    """
+    fold = frozenset(fold)
+    canonical = {
+        name: " ".join(value.split()).casefold()
+        if name in fold and isinstance(value, str)
+        else value
+        for name, value in payload.items()
+    }
+    return json.dumps(canonical, sort_keys=True, default=str)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same (name, key) into one task"""
+
+    def __init__(self):
+        self._flights: Dict[Tuple[str, Hashable], _Flight] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, outcome: str):
+        counts = self._counts.setdefault(
+            name, {"executed": 0, "coalesced": 0, "abandoned": 0}
+        )
+        counts[outcome] += 1
+
+    def _forget(self, flight_key: Tuple[str, Hashable], flight: _Flight):
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+
+    async def do(self, name: str, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `work()` once per concurrent (name, key). The result object is
+        shared by every caller, so callers must copy it before mutating.
+        """
+        flight_key = (name, key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(work()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+            self._count(name, "executed")
+        else:
+            _logger.debug("Coalescing %s request into in-flight call", name)
+            self._count(name, "coalesced")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone waiting for this result has gone away
+                self._forget(flight_key, flight)
+                flight.task.cancel()
+                self._count(name, "abandoned")
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for name, counts in self._counts.items():
+            total = counts["executed"] + counts["coalesced"]
+            result[name] = {
+                **counts,
+                "in_flight": sum(1 for n, _ in self._flights if n == name),
+                "coalesced_ratio": round(counts["coalesced"] / total, 3) if total else 0.0,
+            }
+        return result
+
+
+# Global instance shared by the optimization endpoints
+single_flight = SingleFlight()
@@ -0,0 +1,225 @@
+"""
+Resilient HTTP access to third-party APIs (WeatherAPI, TomTom).
+
+Each upstream gets:
+- one shared httpx.AsyncClient (connection reuse instead of a client per call)
+- an adaptive timeout: a multiple of the recent p95 latency, clamped between
+  UPSTREAM_MIN_TIMEOUT_S and the upstream's maximum, so a slow upstream
+  cannot hold requests for the full worst-case timeout
+- jittered exponential-backoff retries for idempotent requests on timeouts,
+  connection errors, 429 and 5xx
+- a circuit breaker that opens after UPSTREAM_BREAKER_FAILURES consecutive
+  failures and rejects calls immediately (UpstreamUnavailableError) for
+  UPSTREAM_BREAKER_COOLDOWN_S, then lets a single probe through (bounded by
+  the upstream's maximum timeout, and released if the probe is cancelled)
+
+Callers keep their own fallbacks (cached routes, last known weather,
+straight-line estimates); the breaker only makes them kick in without
+waiting.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from config import config
+
+_logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with closed / open / half_open states"""
+
+    def __init__(self, failure_threshold: int, cooldown_s: float, probe_timeout_s: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.probe_timeout_s = probe_timeout_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown_s - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "open" and self.retry_after() <= 0:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            # Only one probe at a time while half open; a probe that has not
+            # reported back within probe_timeout_s gives up its slot
+            now = time.monotonic()
+            if self._probing and now - self._probe_started < self.probe_timeout_s:
+                return False
+            self._probing = True
+            self._probe_started = now
+            return True
+        return self.state == "closed"
+
+    def release_probe(self):
+        """Free the probe slot when the probe ended without a verdict (e.g. cancelled)"""
+        self._probing = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """Shared client, adaptive timeout, retries and breaker for one upstream API"""
+
+    def __init__(self, name: str, max_timeout_s: float):
+        self.name = name
+        self.max_timeout_s = max_timeout_s
+        self.breaker = CircuitBreaker(
+            config.UPSTREAM_BREAKER_FAILURES,
+            config.UPSTREAM_BREAKER_COOLDOWN_S,
+            probe_timeout_s=max_timeout_s,
+        )
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._counts = {"requests": 0, "failures": 0, "retries": 0, "rejected": 0, "timeouts": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def timeout(self) -> float:
+        """Current per-attempt timeout derived from recent latencies"""
+        if len(self._latencies) < 20:
+            return self.max_timeout_s
+        ordered = sorted(self._latencies)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return min(
+            self.max_timeout_s,
+            max(config.UPSTREAM_MIN_TIMEOUT_S, p95 * config.UPSTREAM_TIMEOUT_MULTIPLIER),
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request through the breaker. GETs are retried; other methods
+        are retried only when idempotent=True is passed.
+        """
+        idempotent = kwargs.pop("idempotent", method.upper() == "GET")
+        attempts = 1 + (config.UPSTREAM_RETRIES if idempotent else 0)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._counts["rejected"] += 1
+                raise UpstreamUnavailableError(self.name, self.breaker.retry_after())
+
+            probe = self.breaker.state == "half_open"
+            self._counts["requests"] += 1
+            started = time.perf_counter()
+            try:
+                send = self.client.request(method, url, timeout=self.timeout(), **kwargs)
+                if probe:
+                    # httpx timeouts are per phase; cap the probe as a whole
+                    send = asyncio.wait_for(send, self.breaker.probe_timeout_s)
+                resp = await send
+                retryable = resp.status_code in RETRYABLE_STATUS
+                error: Optional[Exception] = None
+            except (httpx.TimeoutException, httpx.TransportError, TimeoutError) as e:
+                if not isinstance(e, httpx.HTTPError):
+                    # Probe cap hit; surface it like any other upstream timeout
+                    e = httpx.TimeoutException(
+                        f"{self.name} probe exceeded {self.breaker.probe_timeout_s:.0f}s"
+                    )
+                if isinstance(e, httpx.TimeoutException):
+                    self._counts["timeouts"] += 1
+                resp, retryable, error = None, True, e
+            except BaseException:
+                # Cancelled (client disconnect, deadline) or an unexpected error:
+                # no verdict on the upstream, but the probe slot must be freed
+                if probe:
+                    self.breaker.release_probe()
+                raise
+
+            if not retryable:
+                # 2xx and non-retryable 4xx both mean the upstream is healthy
+                self._latencies.append(time.perf_counter() - started)
+                self.breaker.record_success()
+                return resp
+
+            self._counts["failures"] += 1
+            self.breaker.record_failure()
+            if attempt + 1 >= attempts or self.breaker.state == "open":
+                if error is not None:
+                    raise error
+                return resp
+
+            self._counts["retries"] += 1
+            # Full jitter: sleep a random fraction of the exponential backoff
+            backoff = config.UPSTREAM_RETRY_BASE_S * (2**attempt)
+            await asyncio.sleep(random.uniform(0, backoff))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "times_opened": self.breaker.times_opened,
+            "retry_after_s": round(self.breaker.retry_after(), 1)
+            if self.breaker.state == "open"
+            else 0.0,
+            "timeout_s": round(self.timeout(), 2),
+            **self._counts,
+        }
+
+
+weather_upstream = Upstream("weatherapi", max_timeout_s=10.0)
+tomtom_upstream = Upstream("tomtom", max_timeout_s=30.0)
+
+UPSTREAMS = (weather_upstream, tomtom_upstream)
+
+
+def upstream_stats() -> Dict[str, Any]:
+    return {upstream.name: upstream.stats() for upstream in UPSTREAMS}
+
+
+async def close_upstreams():
+    for upstream in UPSTREAMS:
+        await upstream.close()
@@ -0,0 +1,321 @@
+"""
+Network-wide weather collection and local weather lookups.
+
+Every collection cycle fetches current weather for each distinct station
+city plus the configured depots, concurrently through the shared WeatherAPI
+client, paced by a token bucket (WEATHER_COLLECT_RPM), and stores the whole
+cycle with one multi-row INSERT. Individual fetches start at random offsets
+within WEATHER_COLLECT_SPREAD_S and cycles are jittered, so several
+collectors (or replicas) do not hit WeatherAPI in lockstep.
+
+Readings are keyed by quantized lat/lon grid cells (WEATHER_GRID_DEG), not
+city names: stations are grouped into cells and each cell is fetched once
+at the mean position of its stations, so a metro area with several city
+names costs one lookup while distant places that share a name stay apart.
+Lookups return the nearest fresh reading within WEATHER_GRID_MAX_KM by
+searching the surrounding cells.
+
+The latest reading per cell is kept in memory, either from this process's
+own collection or, when the collector runs elsewhere, synced from the
+weather_data table. Request paths and prompts call at_point()/for_stations()
+first and only go to WeatherAPI for places the collector does not cover.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from database import db_manager
+from models.data_models import Place, StationData, WeatherData
+from models.database_models import Station
+from models.database_models import WeatherData as WeatherRecord
+from utils.rate_limit import TokenBucket
+from .api_utils import get_weather_async
+from .gazetteer import gazetteer
+from .matrix_service import haversine_km
+from .rollup_service import rollup_service
+
+_logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+T = TypeVar("T")
+
+_KM_PER_DEGREE = 111.32
+
+
+def grid_cell(lat: float, lon: float) -> Cell:
+    """Quantize a position to its WEATHER_GRID_DEG grid cell"""
+    size = config.WEATHER_GRID_DEG
+    return (math.floor(lat / size), math.floor(lon / size))
+
+
+def nearest_in_grid(
+    cells: Dict[Cell, T],
+    lat: float,
+    lon: float,
+    position: Callable[[T], Tuple[float, float]],
+    usable: Callable[[T], bool] = lambda _: True,
+) -> Optional[T]:
+    """Nearest usable value within WEATHER_GRID_MAX_KM, searching the surrounding cells"""
+    max_km = config.WEATHER_GRID_MAX_KM
+    cell_km = _KM_PER_DEGREE * config.WEATHER_GRID_DEG
+    # Longitude cells narrow towards the poles, so search more of them
+    reach_lat = max(1, math.ceil(max_km / cell_km))
+    reach_lon = max(1, math.ceil(max_km / (cell_km * max(math.cos(math.radians(lat)), 0.1))))
+    ci, cj = grid_cell(lat, lon)
+
+    best, best_km = None, max_km
+    for i in range(ci - reach_lat, ci + reach_lat + 1):
+        for j in range(cj - reach_lon, cj + reach_lon + 1):
+            value = cells.get((i, j))
+            if value is None or not usable(value):
+                continue
+            km = haversine_km((lat, lon), position(value))
+            if km <= best_km:
+                best, best_km = value, km
+    return best
+
+
+async def fetch_paced(
+    places: List[Place], fetch: Callable[[Place], Awaitable[T]]
+) -> List[T]:
+    """
+    Run fetch(place) for every place with WEATHER_COLLECT_CONCURRENCY at a
+    time, at most WEATHER_COLLECT_RPM per minute, each starting at a random
+    offset within WEATHER_COLLECT_SPREAD_S
+    """
+    bucket = TokenBucket(config.WEATHER_COLLECT_RPM, capacity=1)
+    semaphore = asyncio.Semaphore(config.WEATHER_COLLECT_CONCURRENCY)
+
+    async def paced(place: Place) -> T:
+        # Spread the cycle's requests instead of sending them all at once
+        await asyncio.sleep(random.uniform(0, config.WEATHER_COLLECT_SPREAD_S))
+        async with semaphore:
+            while (wait := bucket.time_until()) > 0:
+                await asyncio.sleep(wait)
+            bucket.consume()
+            return await fetch(place)
+
+    return await asyncio.gather(*(paced(place) for place in places))
+
+
+class WeatherService:
+    """Collects weather for the whole network and serves it locally"""
+
+    def __init__(self):
+        # grid cell -> (collected_at epoch seconds, reading)
+        self._cells: Dict[Cell, Tuple[float, WeatherData]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._counts = {"cycles": 0, "fetched": 0, "failed": 0, "local_hits": 0, "local_misses": 0}
+        self._last_cycle: Dict[str, Any] = {}
+
+    # ----- local lookups -----
+
+    def at_point(self, lat: float, lon: float) -> Optional[WeatherData]:
+        """Nearest fresh reading within WEATHER_GRID_MAX_KM of a position"""
+        oldest = time.time() - config.WEATHER_LOCAL_MAX_AGE_S
+        entry = nearest_in_grid(
+            self._cells,
+            lat,
+            lon,
+            position=lambda e: (e[1].lat, e[1].lon),
+            usable=lambda e: e[0] >= oldest,
+        )
+        self._counts["local_hits" if entry is not None else "local_misses"] += 1
+        return entry[1] if entry is not None else None
+
+    def latest(self, place: Place) -> Optional[WeatherData]:
+        """Most recent collected reading near a place, if fresh enough"""
+        return self.at_point(place.lat, place.lon)
+
+    def for_points(self, points: Iterable[Tuple[float, float]]) -> List[Optional[WeatherData]]:
+        """Readings for many positions; points in the same cell share one search"""
+        by_cell: Dict[Cell, Optional[WeatherData]] = {}
+        results = []
+        for lat, lon in points:
+            cell = grid_cell(lat, lon)
+            if cell not in by_cell:
+                by_cell[cell] = self.at_point(lat, lon)
+            results.append(by_cell[cell])
+        return results
+
+    def for_stations(self, stations: List[StationData]) -> Dict[int, WeatherData]:
+        """Station id -> local reading, for stations with a fresh reading nearby"""
+        located = [s for s in stations if s.lat is not None and s.lon is not None]
+        readings = self.for_points((float(s.lat), float(s.lon)) for s in located)
+        return {s.id: w for s, w in zip(located, readings) if w is not None}
+
+    def _remember(self, weather: WeatherData, collected_at: float):
+        cell = grid_cell(weather.lat, weather.lon)
+        current = self._cells.get(cell)
+        if current is None or current[0] <= collected_at:
+            self._cells[cell] = (collected_at, weather)
+
+    async def sync_from_db(self, session: AsyncSession):
+        """Load readings young enough to serve (collector running elsewhere)"""
+        since = datetime.now() - timedelta(seconds=config.WEATHER_LOCAL_MAX_AGE_S)
+        stmt = (
+            select(WeatherRecord)
+            .where(WeatherRecord.collected_at >= since)
+            .order_by(WeatherRecord.collected_at)
+        )
+        for record in (await session.execute(stmt)).scalars():
+            if record.lat is not None and record.lon is not None:
+                lat, lon = float(record.lat), float(record.lon)
+            else:
+                # Rows written before positions were stored
+                place = gazetteer.resolve(record.city)
+                if place is None:
+                    continue
+                lat, lon = place.lat, place.lon
+            self._remember(
+                WeatherData(
+                    city=record.city or "",
+                    temp_c=float(record.temperature or 0),
+                    condition=record.condition or "Unknown",
+                    wind_kph=float(record.wind or 0),
+                    humidity=float(record.humidity or 0),
+                    lat=lat,
+                    lon=lon,
+                ),
+                record.collected_at.timestamp(),
+            )
+
+    # ----- collection -----
+
+    async def collection_targets(self, session: AsyncSession) -> List[Place]:
+        """One place per grid cell holding stations, plus the configured depots"""
+        stmt = select(Station.city, Station.region, Station.lat, Station.lon).where(
+            Station.lat.is_not(None), Station.lon.is_not(None)
+        )
+        cells: Dict[Cell, List[Any]] = defaultdict(list)
+        for row in (await session.execute(stmt)).all():
+            cells[grid_cell(float(row.lat), float(row.lon))].append(row)
+
+        targets: Dict[Cell, Place] = {}
+        for cell, rows in cells.items():
+            # Mean station position, labelled with the cell's most common city
+            (city, region), _ = Counter((r.city or "", r.region or "") for r in rows).most_common(1)[0]
+            targets[cell] = Place(
+                city=city,
+                region=region,
+                lat=sum(float(r.lat) for r in rows) / len(rows),
+                lon=sum(float(r.lon) for r in rows) / len(rows),
+                source="stations",
+                station_count=len(rows),
+            )
+        for depot in config.WEATHER_DEPOTS:
+            place = gazetteer.resolve(depot)
+            if place is None:
+                _logger.warning("Depot %r is not a known place; skipping weather", depot)
+                continue
+            targets.setdefault(grid_cell(place.lat, place.lon), place)
+        return list(targets.values())
+
+    async def _fetch(self, place: Place) -> Optional[WeatherData]:
+        try:
+            weather = await get_weather_async(f"{place.lat},{place.lon}")
+        except Exception as e:
+            self._counts["failed"] += 1
+            _logger.warning("Weather for %s failed: %s", place.label, e)
+            return None
+        self._counts["fetched"] += 1
+        return replace(weather, city=place.city, location=place.city, lat=place.lat, lon=place.lon)
+
+    async def collect(self, session: AsyncSession) -> int:
+        """Run one collection cycle; returns the number of rows stored"""
+        started = time.perf_counter()
+        targets = await self.collection_targets(session)
+        readings = [w for w in await fetch_paced(targets, self._fetch) if w is not None]
+
+        if readings:
+            collected_at = datetime.now()
+            # One multi-row INSERT for the whole cycle
+            await session.execute(
+                insert(WeatherRecord),
+                [{**w.to_db_dict(), "collected_at": collected_at} for w in readings],
+            )
+            await session.commit()
+            for weather in readings:
+                self._remember(weather, collected_at.timestamp())
+            # Fold the new batch into the hourly/daily rollups right away
+            try:
+                await rollup_service.roll_up(session, WeatherRecord.__tablename__)
+            except Exception as e:
+                await session.rollback()
+                _logger.warning("Weather rollup failed (the rollup loop will retry): %s", e)
+
+        self._counts["cycles"] += 1
+        self._last_cycle = {
+            "finished_at": datetime.now().isoformat(),
+            "duration_s": round(time.perf_counter() - started, 1),
+            "targets": len(targets),
+            "stored": len(readings),
+        }
+        _logger.info("Weather cycle stored %d/%d grid cells", len(readings), len(targets))
+        return len(readings)
+
+    # ----- background loop -----
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_forever(self):
+        """Collector loop (also used by the standalone weather_collector.py)"""
+        while True:
+            try:
+                async with db_manager.get_session() as session:
+                    await self.collect(session)
+                interval = config.WEATHER_COLLECT_INTERVAL_S
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _logger.exception("Weather collection cycle failed")
+                interval = min(300.0, config.WEATHER_COLLECT_INTERVAL_S)
+            # +-10% jitter keeps independent collectors from aligning
+            await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+
+    async def _run(self):
+        if config.WEATHER_COLLECTOR_ENABLED:
+            await self.run_forever()
+            return
+        # Collector runs as a separate process: follow its rows instead
+        while True:
+            try:
+                async with db_manager.get_session() as session:
+                    await self.sync_from_db(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _logger.warning("Weather sync from database failed: %s", e)
+            await asyncio.sleep(config.WEATHER_SYNC_INTERVAL_S * random.uniform(0.9, 1.1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "collector_enabled": config.WEATHER_COLLECTOR_ENABLED,
+            "grid_deg": config.WEATHER_GRID_DEG,
+            "cells": len(self._cells),
+            **self._counts,
+            "last_cycle": self._last_cycle,
+        }
+
+
+# Global weather service; the API process starts it from the app lifespan
+weather_service = WeatherService()
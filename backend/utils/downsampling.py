@@ -0,0 +1,58 @@
+"""Downsampling of time series for charts (indices of the points to keep)."""
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: keep `threshold` visually significant points.
+
+    `x` must be increasing. The first and last points are always kept; each
+    bucket in between contributes the point forming the largest triangle
+    with the previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket boundaries over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket (the last point for the final bucket)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def minmax_indices(lows: np.ndarray, highs: np.ndarray, threshold: int) -> np.ndarray:
+    """Min/max bucketing: per bucket keep the point with the lowest low and highest high.
+
+    Uses `threshold // 2` equal-count buckets, so at most `threshold` points
+    are returned (in order). Preserves the envelope of the series, which
+    LTTB can smooth away. Pass the same array twice for plain values.
+    """
+    n = len(lows)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+
+    lows = np.asarray(lows, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    kept = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        low = start + int(lows[start:end].argmin())
+        high = start + int(highs[start:end].argmax())
+        kept.extend(sorted({low, high}))
+    return np.array(kept, dtype=int)
@@ -0,0 +1,51 @@
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`.
+
+    A non-positive rate means "unlimited": every request is admitted.
+    Not thread-safe; intended for use from a single asyncio event loop.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate_per_second <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate_per_second
+        )
+        self._updated = now
+
+    def time_until(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available (0 when available now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        # Requests larger than the bucket are admitted once it is full
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) / self.rate_per_second
+
+    def consume(self, amount: float = 1.0):
+        """Take `amount` tokens; callers should check time_until() first."""
+        if self.unlimited:
+            return
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the upstream signalled a rate limit."""
+        if self.unlimited:
+            return
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
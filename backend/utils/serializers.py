@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 
 def _format_percent(numerator: float | None, denominator: float | None) -> int:
@@ -10,45 +10,30 @@ def _format_percent(numerator: float | None, denominator: float | None) -> int:
     return 0
 
 
-def station_api_dict(station: Any) -> Dict[str, Any]:
-    """Serialize a Station ORM or data model object into the API station shape.
+def station_dict_from_row(r: Any) -> Dict[str, Any]:
+    """API station shape from a station row (see services/read_queries.py).
 
-    This function is defensive and tolerates None values returned from the DB.
+    A station below its low-fuel threshold needs refuel, an empty one included.
     """
-    capacity = getattr(station, "capacity_liters", None) or 0
-    current = getattr(station, "current_level_liters", None) or 0
-
+    capacity = r.capacity_liters or 0
+    current = r.current_level_liters or 0
+    threshold = r.low_fuel_threshold or 5000
     return {
-        "station_id": f"station-{getattr(station, 'id', 0):03d}",
-        "name": getattr(station, "name", None),
-        "city": getattr(station, "city", None),
-        "region": getattr(station, "region", None),
+        "station_id": f"station-{r.id:03d}",
+        "name": r.name,
+        "city": r.city,
+        "region": r.region,
         "country": "Canada",
-        "fuel_type": getattr(station, "fuel_type", None),
+        "fuel_type": r.fuel_type,
         "capacity_liters": capacity,
         "current_level_liters": current,
         "fuel_level": _format_percent(current, capacity),
-        "code": getattr(station, "code", None),
-        "lat": (
-            float(getattr(station, "lat", 0))
-            if getattr(station, "lat", None) is not None
-            else None
-        ),
-        "lon": (
-            float(getattr(station, "lon", 0))
-            if getattr(station, "lon", None) is not None
-            else None
-        ),
-        "request_method": getattr(station, "request_method", None) or "Manual",
-        "low_fuel_threshold": getattr(station, "low_fuel_threshold", None) or 5000,
-        "needs_refuel": bool(
-            getattr(station, "needs_refuel", False)
-            or (
-                capacity
-                and current
-                and current < (getattr(station, "low_fuel_threshold", 5000) or 5000)
-            )
-        ),
+        "code": r.code,
+        "lat": float(r.lat) if r.lat is not None else None,
+        "lon": float(r.lon) if r.lon is not None else None,
+        "request_method": r.request_method or "Manual",
+        "low_fuel_threshold": threshold,
+        "needs_refuel": current < threshold,
     }
 
 
@@ -81,17 +66,17 @@ def station_available_dict(station: Any) -> Dict[str, Any]:
     }
 
 
-def truck_api_dict(truck: Any) -> Dict[str, Any]:
-    """Serialize a Truck ORM or data model object into the API truck shape."""
+def truck_dict_from_row(r: Any, compartments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """API truck shape from a truck row and its compartments."""
     return {
-        "truck_id": f"truck-{getattr(truck, 'id', 0):03d}",
-        "plate_number": getattr(truck, "plate", None),
-        "capacity_liters": getattr(truck, "capacity_liters", None),
-        "fuel_level_percent": getattr(truck, "fuel_level_percent", None),
-        "fuel_type": getattr(truck, "fuel_type", None),
-        "status": getattr(truck, "status", None),
-        "code": getattr(truck, "code", None),
-        "compartments": getattr(truck, "compartments", None) or [],
+        "truck_id": f"truck-{r.id:03d}",
+        "plate_number": r.plate,
+        "capacity_liters": r.capacity_liters,
+        "fuel_level_percent": r.fuel_level_percent,
+        "fuel_type": r.fuel_type,
+        "status": r.status,
+        "code": r.code,
+        "compartments": compartments,
     }
 
 